@@ -36,9 +36,85 @@ Created on Mon May  9 10:12:12 2022
 #
 #   6.0.0 - 5/09/2022 - Added histogram plot of wind speed data
 #
+#   6.1.0 - 10/19/2026 - Raw files are merged on (TIMESTAMP, RECORD) with toa5.py
+#                        so overlapping downloads, duplicates and logger resets
+#                        are reported instead of hidden by combine_first
+#
+#   6.2.0 - 10/19/2026 - Columns come from the raw header, validated against the
+#                        DataTable schema compiled from the CRBasic program
+#
+#   6.3.0 - 10/19/2026 - QA and wind chill moved to qa.py, summary report lines
+#                        shared with the streaming report in streamstats.py
+#
+#   6.4.0 - 10/19/2026 - Optional climatology percentile lines in the summary
+#                        report from the t-digest store in climatology.py
+#
+#   6.5.0 - 10/19/2026 - Daily files, report sections and the figure are only
+#                        rebuilt when the data or settings they use change
+#                        (build_cache.py)
+#
+#   6.6.0 - 10/19/2026 - Station, month and day wind figures rendered in
+#                        parallel by figures.py when figures: directory is set
+#
+#   6.7.0 - 10/19/2026 - Min/max/mean tile pyramid for the interactive viewer
+#                        (tiles.py) when tiles: directory is set
+#
+#   6.8.0 - 10/19/2026 - Daily files are catalogued in the SQLite coverage
+#                        catalog (catalog.py) when catalog: file is set
+#
+#   6.9.0 - 10/19/2026 - QA and wind chill run on blocks of the time axis on a
+#                        process pool (parallel_qa.py) for long data sets
+#
+#   6.10.0 - 10/19/2026 - Daily observed and clear-sky insolation line in the
+#                         summary report (solar.py) when solar: report is set
+#
+#   6.11.0 - 10/19/2026 - Rain events, freeze spells and gust episodes added to
+#                         the station's events table (events.py) when events:
+#                         directory is set
+#
+#   6.12.0 - 10/19/2026 - Season-to-date degree days and insolation extended
+#                         day by day (degree_days.py) when accumulation: file
+#                         is set
+#
+#   6.13.0 - 10/19/2026 - Raw files from several logger program versions are
+#                         read with their own schema (logger_programs) and
+#                         widened to one column set; field_aliases renames
+#                         logger fields on ingest
+#
+#   6.14.0 - 10/19/2026 - Campbell binary (TOB1/TOB3) raw files are read as
+#                         well as TOA5; binary_archive writes the merged raw
+#                         data as an FP2 TOB1 file (tob.py)
+#
+#   6.15.0 - 10/19/2026 - Record interval taken from the table metadata, so
+#                         5 s scan tables get the right grid, day windows and
+#                         missing counts; days are sliced by binary search
+#                         and long series plotted as a min/max envelope
+#
+#   6.16.0 - 10/19/2026 - Station range min/max/sum index (rangeindex.py)
+#                         updated when range_index: directory is set
+#
+#   6.17.0 - 10/19/2026 - Bounded gap infill (infill.py): short TAIR, RELH
+#                         and WSPD gaps in the daily files interpolated and
+#                         flagged in VAR_EST columns when infill is enabled
+#
+#   6.17.1 - 10/19/2026 - Only the QA and report variables and extra_variables
+#                         are read from the raw files
+#
+#   6.17.2 - 10/19/2026 - The whole run is skipped when the raw files, logger
+#                         programs and settings are unchanged since the last
+#                         one and its outputs are all still there
+#
+#   6.17.3 - 10/19/2026 - Catalog entries store the raw records received for
+#                         the day
+#
+#   6.17.4 - 10/19/2026 - The grid is built, QA-ed and infilled chunk_days
+#                         days at a time; the wind figure key follows
+#                         figures: max_points
+#
 # Inputs: 
-#  * CSV formatted raw data file from CR300 series datalogger. 
-#  * YAML settings file (data_file, data_filename, output_file_path, start_date, end_date)
+#  * CSV formatted raw data file from CR300 series datalogger (or TOB1/TOB3 binary). 
+#  * YAML settings file (data_file, data_files, logger_program(s), logger_table, field_aliases, data_filename,
+#    binary_archive, output_file_path, start_date, end_date, chunk_days)
 # 
 # Outputs: 
 #  * CSV formatted daily files.
@@ -53,6 +129,14 @@ Created on Mon May  9 10:12:12 2022
 # 
 # Notes: 
 #   * All Python libraries are the latest versions as of release date. 
+#   * pipeline.py runs the same ingest, QA, wind chill, daily file and report
+#     steps as separate stages joined by Arrow record batches.
+#   * Only the merged raw data and the QA-ed observations the period-wide
+#     steps need (wind speed and gust; every variable when events or the
+#     range index are on) span the whole period. The grid, QA flags, infill
+#     and daily -9999 frames are built one block of chunk_days days at a
+#     time, with the QA look-back and the longest infill gap as a margin on
+#     each side, so they come out the same as for the period at once.
 # 
 # Copyright (c) 2022 
 # Board of Regents, Univ. of Oklahoma  
@@ -65,6 +149,7 @@ Created on Mon May  9 10:12:12 2022
     
 # Import libraries
 import os 
+import sys
 import pandas as pd
 import numpy as np
 import yaml
@@ -72,10 +157,22 @@ import matplotlib as mpl
 import matplotlib.pyplot as plt 
 from pathlib import Path  
 from datetime import datetime, timedelta
-
-def wind_chill (TAIR, WSPD): 
-    CHIL = np.real(13.12 + (0.6215*TAIR) - 11.37*(pow((WSPD*3.6),0.16)) + 0.3965*TAIR*(pow((WSPD*3.6),0.16)))
-    return CHIL 
+import toa5
+import tob
+import crbasic
+import parallel_qa
+import qa
+import streamstats
+import solar
+import climatology
+import build_cache
+import catalog
+import degree_days
+import figures
+import tiles
+import events
+import rangeindex
+import infill
 
 if __name__ == "__main__":
 
@@ -90,57 +187,50 @@ if __name__ == "__main__":
     end_date = datetime.strptime(settings['end_date'], "%Y-%m-%d %H:%M")
     current_date = start_date
     
-    # Data frame of the raw data file without missing data filled 
-    raw_datafile = pd.read_csv(settings["data_file"], skiprows = [0, 2, 3])
-    raw_datafile["TIMESTAMP"] = pd.to_datetime(raw_datafile["TIMESTAMP"])
+    # Data frame of the raw data files without missing data filled, merged on
+    # (TIMESTAMP, RECORD) so overlapping downloads only count once
+    data_files = settings.get("data_files") or [settings["data_file"]]
+    
+    ## File path to directory the csv files need to be saved to
+    filepath = Path('/Users/savannahsouthward/opt/anaconda3/envs/METR-2613/Data/csv/')     
+    
+    # Key of the whole run from the raw file and logger program stamps and the
+    # settings, taken before anything is read; skip the run if nothing changed
+    # and every output it wrote is still there
+    cache = build_cache.BuildCache(settings["output_file_path"], settings.get("build_cache", True))
+    programs = settings.get("logger_programs") or [settings.get("logger_program")]
+    run_key = build_cache.key('lab6-run-1', build_cache.file_stamps(data_files),
+                              build_cache.file_stamps([p for p in programs if p]), settings)
+    run_outputs = [os.path.join(settings["output_file_path"], "NWC0_REPORT_{:%Y%m%d}_{:%Y%m%d}.txt".format(
+                       start_date, end_date)), settings['output_file_path'] + settings['wsg_fig']]
+    run_outputs += [filepath/"NWC_{:%Y%m%d}.dat".format(day)
+                    for day in pd.date_range(start_date.date(), end_date.date(), freq='D')]
+    if cache.run_fresh(run_key, run_outputs):
+        print("Raw files and settings unchanged since the last run, outputs are up to date")
+        sys.exit(0)
+    
+    # Table schema compiled from the CRBasic program, or one per program version
+    # (if given) to check the raw headers and skip dtype inference
+    schema = crbasic.schema_from_settings(settings)
+    raw_datafile, merge_report = toa5.merge_toa5(data_files, schema=schema,
+                                                 columns=streamstats.raw_columns(settings),
+                                                 aliases=settings.get("field_aliases"))
+    print(toa5.format_merge_report(merge_report))
+    
+    # Compact FP2 packed copy of the merged raw data (if a file is given)
+    if settings.get("binary_archive"):
+        tob.write_tob1(settings["binary_archive"], raw_datafile, merge_report['header'])
+    
+    # Record interval of the table (DataInterval of its schema, the TOB3 header
+    # or else the raw time stamps), used for the grid, the day windows and the
+    # record counts of the solar, events, catalog and accumulation blocks
+    interval = merge_report['interval_seconds']
+    settings = streamstats.with_interval(settings, interval)
     
     # (Insert Passive Aggressive Comment about Datetime Here...)
     settings['start_date'] = datetime.strptime(settings['start_date'], "%Y-%m-%d %H:%M")
     settings['end_date'] = datetime.strptime(settings['end_date'], "%Y-%m-%d %H:%M")
     
-    # Blank data frame to be used to appease the index function
-    empty = pd.DataFrame(index=pd.date_range(settings['start_date'], settings['end_date'], freq='5min'),
-                            columns=['RECORD','TAIR','RELH','SRAD','WSPD','WMAX','WDIR','RAIN','BATV']).rename_axis('TIMESTAMP')
-    
-    # Read in raw data file to be corrected 
-    rawdata = pd.read_csv(settings['data_file'], skiprows=[0,2,3], index_col='TIMESTAMP')
-    rawdata.index = pd.to_datetime(rawdata.index)
-    
-    # Merge raw data into blank dataframe
-    data = rawdata.combine_first(empty)
-    data.reset_index(inplace = True)
-    
-    # Parse data for the particular day 
-    data['TIMESTAMP'] = pd.to_datetime(data['TIMESTAMP'])
-    data = data.drop('RECORD', axis=1)
-    start_date = settings['start_date']
-    end_date = settings['end_date']
-    
-    ##############################################################################################################################
-    
-    # Assign QA flags to the 'data' data frame
-    data["TAIR"] = data["TAIR"].apply(lambda row: -998 if ((row < settings["variable"]["TAIR"]["QA"]["low_limit"]) 
-                                                           or (row > settings["variable"]["TAIR"]["QA"]["high_limit"])) else row)
-    data["RELH"] = data["RELH"].apply(lambda row: -998 if ((row < settings["variable"]["RELH"]["QA"]["low_limit"]) 
-                                                           or (row > settings["variable"]["RELH"]["QA"]["high_limit"])) else row)
-    data["SRAD"] = data["SRAD"].apply(lambda row: -998 if ((row < settings["variable"]["SRAD"]["QA"]["low_limit"]) 
-                                                           or (row > settings["variable"]["SRAD"]["QA"]["high_limit"])) else row)
-    data["WSPD"] = data["WSPD"].apply(lambda row: -998 if ((row < settings["variable"]["WSPD"]["QA"]["low_limit"]) 
-                                                           or (row > settings["variable"]["WSPD"]["QA"]["high_limit"])) else row)
-    data["WMAX"] = data["WMAX"].apply(lambda row: -998 if ((row < settings["variable"]["WMAX"]["QA"]["low_limit"]) 
-                                                           or (row > settings["variable"]["WMAX"]["QA"]["high_limit"])) else row)
-    
-    data["CHIL"] = wind_chill(data["TAIR"], data["WSPD"])
-    data["CHIL"] = data["CHIL"].apply(lambda row: -998 if ((row < settings["variable"]["CHIL"]["QA"]["low_limit"]) 
-                                                           or (row > settings["variable"]["CHIL"]["QA"]["high_limit"])) else row)
-    
-    # Copy of 'data' data frame to be used for our QA statistics                                                                                                                                                            
-    qa_stats = data.copy()                                                                                                                                                      
-    qa_stats = qa_stats.replace(-998, np.nan)
-    
-    # Fill the 'data' data frame with -9999 because we hate nans
-    data.fillna('-9999', inplace=True)
-    
     # Designate variables to be called when naming our parsed data files
     sumdate_start =  pd.to_datetime(settings['start_date']).strftime('%Y%m%d')
     sumdate_end =  pd.to_datetime(settings['end_date']).strftime('%Y%m%d')
@@ -149,112 +239,219 @@ if __name__ == "__main__":
     os.chdir(settings["output_file_path"])
     qa_summary = "NWC0_REPORT_" + sumdate_start + "_" + sumdate_end   
     file = open(qa_summary+'.txt', 'w')
-    file.write("Statistics Report (QA) \n" "Input file: " + settings["data_filename"] 
-                   + "\n" "Output Data: ")
-       
-    # While Loop to cycle through the data for each day
+    file.write(streamstats.report_header(settings["data_filename"]))
+    if len(data_files) > 1:
+        file.write("\n" + toa5.format_merge_report(merge_report))
+    
+    # Climatology sketches, if a store is set up in the settings file
+    clim_config = climatology.climatology_settings(settings)
+    clim = None
+    if clim_config is not None:
+        clim = climatology.Climatology(clim_config['file'], clim_config['compression'])
+    
+    # Coverage catalog of the daily files, if one is set up in the settings file
+    catalog_config = catalog.catalog_settings(settings)
+    coverage = None
+    if catalog_config is not None:
+        coverage = catalog.Catalog(catalog_config['file'], catalog_config['interval_minutes'])
+    
+    # Degree day and insolation accumulations, if a store is set up
+    accum_config = degree_days.accumulation_settings(settings)
+    accumulations = None
+    if accum_config is not None:
+        accumulations = degree_days.Accumulations(accum_config['file'], accum_config)
+    
+    # Short gaps interpolated in the daily files only, each filled value
+    # flagged in a VAR_EST column (the report keeps to the observations)
+    infill_config = infill.infill_settings(settings)
+    
+    # The period is worked through chunk_days days at a time: each block of
+    # the grid is built, QA-ed and infilled with a margin on both sides (the
+    # QA look-back and the longest infill gap) and only the block is kept.
+    # The QA-ed observations are kept for the period-wide stages after the
+    # loop (the wind figure always; events and the range index need every
+    # variable, the rest only wind speed and gust).
+    block_days = pd.Timedelta(days=settings.get('chunk_days', 7))
+    margin = (qa.lookback(settings) + 1) * pd.Timedelta(seconds=interval)
+    if infill_config is not None:
+        margin += pd.Timedelta(minutes=max(infill_config['max_gap_minutes'].values(), default=0))
+    keep_all = any((settings.get(name) or {}).get('directory') for name in ('events', 'range_index'))
+    observations = []
+    row = 0
+    
+    # While Loop to cycle through the blocks of days, then each day of a block
+    block_start = pd.Timestamp(start_date.date())
     while current_date <= end_date:
-        print(current_date)
+        block_end = block_start + block_days
+        lo = None if block_start <= start_date else block_start
+        hi = None if block_end > end_date else block_end
+        block = streamstats.grid_block(raw_datafile, start_date, end_date, interval,
+                                       None if lo is None else lo - margin, None if hi is None else hi + margin)
+        core = streamstats.time_slice(block['TIMESTAMP'], lo, hi)
     
-    # Set up a variable from 00z to 23:55z using our 'data' data frame
-        day = data[(data["TIMESTAMP"] >= datetime(current_date.year, current_date.month, current_date.day, 0, 0)) 
-                       & (data["TIMESTAMP"] <= datetime(current_date.year, current_date.month, current_date.day, 23, 55))]
+    # Assign QA flags to the block, then compute and QA the wind chill
+    # (split over a process pool when there are several blocks of records)
+        block = parallel_qa.apply_qa(block, settings)
     
-    # Create the Daily CSVs within desired directory
+    # Tile pyramid for the interactive viewer (QA flags are still -998 here)
+        if (settings.get('tiles') or {}).get('directory'):
+            tiles.export_station(settings.get('station', 'NWC0'), block.iloc[core], settings)
+    
+    # Copy of the block to be used for our QA statistics, numbered by row of
+    # the whole period (the index of the daily files)
+        rows = pd.RangeIndex(row, row + core.stop - core.start)
+        row = rows.stop
+        qa_stats = block.iloc[core].replace(-998, np.nan).set_axis(rows)
+        observations.append(qa_stats if keep_all else qa_stats[['TIMESTAMP', 'WSPD', 'WMAX']])
         
-    ## File path to directory the csv files need to be saved to
-        filepath = Path('/Users/savannahsouthward/opt/anaconda3/envs/METR-2613/Data/csv/')     
-    ## File name that fills in the proper datetimes for the data
-        filename = "NWC_{}{:02d}{:02d}.dat".format(current_date.year, current_date.month, current_date.day)
-        print(filename)   
-    ## CSV Outfile
-        day.to_csv(filepath/filename)
+        if infill_config is not None:
+            block = infill.fill_gaps(block, infill_config, interval)
+        data = block.iloc[core].set_axis(rows)
+    
+    # Fill the 'data' data frame with -9999 because we hate nans
+        data = data.fillna('-9999')
         
+        while current_date <= end_date and current_date < block_end:
+            print(current_date)
+    
+    # Set up a variable from 00z to the last record of the day using our 'data'
+    # data frame (a slice found by binary search, not a scan of every record)
+            today = streamstats.day_slice(data["TIMESTAMP"], current_date, interval)
+            day = data.iloc[today]
+    
+    # Create the Daily CSVs within desired directory
+            
+    ## File name that fills in the proper datetimes for the data
+            filename = "NWC_{}{:02d}{:02d}.dat".format(current_date.year, current_date.month, current_date.day)
+            print(filename)   
+    ## CSV Outfile (skipped if this day's QA-ed data has not changed)
+            csv_key = build_cache.key('daily-csv-1', day)
+            if not cache.fresh(filepath/filename, csv_key):
+                day.to_csv(filepath/filename)
+                cache.record(filepath/filename, csv_key)
+            
     ############################################################################################################################## 
     
     # QA-ed Summary Reports
     
-    ## Set up daily dataframe from 00z to 23:55z for both a parsed day and calculations
-        day = data.copy()
-        day.reset_index(inplace = True)
-        day['TIMESTAMP'] = pd.to_datetime(day['TIMESTAMP'])
-        
-        daystats = qa_stats.copy()
-        daystats.reset_index(inplace = True)
-        daystats['TIMESTAMP'] = pd.to_datetime(daystats['TIMESTAMP'])
-        
-    ## Clarify the start and end time for each day
-        start_time = datetime(current_date.year, current_date.month, current_date.day, 0, 0)
-        end_time = datetime(current_date.year, current_date.month, current_date.day, 23, 55)
-        
-        daily = day[(day["TIMESTAMP"] >= start_time) & ((day["TIMESTAMP"] <= end_time))]
-        dailystats = daystats[(daystats["TIMESTAMP"] >= start_time) & ((daystats["TIMESTAMP"] <= end_time))]
+    ## Daily dataframe from 00z to the last record of the day for the calculations
+            dailystats = qa_stats.iloc[today]
  
     ############################################################################################################################## 
     
     # Calculations
     
     ## Number of lines missing from the data file
-       ### Observations are taken at five minute intervals every hour for 24 hours.
-        obs = raw_datafile[(raw_datafile["TIMESTAMP"] >= datetime(current_date.year, current_date.month, current_date.day, 0, 0))
-                   & (raw_datafile["TIMESTAMP"] <= datetime(current_date.year, current_date.month, current_date.day, 23, 55))]
-        max_obs = ((60/5)*24)
-        missing = max_obs - len(obs)
-    
-    ## Maximum, minimum, and average temperature
-        max_temp = "{:8.2f}".format(dailystats["TAIR"].max())
-        min_temp = "{:8.2f}".format(dailystats["TAIR"].min())
-        avg_temp = "{:8.2f}".format(dailystats["TAIR"].mean())
-        
-    ## Maximum, minimum, and average wind speed
-        max_wind = "{:8.2f}".format(dailystats["WSPD"].max())
-        min_wind = "{:8.2f}".format(dailystats["WSPD"].min())
-        avg_wind = "{:8.2f}".format(dailystats["WSPD"].mean())
-        
-    ## Total Rainfall
-        total_rf = "{:8.2f}".format(dailystats["RAIN"].max())
+       ### Observations are taken once every record interval for 24 hours.
+            obs = raw_datafile.iloc[streamstats.day_slice(raw_datafile["TIMESTAMP"], current_date, interval)]
+            max_obs = streamstats.max_observations(interval)
+            missing = max_obs - len(obs)
     
-    ## Wind Chill
-        max_chill = "{:8.2f}".format(dailystats["CHIL"].max())
-        min_chill = "{:8.2f}".format(dailystats["CHIL"].min())
-        avg_chill = "{:8.2f}".format(dailystats["CHIL"].mean())
-        
+    ## Catalog entry for the daily file, with the raw records received
+            if coverage is not None:
+                coverage.add_day(settings.get('station', 'NWC0'), infill.observed(day), filepath/filename, len(obs))
+    
+    ## Maximum, minimum, and average of each report variable
+            section_name = qa_summary + ':' + filename
+            section_key = build_cache.key('report-day-1', filename, missing,
+                                          dailystats[streamstats.REPORT_VARIABLES])
+            section = cache.section(section_name, section_key)
+            if section is None:
+                stats = streamstats.DayStats()
+                for var in streamstats.REPORT_VARIABLES:
+                    stats.stats[var] = streamstats.RunningStats.from_array(dailystats[var])
+                section = streamstats.report_day(filename, missing, stats)
+                cache.record(section_name, section_key, section)
+            
     # Write the Summary Report File 
-        file.write("\n \t File: " + filename + "\n" "\t \t Missing Observations: " + str(missing) + "\n" +
-                   "\t \t Air Temperature (C):    Max: {:7}    Min: {:7}    Avg: {:7} \n".format(max_temp, min_temp, avg_temp) +
-                   "\t \t Wind Speed (m/s)   :    Max: {:7}    Min: {:7}    Avg: {:7} \n".format(max_wind, min_wind, avg_wind) +
-                   "\t \t Wind Chill (C)     :    Max: {:7}    Min: {:7}    Avg: {:7} \n".format(max_chill, min_chill, avg_chill) +
-                   "\t \t Precipitation (mm) :   {:7}".format(total_rf))
+            file.write(section)
+            
+    ## Observed and clear-sky insolation for the day
+            if (settings.get('solar') or {}).get('report'):
+                file.write(solar.report_day(dailystats['TIMESTAMP'], dailystats['SRAD'], settings,
+                                            settings.get('station', 'NWC0')))
+            
+    ## Where the day sits in the climatology, then add it to the sketches
+            if clim is not None:
+                day_values = {var: dailystats[var] for var in clim_config['variables']}
+                file.write(climatology.report_day(clim, clim_config, current_date, day_values))
+                clim.add_day(clim_config['station'], current_date, day_values)
+            
+    ## Extend the season-to-date accumulations with the day
+            if accumulations is not None:
+                accumulations.add_day(settings.get('station', 'NWC0'), current_date,
+                                      dailystats['TAIR'], dailystats['SRAD'])
+            
+            current_date += timedelta(days = 1)
         
-        current_date += timedelta(days = 1)
+        block_start = block_end
         
     file.close()
+    if clim is not None:
+        clim.save()
+    if coverage is not None:
+        coverage.close()
+    if accumulations is not None:
+        accumulations.close()
+    
+    # QA-ed observations of the whole period
+    qa_stats = pd.concat(observations)
+    del observations, raw_datafile
     
     ############################################################################################################################## 
 
-    # Wind Speed and Wind Gust Graph
-    fig, (ax1, ax2) = plt.subplots(2,1,figsize=(10,12)) 
-    ax1.set_title('NWC0 Wind Speed and Gust')
-    ax1.plot(daystats['TIMESTAMP'],daystats['WSPD'], color = 'green', linestyle = '--', label = 'Wind Speed', zorder = 2) 
-    ax1.set_xlim([settings['start_date'],settings['end_date']+timedelta(minutes=5)]) 
-    ax1.xaxis.set_major_formatter(mpl.dates.DateFormatter('%m-%d-%Y \n %H:%M Z')) 
-    ax1.set_xlabel('Wind Speed (m/s)')
-    
-    ax1.plot(daystats['TIMESTAMP'],daystats['WMAX'], color = '#000099', linestyle = '-', label = 'Wind Gust', zorder = 2)  
-    ax1.set_ylim(0,3)  
-    ax1.set_ylabel('Wind Gust')
-    ax1.grid(color='black', axis='y', linestyle='--', zorder = 1) 
-    
-    plt.legend()
+    # Wind Speed and Wind Gust Graph (skipped if the plotted data has not changed)
+    fig_path = settings['output_file_path'] + settings['wsg_fig']
+    fig_key = build_cache.key('wsg-fig-2', qa_stats[['TIMESTAMP', 'WSPD', 'WMAX']],
+                              build_cache.settings_keys(settings, 'start_date', 'end_date',
+                                                        'variable.wind_histogram_bins', 'figures.max_points'))
+    if not cache.fresh(fig_path, fig_key):
+        # Scan rate series are drawn as a min/max envelope (figures.py)
+        max_points = dict(figures.DEFAULT_FIGURES, **(settings.get('figures') or {}))['max_points']
+        times, wspd = figures.envelope(qa_stats['TIMESTAMP'], qa_stats['WSPD'], max_points)
+        times, wmax = figures.envelope(qa_stats['TIMESTAMP'], qa_stats['WMAX'], max_points)
+        
+        fig, (ax1, ax2) = plt.subplots(2,1,figsize=(10,12)) 
+        ax1.set_title('NWC0 Wind Speed and Gust')
+        ax1.plot(times,wspd, color = 'green', linestyle = '--', label = 'Wind Speed', zorder = 2) 
+        ax1.set_xlim([settings['start_date'],settings['end_date']+timedelta(seconds=interval)]) 
+        ax1.xaxis.set_major_formatter(mpl.dates.DateFormatter('%m-%d-%Y \n %H:%M Z')) 
+        ax1.set_xlabel('Wind Speed (m/s)')
+    
+        ax1.plot(times,wmax, color = '#000099', linestyle = '-', label = 'Wind Gust', zorder = 2)  
+        ax1.set_ylim(0,3)  
+        ax1.set_ylabel('Wind Gust')
+        ax1.grid(color='black', axis='y', linestyle='--', zorder = 1) 
+    
+        plt.legend()
 
-     ############################################################################################################################## 
-    
-    # Wind Gust Histogram in Subplot
-    ax2.set_title('Wind Gust Histogram')
-    ax2.hist(daystats['WMAX'], bins = settings['variable']['wind_histogram_bins'], zorder = 2) 
-    ax2.set_xlim(0,3) 
-    ax2.set_xlabel('Wind Gust (m/s)')
-    ax2.set_ylim(0,200)  
-    ax2.set_ylabel('Observations')
-    ax2.grid(color='black', axis='y', linestyle='--', zorder = 1) 
-    fig.savefig(settings['output_file_path'] + settings['wsg_fig'], dpi = 300) 
\ No newline at end of file
+         ############################################################################################################################## 
+    
+        # Wind Gust Histogram in Subplot
+        ax2.set_title('Wind Gust Histogram')
+        ax2.hist(qa_stats['WMAX'], bins = settings['variable']['wind_histogram_bins'], zorder = 2) 
+        ax2.set_xlim(0,3) 
+        ax2.set_xlabel('Wind Gust (m/s)')
+        ax2.set_ylim(0,200)  
+        ax2.set_ylabel('Observations')
+        ax2.grid(color='black', axis='y', linestyle='--', zorder = 1) 
+        fig.savefig(settings['output_file_path'] + settings['wsg_fig'], dpi = 300)
+        cache.record(fig_path, fig_key)
+    
+    # Weather events of the period into the station's events table
+    if (settings.get('events') or {}).get('directory'):
+        events.update_station(settings.get('station', 'NWC0'), qa_stats, settings)
+    
+    # Range min/max/sum index for queries over arbitrary time windows
+    if (settings.get('range_index') or {}).get('directory'):
+        rangeindex.update_station(settings.get('station', 'NWC0'), qa_stats, settings)
+    
+    # Station, month and day figures on a process pool
+    if (settings.get('figures') or {}).get('directory'):
+        rendered, unchanged = figures.render_all({settings.get('station', 'NWC0'): qa_stats}, settings)
+        print("Figures rendered: {}, unchanged: {}".format(rendered, unchanged))
+    
+    cache.record_run(run_key)
+    cache.save()
+    print("Outputs rebuilt: {}, unchanged: {}".format(cache.built, cache.skipped))
+ 
\ No newline at end of file
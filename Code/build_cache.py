@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:30:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: build_cache.py
+# Version: 1.1.0
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Dependency-tracked output cache. Every output (daily file, report section,
+#   figure) records a content hash of the data and settings keys it was built
+#   from, and a rerun skips the outputs whose hash has not changed.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - Whole runs keyed on the raw file stamps and settings
+#                        before ingest, so an unchanged rerun is skipped
+#
+# Inputs:
+#  * Data frames, settings values and recipe names an output depends on.
+#  * Size and modification time of the raw files and logger programs a run
+#    reads.
+#
+# Outputs:
+#  * Manifest (build_manifest.json) next to the outputs it describes.
+#
+# Notes:
+#   * Outputs are keyed on the data that goes straight into them (the QA-ed
+#     day, the plotted columns), not on the raw file. Changing one QA limit
+#     then only rebuilds the days and figures whose values actually change.
+#   * A run as a whole is keyed before anything is read, on the stamps (size
+#     and modification time) of its input files and on every setting. When
+#     neither changed and all its outputs are still there, nothing is merged,
+#     gridded or QA-ed at all. Otherwise the per-output keys above still skip
+#     the outputs whose data did not change.
+#   * Bump the recipe string passed to key() whenever the code that writes an
+#     output changes, so the old outputs are rebuilt. Delete the manifest (or
+#     set build_cache: false) to force a full run.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import hashlib
+import json
+import os
+import pandas as pd
+
+MANIFEST = 'build_manifest.json'
+
+# Manifest entry of the last whole run
+RUN = '<run>'
+
+
+# Feed one dependency into a running hash
+def _hash_part(h, part):
+    if isinstance(part, (pd.DataFrame, pd.Series)):
+        h.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+        h.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+    else:
+        h.update(json.dumps(part, sort_keys=True, default=str).encode())
+    h.update(b'\0')
+
+
+# Content hash of everything an output depends on
+def key(recipe, *parts):
+    h = hashlib.sha256(recipe.encode())
+    for part in parts:
+        _hash_part(h, part)
+    return h.hexdigest()
+
+
+# Size and modification time of every input file (None if it is missing), to
+# key a run before the files are read
+def file_stamps(paths):
+    stamps = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps[os.path.abspath(path)] = [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            stamps[os.path.abspath(path)] = None
+    return stamps
+
+
+# Values of the given (dotted) settings keys, e.g. 'variable.WSPD.QA'
+def settings_keys(settings, *names):
+    picked = {}
+    for name in names:
+        value = settings
+        for part in name.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        picked[name] = value
+    return picked
+
+
+# Manifest of the outputs in one directory and the keys they were built from
+class BuildCache:
+
+    def __init__(self, directory, enabled=True):
+        self.path = os.path.join(directory, MANIFEST)
+        self.enabled = enabled
+        self.entries = {}
+        self.built = self.skipped = 0
+        if enabled and os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+
+    # True if the output exists and was built from the same inputs
+    def fresh(self, output, build_key):
+        entry = self.entries.get(str(output))
+        hit = (self.enabled and entry is not None and entry['key'] == build_key
+               and ('text' in entry or os.path.exists(output)))
+        if hit:
+            self.skipped += 1
+        return hit
+
+    # Note that an output was (re)built from the given inputs
+    def record(self, output, build_key, text=None):
+        entry = {'key': build_key}
+        if text is not None:
+            entry['text'] = text
+        self.entries[str(output)] = entry
+        self.built += 1
+
+    # True if the last run had the same key and all of its outputs still exist
+    def run_fresh(self, build_key, outputs):
+        entry = self.entries.get(RUN)
+        return (self.enabled and entry is not None and entry['key'] == build_key
+                and all(os.path.exists(output) for output in outputs))
+
+    # Note the key of a completed run
+    def record_run(self, build_key):
+        self.entries[RUN] = {'key': build_key}
+
+    # Cached text of a report section, or None if it has to be rebuilt
+    def section(self, name, build_key):
+        return self.entries[name]['text'] if self.fresh(name, build_key) else None
+
+    def save(self):
+        if self.enabled:
+            with open(self.path, 'w') as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
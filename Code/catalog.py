@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: catalog.py
+# Version: 1.0.3
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   SQLite catalog of the daily CSV archive. Holds one row per station, day
+#   and variable with the record, missing and QA-fail counts, the first and
+#   last timestamps and the daily file it came from, so coverage and
+#   completeness questions are answered without opening any data files.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.0.1 - 10/19/2026 - interval_minutes may be a fraction (5 s tables)
+#   1.0.2 - 10/19/2026 - records is the raw records received, not the grid
+#   1.0.3 - 10/19/2026 - Daily files are read back without the infilled
+#                        (estimated) values
+#
+# Inputs:
+#  * YAML settings file (catalog block)
+#  * QA-ed daily data, from Programming Lab 6.py or the daily CSV archive.
+#
+# Outputs:
+#  * SQLite database (catalog: file in settings.yaml), table coverage.
+#
+# Usage:
+#   python catalog.py settings.yaml add NWC0 ../Data/csv/*.dat
+#   python catalog.py settings.yaml below 0.9 [--station NWC0] [--variable TAIR]
+#   python catalog.py settings.yaml summary
+#
+# Notes:
+#   * records is the number of raw records received for the day (passed in by
+#     Programming Lab 6.py; for daily files, the rows with any value). missing
+#     is the expected records without a value (gaps in the grid, records not
+#     on it and -9999 values), qa_fail the QA-flagged (-998) values.
+#   * completeness = good / expected, with good = expected - missing - qa_fail
+#     and expected the number of records in a full day at interval_minutes.
+#   * Rows are keyed on (station, day, variable), so rewriting a day replaces
+#     its rows instead of adding to them.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import sqlite3
+import yaml
+import pandas as pd
+import infill
+
+# Catalog settings used when the settings file leaves them out
+DEFAULT_CATALOG = {'file': '',
+                   'interval_minutes': 5}
+
+# Values in the daily files that are not observations
+MISSING = -9999
+QA_FLAG = -998
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS coverage (
+    station     TEXT    NOT NULL,
+    day         TEXT    NOT NULL,
+    variable    TEXT    NOT NULL,
+    records     INTEGER NOT NULL,
+    missing     INTEGER NOT NULL,
+    qa_fail     INTEGER NOT NULL,
+    expected    INTEGER NOT NULL,
+    first_time  TEXT,
+    last_time   TEXT,
+    path        TEXT,
+    PRIMARY KEY (station, day, variable)
+);
+CREATE INDEX IF NOT EXISTS coverage_day ON coverage (day);
+"""
+
+# Share of a day's expected records that are good observations
+COMPLETENESS = "CAST(expected - missing - qa_fail AS REAL) / expected"
+
+
+# Catalog settings merged over the defaults (None when turned off)
+def catalog_settings(settings):
+    config = dict(DEFAULT_CATALOG, **(settings.get('catalog') or {}))
+    return config if config['file'] else None
+
+
+class Catalog:
+
+    def __init__(self, path, interval_minutes=5):
+        self.expected = int(round(24 * 60 / interval_minutes))
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    # Catalog one day of QA-ed data (data frame with TIMESTAMP and variables)
+    # and the number of raw records received for it (None: the rows with any
+    # value)
+    def add_day(self, station, day, path=None, records=None):
+        times = pd.to_datetime(day['TIMESTAMP'])
+        values = day.drop(columns=['TIMESTAMP', 'RECORD'], errors='ignore')
+        values = values.apply(pd.to_numeric, errors='coerce')
+        absent = values.isna() | (values == MISSING)
+        off_grid = max(self.expected - len(day), 0)
+        missing = absent.sum() + off_grid
+        flagged = (values == QA_FLAG).sum()
+        good = ~(values.isna() | values.isin([MISSING, QA_FLAG]))
+        if records is None:
+            records = int((~absent).any(axis=1).sum())
+
+        rows = []
+        for var in values.columns:
+            seen = times[good[var].to_numpy()]
+            rows.append((station, times.iloc[0].strftime('%Y-%m-%d'), var, int(records),
+                         int(missing[var]), int(flagged[var]), self.expected,
+                         seen.min().isoformat(sep=' ') if len(seen) else None,
+                         seen.max().isoformat(sep=' ') if len(seen) else None,
+                         None if path is None else str(path)))
+        self.db.executemany("INSERT OR REPLACE INTO coverage VALUES (?,?,?,?,?,?,?,?,?,?)", rows)
+
+    # Days under a completeness threshold (0-1), worst first
+    def below(self, threshold, station=None, variable=None):
+        query = ("SELECT station, day, variable, " + COMPLETENESS + " AS completeness, path "
+                 "FROM coverage WHERE " + COMPLETENESS + " < ?")
+        args = [threshold]
+        if station:
+            query += " AND station = ?"
+            args.append(station)
+        if variable:
+            query += " AND variable = ?"
+            args.append(variable)
+        return self.db.execute(query + " ORDER BY completeness, station, day, variable", args).fetchall()
+
+    # First and last day, days catalogued and mean completeness per station/variable
+    def summary(self):
+        return self.db.execute("SELECT station, variable, MIN(day), MAX(day), COUNT(*), "
+                               "AVG(" + COMPLETENESS + ") FROM coverage "
+                               "GROUP BY station, variable ORDER BY station, variable").fetchall()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Archive coverage and completeness catalog')
+    parser.add_argument('settings', help='YAML settings file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='Catalog daily CSV files')
+    add.add_argument('station', help='Station the daily files belong to')
+    add.add_argument('files', nargs='+', help='Daily CSV files (NWC_YYYYMMDD.dat)')
+    below = commands.add_parser('below', help='Days under a completeness threshold')
+    below.add_argument('threshold', type=float, help='Completeness, 0-1')
+    below.add_argument('--station')
+    below.add_argument('--variable')
+    commands.add_parser('summary', help='Coverage per station and variable')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    config = catalog_settings(settings)
+    if config is None:
+        raise SystemExit("Set catalog: file: in the settings file first")
+    catalog = Catalog(config['file'], config['interval_minutes'])
+
+    if args.command == 'add':
+        for path in sorted(args.files):
+            catalog.add_day(args.station, infill.read_daily(path), path)
+        print("Catalogued {} daily files".format(len(args.files)))
+    elif args.command == 'below':
+        for station, day, var, completeness, path in catalog.below(args.threshold, args.station, args.variable):
+            print("{:6} {} {:5} {:6.1%}  {}".format(station, day, var, completeness, path or ''))
+    else:
+        for station, var, first, last, days, completeness in catalog.summary():
+            print("{:6} {:5} {} - {}  {:5} days  {:6.1%}".format(station, var, first, last, days, completeness))
+    catalog.close()
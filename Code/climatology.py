@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:30:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: climatology.py
+# Version: 1.1.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Multi-year climatology kept as mergeable t-digest quantile sketches, one
+#   per station, variable and day of year. Sketches are updated as each new
+#   day is processed, and give "how unusual is today" percentiles for the
+#   summary report without rescanning years of raw records.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - Daily max and mean kept in sketches of their own, so
+#                        the report ranks them against past daily values
+#   1.1.1 - 10/19/2026 - Daily files are read back without the infilled
+#                        (estimated) values
+#
+# Inputs:
+#  * YAML settings file (climatology block)
+#  * QA-ed daily data, from Programming Lab 6.py or the daily CSV archive.
+#
+# Outputs:
+#  * JSON climatology store (climatology: file in settings.yaml).
+#  * Percentile lines for the summary report.
+#
+# Usage:
+#   python climatology.py settings.yaml NWC0 ../Data/csv/NWC_2021*.dat
+#
+# Notes:
+#   * Days of the year are keyed by month and day (MM-DD), so Feb 29 gets its
+#     own sketch and leap years do not shift the rest of the calendar.
+#   * Percentiles are read from the sketches of the days within window_days
+#     of the requested day, merged on the fly.
+#   * Each (station, date) is only added once, so rerunning a day does not
+#     count it twice.
+#   * Every variable has three sketches per day of year: all its record
+#     values (the P10 / P50 / P90 of the report line), and each day's maximum
+#     and mean (VAR.max, VAR.mean). The day's max and average are ranked
+#     against the matching daily sketch; ranking them among the record values
+#     would always put the max near the top.
+#   * Stores written by version 1.0.0 have no daily sketches; build them again
+#     from the daily archive (delete the file, then run this script).
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import json
+import math
+import os
+import yaml
+import numpy as np
+from datetime import datetime, timedelta
+import infill
+
+# Climatology settings used when the settings file leaves them out
+DEFAULT_CLIMATOLOGY = {'file': '',
+                       'station': 'NWC0',
+                       'variables': ['TAIR', 'WSPD', 'WMAX'],
+                       'compression': 100,
+                       'window_days': 7}
+
+# Values in the daily files that are not observations
+MISSING_VALUES = [-9999, -998]
+
+# Daily summaries kept in sketches of their own (sketch name VAR.statistic)
+DAILY_STATISTICS = {'max': np.max, 'mean': np.mean}
+
+
+# Merging t-digest: a bounded set of weighted centroids that is small near the
+# tails and coarse in the middle, so extreme percentiles stay accurate.
+class TDigest:
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    # Add a batch of values (missing values are skipped)
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+        return self
+
+    # Fold another digest into this one
+    def merge(self, other):
+        if len(other.means):
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]),
+                           np.concatenate([self.weights, other.weights]))
+        return self
+
+    # Collapse sorted points into centroids, one per unit of the k1 scale
+    # function k(q) = compression / (2 pi) * asin(2q - 1)
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q - 1)
+        cluster = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.concatenate([[True], cluster[1:] != cluster[:-1]]))
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+    # Value at quantile q (0-1)
+    def quantile(self, q):
+        if not len(self.means):
+            return math.nan
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * total, np.concatenate([[0], centers, [total]]),
+                               np.concatenate([[self.min], self.means, [self.max]])))
+
+    # Fraction of values at or below x
+    def cdf(self, x):
+        if not len(self.means) or x != x:
+            return math.nan
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(x, np.concatenate([[self.min], self.means, [self.max]]),
+                               np.concatenate([[0], centers, [total]])) / total)
+
+    def to_dict(self):
+        return {'min': self.min, 'max': self.max,
+                'means': self.means.round(4).tolist(), 'weights': self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, d, compression=100):
+        digest = cls(compression)
+        digest.min, digest.max = d['min'], d['max']
+        digest.means = np.asarray(d['means'], dtype=float)
+        digest.weights = np.asarray(d['weights'], dtype=float)
+        return digest
+
+
+# Key of the day-of-year sketch for a date
+def day_key(date):
+    return "{:02d}-{:02d}".format(date.month, date.day)
+
+
+# Station / variable / day-of-year sketches saved as one JSON file
+class Climatology:
+
+    def __init__(self, path, compression=100):
+        self.path = path
+        self.compression = compression
+        self.digests = {}
+        self.days = {}
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                stored = json.load(f)
+            self.compression = stored['compression']
+            self.days = {station: set(days) for station, days in stored['days'].items()}
+            for station, variables in stored['digests'].items():
+                for var, keys in variables.items():
+                    for key, d in keys.items():
+                        self.digests[(station, var, key)] = TDigest.from_dict(d, self.compression)
+
+    # Add one day of QA-ed data ({variable: values}); False if already added
+    def add_day(self, station, date, values):
+        stamp = date.strftime('%Y-%m-%d')
+        if stamp in self.days.setdefault(station, set()):
+            return False
+        for var, series in values.items():
+            series = np.asarray(series, dtype=float)
+            valid = series[~np.isnan(series)]
+            self._digest(station, var, date).update(valid)
+            if len(valid):
+                for name, statistic in DAILY_STATISTICS.items():
+                    self._digest(station, var + '.' + name, date).update([statistic(valid)])
+        self.days[station].add(stamp)
+        return True
+
+    def _digest(self, station, name, date):
+        return self.digests.setdefault((station, name, day_key(date)), TDigest(self.compression))
+
+    # Sketch of every day within window days of date, merged together
+    def window(self, station, var, date, window):
+        digest = TDigest(self.compression)
+        for offset in range(-window, window + 1):
+            part = self.digests.get((station, var, day_key(date + timedelta(days=offset))))
+            if part is not None:
+                digest.merge(part)
+        return digest
+
+    def save(self):
+        stored = {'compression': self.compression,
+                  'days': {station: sorted(days) for station, days in self.days.items()},
+                  'digests': {}}
+        for (station, var, key), digest in sorted(self.digests.items()):
+            stored['digests'].setdefault(station, {}).setdefault(var, {})[key] = digest.to_dict()
+        with open(self.path, 'w') as f:
+            json.dump(stored, f)
+
+
+# Climatology settings merged over the defaults (None when turned off)
+def climatology_settings(settings):
+    config = dict(DEFAULT_CLIMATOLOGY, **(settings.get('climatology') or {}))
+    return config if config['file'] else None
+
+
+# Summary report lines: the spread of the variable's values around this day of
+# year, and where today's max and average fall among past daily maxima and means
+def report_day(clim, config, date, values):
+    lines = ""
+    for var in config['variables']:
+        digest = clim.window(config['station'], var, date, config['window_days'])
+        maxima = clim.window(config['station'], var + '.max', date, config['window_days'])
+        means = clim.window(config['station'], var + '.mean', date, config['window_days'])
+        series = np.asarray(values[var], dtype=float)
+        valid = series[~np.isnan(series)]
+        today_max = valid.max() if len(valid) else math.nan
+        today_avg = valid.mean() if len(valid) else math.nan
+        lines += ("\n\t \t Climatology {:4}    :    P10: {:8.2f}    P50: {:8.2f}    P90: {:8.2f}"
+                  "    Max at P{:3.0f}    Avg at P{:3.0f}").format(
+            var, digest.quantile(0.1), digest.quantile(0.5), digest.quantile(0.9),
+            100 * maxima.cdf(today_max), 100 * means.cdf(today_avg))
+    return lines
+
+
+# Read a daily file from the CSV archive back into {variable: values}
+def read_daily_file(path, variables):
+    day = infill.read_daily(path)
+    day = day.replace(MISSING_VALUES, np.nan)
+    return day['TIMESTAMP'].iloc[0], {var: day[var].to_numpy(dtype=float) for var in variables}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Add daily files to the climatology store')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('station', help='Station the daily files belong to')
+    parser.add_argument('files', nargs='+', help='Daily CSV files (NWC_YYYYMMDD.dat)')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    config = climatology_settings(settings)
+    if config is None:
+        raise SystemExit("Set climatology: file: in the settings file first")
+
+    clim = Climatology(config['file'], config['compression'])
+    added = 0
+    for path in sorted(args.files):
+        date, values = read_daily_file(path, config['variables'])
+        added += clim.add_day(args.station, datetime(date.year, date.month, date.day), values)
+    clim.save()
+    print("Added {} of {} days to {}".format(added, len(args.files), config['file']))
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: crbasic.py
+# Version: 1.1.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Parses the CRBasic datalogger programs in "Datalogger Code/" and compiles
+#   a schema for every DataTable they declare, so the TOA5 ingest knows the
+#   columns, units and dtypes up front instead of inferring them each run.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - Schema history across program versions: each raw
+#                        file is matched to the version that wrote it
+#   1.1.1 - 10/19/2026 - Headers are checked after field_aliases, and a table
+#                        of another name with the same fields (the program
+#                        run at another station) is read with a warning
+#
+# Inputs:
+#  * CRBasic program (e.g. "Datalogger Code/Lab 6.txt").
+#
+# Outputs:
+#  * Dictionary of compiled table schemas, optionally saved as JSON.
+#
+# Usage:
+#   python crbasic.py "../Datalogger Code/Lab 6.txt" -o NWC7_schema.json
+#
+# Notes:
+#   * Output fields come from FieldNames when given, otherwise from the
+#     source variable plus the usual suffix (TAIR_Avg, WDSP_Max, ...).
+#   * WindVector gets one field per name in FieldNames (one if there are
+#     none), since the number of outputs for each OutputOpt varies by OS.
+#   * Every FP2/IEEE4 field is read as float64 so the text values keep the
+#     same precision they had with pd.read_csv's own inference.
+#   * A station's history is the list of schemas of its program versions
+#     (logger_programs in settings.yaml, oldest first). A raw file is read
+#     with the version whose columns match its header, and union_columns
+#     gives the column set every version is widened to.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+# Output processing instructions and the code the logger writes for them in
+# the fourth line of a TOA5 header
+PROCESSING = {'Average': 'Avg', 'Maximum': 'Max', 'Minimum': 'Min',
+              'Sample': 'Smp', 'Totalize': 'Tot', 'StdDev': 'Std',
+              'Median': 'Med', 'WindVector': 'WVc'}
+
+# Argument holding the storage data type for each processing instruction
+STORAGE_ARG = {'Average': 2, 'Maximum': 2, 'Minimum': 2, 'Sample': 2,
+               'Totalize': 2, 'StdDev': 2, 'Median': 3, 'WindVector': 3}
+
+# Pandas dtype used to read each CRBasic storage type from a TOA5 file
+STORAGE_DTYPES = {'FP2': 'float64', 'IEEE4': 'float64', 'IEEE8': 'float64',
+                  'Long': 'int64', 'UINT2': 'int64', 'UINT4': 'int64',
+                  'Boolean': 'boolean', 'String': 'object'}
+
+# Seconds in each CRBasic interval unit
+INTERVAL_UNITS = {'usec': 1e-6, 'msec': 1e-3, 'sec': 1, 'min': 60,
+                  'hr': 3600, 'day': 86400}
+
+# Columns every TOA5 table starts with
+TOA5_LEADING = [{'name': 'TIMESTAMP', 'process': '', 'units': 'TS',
+                 'storage': None, 'dtype': 'datetime64[ns]'},
+                {'name': 'RECORD', 'process': '', 'units': 'RN',
+                 'storage': None, 'dtype': 'int64'}]
+
+INSTRUCTION = re.compile(r'^(\w+)\s*\((.*)\)$')
+
+
+# Drop a CRBasic comment (straight or curly apostrophe outside a string)
+def _strip_comment(line):
+    quoted = False
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char in "'‘’" and not quoted:
+            return line[:i].strip()
+    return line.strip()
+
+
+# Split an argument list on top-level commas
+def _split_args(text):
+    args, depth, quoted, current = [], 0, False, ''
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            args.append(current.strip())
+            current = ''
+            continue
+        current += char
+    args.append(current.strip())
+    return args
+
+
+# Length of an interval given as (value, unit) in seconds
+def _seconds(value, unit):
+    return float(value) * INTERVAL_UNITS[unit.lower()]
+
+
+# Default field name for a processing instruction (TAIR_Avg, WDSP_Max, ...)
+def _default_name(instruction, source, rep, reps):
+    base = re.sub(r'\(.*\)$', '', source)
+    name = base if instruction == 'Sample' else base + '_' + PROCESSING[instruction]
+    return name + '({})'.format(rep + 1) if reps > 1 else name
+
+
+# Parse a CRBasic program into its variables, units and table definitions
+def parse_program(text):
+    program = {'units': {}, 'aliases': {}, 'tables': [], 'called': [], 'scan_seconds': None}
+    table = None
+    for raw_line in text.splitlines():
+        line = _strip_comment(raw_line)
+        if not line:
+            continue
+        keyword = line.split(None, 1)[0]
+
+        if keyword == 'Alias':
+            target, alias = [part.strip() for part in line[len('Alias'):].split('=', 1)]
+            program['aliases'][alias] = target
+            continue
+        if keyword == 'Units':
+            name, unit = [part.strip() for part in line[len('Units'):].split('=', 1)]
+            program['units'][name] = unit
+            continue
+        if keyword == 'CallTable':
+            program['called'].append(line[len('CallTable'):].strip(' ()'))
+            continue
+        if keyword == 'EndTable':
+            program['tables'].append(table)
+            table = None
+            continue
+
+        match = INSTRUCTION.match(line)
+        if not match:
+            continue
+        name, args = match.group(1), _split_args(match.group(2))
+
+        if name == 'DataTable':
+            table = {'table': args[0], 'interval_seconds': None, 'outputs': []}
+        elif name == 'Scan':
+            program['scan_seconds'] = _seconds(args[0], args[1])
+        elif table is None:
+            continue
+        elif name == 'DataInterval':
+            table['interval_seconds'] = _seconds(args[1], args[2])
+        elif name in PROCESSING:
+            reps = int(args[0])
+            sources = args[1:3] if name == 'WindVector' else args[1:2]
+            table['outputs'].append({'instruction': name, 'reps': reps,
+                                     'sources': sources,
+                                     'storage': args[STORAGE_ARG[name]],
+                                     'names': None})
+        elif name == 'FieldNames' and table['outputs']:
+            names = args[0].strip('"').split(',')
+            table['outputs'][-1]['names'] = [n.split(':')[0].strip() for n in names]
+    return program
+
+
+# Compile one parsed table into the schema the ingest stage reads with
+def _compile_table(program, table):
+    fields = []
+    for output in table['outputs']:
+        instruction, reps, sources = output['instruction'], output['reps'], output['sources']
+        names = output['names'] or []
+        count = len(names) if instruction == 'WindVector' and names else reps
+        for rep in range(count):
+            name = names[rep] if rep < len(names) else _default_name(
+                instruction, sources[0], rep, count)
+            source = sources[-1] if instruction == 'WindVector' else sources[0]
+            units = program['units'].get(name, program['units'].get(source, ''))
+            fields.append({'name': name,
+                           'source': source,
+                           'process': PROCESSING[instruction],
+                           'units': units,
+                           'storage': output['storage'],
+                           'dtype': STORAGE_DTYPES.get(output['storage'], 'float64')})
+
+    columns = TOA5_LEADING + fields
+    return {'table': table['table'],
+            'interval_seconds': table['interval_seconds'],
+            'scan_seconds': program['scan_seconds'],
+            'fields': columns,
+            'columns': [f['name'] for f in columns],
+            'dtypes': {f['name']: f['dtype'] for f in columns if f['name'] != 'TIMESTAMP'}}
+
+
+# Compile every DataTable in a CRBasic program file into a schema
+def compile_program(path):
+    program = parse_program(Path(path).read_text(encoding='utf-8'))
+    schemas = {}
+    for table in program['tables']:
+        schema = _compile_table(program, table)
+        schema['program'] = Path(path).name
+        schema['warnings'] = []
+        if table['table'] not in program['called']:
+            schema['warnings'].append('Table {} is never called (CallTable {})'.format(
+                table['table'], ', '.join(program['called']) or 'missing'))
+        schemas[table['table']] = schema
+    return schemas
+
+
+# Save compiled schemas as JSON so later runs can skip the parse
+def save_schemas(schemas, path):
+    with open(path, 'w') as f:
+        json.dump(schemas, f, indent=2)
+
+
+# Load compiled schemas from JSON, or compile them from a CRBasic program
+def load_schemas(path):
+    if Path(path).suffix.lower() == '.json':
+        with open(path, 'r') as f:
+            return json.load(f)
+    return compile_program(path)
+
+
+# Check the field names of a TOA5 header against a compiled schema; aliases
+# ({logger name: name used here}) are applied to both sides first, so a
+# renamed field still matches
+def validate_header(meta, schema, aliases=None):
+    fields, columns = _aliased(meta['fields'], aliases), _aliased(schema['columns'], aliases)
+    if fields != columns:
+        missing = [c for c in columns if c not in fields]
+        extra = [c for c in fields if c not in columns]
+        raise ValueError('{} does not match table {} from {} (missing: {}, unexpected: {})'.format(
+            meta.get('path', 'TOA5 header'), schema['table'], schema.get('program', 'schema'),
+            missing or 'none', extra or 'none'))
+    if meta.get('table') and meta['table'] != schema['table']:
+        print('\t Warning: {} holds table {}, read with the layout of table {}'.format(
+            meta.get('path', 'TOA5 header'), meta['table'], schema['table']), file=sys.stderr)
+
+
+# Field names with aliases applied
+def _aliased(names, aliases):
+    aliases = aliases or {}
+    return [aliases.get(c, c) for c in names]
+
+
+# Schemas of a station's program versions, oldest first: the given table, or
+# else the first table each program calls (or declares)
+def load_history(paths, table=None):
+    history = []
+    for path in paths:
+        schemas = load_schemas(path)
+        if table and table in schemas:
+            history.append(schemas[table])
+            continue
+        called = [s for s in schemas.values() if not s.get('warnings')]
+        history.append(called[0] if called else next(iter(schemas.values())))
+    return history
+
+
+# Schema (or history list) named in the settings file, or None to trust the
+# raw headers
+def schema_from_settings(settings):
+    if settings.get("logger_programs"):
+        return load_history(settings["logger_programs"], settings.get("logger_table"))
+    if settings.get("logger_program"):
+        schemas = load_schemas(settings["logger_program"])
+        return schemas[settings.get("logger_table") or next(iter(schemas))]
+    return None
+
+
+# Version of a schema history that wrote a TOA5 file, matched on its fields
+# after aliases (and table name when several versions share the same fields)
+def match_schema(meta, history, aliases=None):
+    fields = _aliased(meta['fields'], aliases)
+    matches = [schema for schema in history if _aliased(schema['columns'], aliases) == fields]
+    named = [schema for schema in matches if schema['table'] == meta.get('table')]
+    if named or matches:
+        return (named or matches)[-1]
+    raise ValueError('{} matches no program version ({}); fields: {}'.format(
+        meta.get('path', 'TOA5 header'), ', '.join(s.get('program', s['table']) for s in history),
+        meta['fields']))
+
+
+# Every column of a schema history, in the newest version's order with the
+# columns later versions dropped after them
+def union_columns(history):
+    columns = []
+    for schema in reversed(history):
+        columns += [c for c in schema['columns'] if c not in columns]
+    return columns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compile DataTable schemas from a CRBasic program')
+    parser.add_argument('program', help='CRBasic program file')
+    parser.add_argument('-o', '--output', help='JSON file to save the compiled schemas to')
+    args = parser.parse_args()
+
+    schemas = compile_program(args.program)
+    for schema in schemas.values():
+        print(schema['table'], schema['columns'])
+        for warning in schema['warnings']:
+            print('\t Warning:', warning)
+    if args.output:
+        save_schemas(schemas, args.output)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: degree_days.py
+# Version: 1.0.2
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Incremental accumulation products for agricultural users: growing,
+#   heating and cooling degree days and cumulative insolation, season to
+#   date, per station. Each day's contribution and the running totals up to
+#   that day are stored, so a new day only extends the totals and a
+#   season-to-date value is a single row lookup.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.0.1 - 10/19/2026 - Out-of-order days rebuild the totals once, not per day
+#   1.0.2 - 10/19/2026 - Daily files are read back without the infilled
+#                        (estimated) values
+#
+# Inputs:
+#  * YAML settings file (accumulation block)
+#  * QA-ed daily TAIR and SRAD, from Programming Lab 6.py or the daily CSV
+#    archive.
+#
+# Outputs:
+#  * SQLite database (accumulation: file in settings.yaml), table daily.
+#
+# Usage:
+#   python degree_days.py settings.yaml add NWC0 ../Data/csv/*.dat
+#   python degree_days.py settings.yaml query NWC0 2021-02-03
+#   python degree_days.py settings.yaml rebuild NWC0
+#
+# Notes:
+#   * GDD = max(0, (min(Tmax, gdd_cap) + max(Tmin, gdd_base)) / 2 - gdd_base)
+#     HDD = max(0, hdd_base - Tmean), CDD = max(0, Tmean - cdd_base), with
+#     Tmean = (Tmax + Tmin) / 2 of the day's QA-ed 5 minute TAIR.
+#   * Every product has its own season start (MM-DD); totals restart at it.
+#   * Days with less than min_fraction of their TAIR (or SRAD) records add
+#     nothing to that product's total.
+#   * Adding a day before the last stored day, or re-adding a day, marks the
+#     station's totals stale from that day on. They are rebuilt once, from the
+#     start of the earliest season it falls in, at the next season_to_date or
+#     close, so backfilling N days costs one rebuild instead of N.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import sqlite3
+import yaml
+import numpy as np
+import pandas as pd
+from datetime import datetime
+import infill
+import solar
+
+# Accumulation settings used when the settings file leaves them out
+DEFAULT_ACCUMULATION = {'file': '',
+                        'gdd_base': 10.0,
+                        'gdd_cap': 30.0,
+                        'hdd_base': 18.3,
+                        'cdd_base': 18.3,
+                        'min_fraction': 0.8,
+                        'interval_minutes': 5,
+                        'seasons': {'gdd': '04-01', 'hdd': '07-01', 'cdd': '01-01', 'insolation': '01-01'}}
+
+# Accumulated products (insolation in MJ/m^2, the rest in degree days C)
+PRODUCTS = ['gdd', 'hdd', 'cdd', 'insolation']
+
+# Values in the daily files that are not observations
+MISSING_VALUES = [-9999, -998]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily (
+    station         TEXT NOT NULL,
+    day             TEXT NOT NULL,
+    tmax            REAL,
+    tmin            REAL,
+    gdd             REAL,
+    hdd             REAL,
+    cdd             REAL,
+    insolation      REAL,
+    gdd_total       REAL NOT NULL,
+    hdd_total       REAL NOT NULL,
+    cdd_total       REAL NOT NULL,
+    insolation_total REAL NOT NULL,
+    PRIMARY KEY (station, day)
+);
+"""
+
+COLUMNS = ['station', 'day', 'tmax', 'tmin'] + PRODUCTS + [product + '_total' for product in PRODUCTS]
+
+
+# Accumulation settings merged over the defaults (None when turned off)
+def accumulation_settings(settings):
+    config = dict(DEFAULT_ACCUMULATION, **(settings.get('accumulation') or {}))
+    config['seasons'] = dict(DEFAULT_ACCUMULATION['seasons'], **config['seasons'])
+    return config if config['file'] else None
+
+
+# Start of the season a day falls in, for a season starting on MM-DD
+def season_start(day, start):
+    month, dom = (int(part) for part in start.split('-'))
+    begin = datetime(day.year, month, dom)
+    return begin if begin <= day else datetime(day.year - 1, month, dom)
+
+
+# One day's contributions from its QA-ed TAIR and SRAD records
+def contributions(tair, srad, config):
+    expected = 24 * 60 / config['interval_minutes']
+    tair = pd.to_numeric(pd.Series(tair), errors='coerce').replace(MISSING_VALUES, np.nan).dropna()
+    srad = pd.to_numeric(pd.Series(srad), errors='coerce').replace(MISSING_VALUES, np.nan)
+    day = {'tmax': None, 'tmin': None, 'gdd': None, 'hdd': None, 'cdd': None, 'insolation': None}
+    if len(tair) >= config['min_fraction'] * expected:
+        tmax, tmin = float(tair.max()), float(tair.min())
+        tmean = (tmax + tmin) / 2
+        day.update(tmax=tmax, tmin=tmin,
+                   gdd=max(0.0, (min(tmax, config['gdd_cap']) + max(tmin, config['gdd_base'])) / 2
+                           - config['gdd_base']),
+                   hdd=max(0.0, config['hdd_base'] - tmean),
+                   cdd=max(0.0, tmean - config['cdd_base']))
+    if srad.notna().sum() >= config['min_fraction'] * expected:
+        day['insolation'] = float(solar.insolation(srad.to_numpy(), config['interval_minutes']))
+    return day
+
+
+class Accumulations:
+
+    def __init__(self, path, config):
+        self.config = config
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        # Earliest day of each station whose later totals need rebuilding
+        self.stale = {}
+
+    # Most recent stored row for a station on or before a day (None if none)
+    def _latest(self, station, day, before=False):
+        row = self.db.execute("SELECT * FROM daily WHERE station = ? AND day " + ('<' if before else '<=')
+                              + " ? ORDER BY day DESC LIMIT 1", (station, day.strftime('%Y-%m-%d'))).fetchone()
+        return None if row is None else dict(zip(COLUMNS, row))
+
+    # Add (or replace) one day of QA-ed TAIR and SRAD; the totals are carried
+    # on from the day before, and later days are marked for rebuilding
+    def add_day(self, station, day, tair, srad):
+        day = datetime(day.year, day.month, day.day)
+        stamp = day.strftime('%Y-%m-%d')
+        row = dict(station=station, day=stamp, **contributions(tair, srad, self.config))
+        previous = self._latest(station, day, before=True)
+        for product in PRODUCTS:
+            carried = 0.0
+            if previous is not None:
+                begin = season_start(day, self.config['seasons'][product])
+                if datetime.strptime(previous['day'], '%Y-%m-%d') >= begin:
+                    carried = previous[product + '_total']
+            row[product + '_total'] = carried + (row[product] or 0.0)
+        self.db.execute("INSERT OR REPLACE INTO daily VALUES (" + ",".join("?" * len(COLUMNS)) + ")",
+                        [row[column] for column in COLUMNS])
+        later = self.db.execute("SELECT 1 FROM daily WHERE station = ? AND day > ? LIMIT 1",
+                                (station, stamp)).fetchone()
+        if later:
+            self.stale[station] = min(day, self.stale.get(station, day))
+
+    # Rebuild the stale totals of every station
+    def flush(self):
+        for station, since in sorted(self.stale.items()):
+            self.rebuild(station, since)
+        self.stale.clear()
+
+    # Recompute the running totals of a station from a day on (whole history
+    # if since is None) from the stored contributions of the seasons it is in
+    def rebuild(self, station, since=None):
+        first = '0000-00-00'
+        if since is not None:
+            first = min(season_start(since, start) for start in self.config['seasons'].values()).strftime('%Y-%m-%d')
+        rows = pd.read_sql_query("SELECT * FROM daily WHERE station = ? AND day >= ? ORDER BY day", self.db,
+                                 params=(station, first), parse_dates=['day'])
+        if not len(rows):
+            return
+        for product in PRODUCTS:
+            start = self.config['seasons'][product]
+            season = rows['day'].map(lambda day: season_start(day.to_pydatetime(), start))
+            rows[product + '_total'] = rows[product].fillna(0.0).groupby(season).cumsum()
+        if since is not None:
+            rows = rows[rows['day'] >= pd.Timestamp(since)]
+        self.db.executemany("UPDATE daily SET gdd_total = ?, hdd_total = ?, cdd_total = ?, insolation_total = ? "
+                            "WHERE station = ? AND day = ?",
+                            [(r.gdd_total, r.hdd_total, r.cdd_total, r.insolation_total, station,
+                              r.day.strftime('%Y-%m-%d')) for r in rows.itertuples()])
+
+    # Season-to-date totals of every product for a station on a day
+    def season_to_date(self, station, day):
+        self.flush()
+        day = datetime(day.year, day.month, day.day)
+        row = self._latest(station, day)
+        totals = {}
+        for product in PRODUCTS:
+            begin = season_start(day, self.config['seasons'][product])
+            current = row is not None and datetime.strptime(row['day'], '%Y-%m-%d') >= begin
+            totals[product] = row[product + '_total'] if current else 0.0
+        return totals
+
+    def close(self):
+        self.flush()
+        self.db.commit()
+        self.db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Season-to-date degree days and insolation')
+    parser.add_argument('settings', help='YAML settings file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='Add daily CSV files (backfill)')
+    add.add_argument('station', help='Station the daily files belong to')
+    add.add_argument('files', nargs='+', help='Daily CSV files (NWC_YYYYMMDD.dat)')
+    query = commands.add_parser('query', help='Season-to-date totals on a day')
+    query.add_argument('station')
+    query.add_argument('day', help='YYYY-MM-DD')
+    rebuild = commands.add_parser('rebuild', help='Recompute every running total of a station')
+    rebuild.add_argument('station')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    config = accumulation_settings(settings)
+    if config is None:
+        raise SystemExit("Set accumulation: file: in the settings file first")
+    accumulations = Accumulations(config['file'], config)
+
+    if args.command == 'add':
+        for path in sorted(args.files):
+            day = infill.read_daily(path)
+            accumulations.add_day(args.station, day['TIMESTAMP'].iloc[0], day['TAIR'], day['SRAD'])
+        print("Added {} days".format(len(args.files)))
+    elif args.command == 'rebuild':
+        accumulations.stale.pop(args.station, None)
+        accumulations.rebuild(args.station)
+    else:
+        totals = accumulations.season_to_date(args.station, datetime.strptime(args.day, '%Y-%m-%d'))
+        for product in PRODUCTS:
+            print("{:10} {:10.2f}  (season from {})".format(product, totals[product], config['seasons'][product]))
+    accumulations.close()
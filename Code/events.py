@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: events.py
+# Version: 1.0.2
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Weather event detection. Finds rain events, sub-freezing spells, gust
+#   episodes (or any other threshold event set up in settings.yaml) as runs
+#   of records meeting a condition, and keeps their start, end, duration and
+#   peak in an events table per station.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.0.1 - 10/19/2026 - Rain events from the per-record RAIN amounts
+#   1.0.2 - 10/19/2026 - Daily files are read back without the infilled
+#                        (estimated) values
+#
+# Inputs:
+#  * YAML settings file (events block)
+#  * QA-ed data for a station (QA flags and missing values as NaN or -998 /
+#    -9999), from Programming Lab 6.py or the daily CSV archive.
+#
+# Outputs:
+#  * Events table in events: directory, as STATION_events.csv
+#
+# Usage:
+#   python events.py settings.yaml NWC0 ../Data/csv/*.dat
+#
+# Notes:
+#   * Every event type is a variable compared with a threshold (above or
+#     below). Runs of matching records separated by no more than join_minutes
+#     are one event, and events shorter than min_minutes are dropped.
+#   * RAIN is the rain of each record (the logger totalizes it over the
+#     output interval), so rain events are records with RAIN > 0 and their
+#     total is the sum of those amounts (total: true).
+#   * increments: true is for a variable logged as a running total instead:
+#     events are detected on its rise between records (a drop is taken as a
+#     reset) and the total is the sum of the rises.
+#   * Runs, joins and peaks are found with run-length encoding and reduceat,
+#     so one pass over the archive is O(N).
+#   * Updating a station's table replaces the events that start inside the
+#     processed time range and keeps the rest.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import os
+import yaml
+import numpy as np
+import pandas as pd
+import infill
+
+# Event settings used when the settings file leaves them out
+DEFAULT_EVENTS = {'directory': '',
+                  'interval_minutes': 5,
+                  'types': {'rain': {'variable': 'RAIN', 'total': True, 'above': 0.0,
+                                     'min_minutes': 0, 'join_minutes': 60},
+                            'freeze': {'variable': 'TAIR', 'below': 0.0,
+                                       'min_minutes': 60, 'join_minutes': 0},
+                            'gust': {'variable': 'WMAX', 'above': 15.0,
+                                     'min_minutes': 0, 'join_minutes': 30}}}
+
+# Values in the data that are not observations
+MISSING_VALUES = [-9999, -998]
+
+COLUMNS = ['station', 'event', 'start', 'end', 'duration_minutes', 'peak', 'peak_time', 'total']
+
+
+# Event settings merged over the defaults (None when turned off)
+def events_settings(settings):
+    config = dict(DEFAULT_EVENTS, **(settings.get('events') or {}))
+    return config if config['directory'] else None
+
+
+# Rise of a cumulative variable since the previous record (a drop is a reset,
+# so the new value is all rise)
+def increments(values):
+    rise = np.diff(values, prepend=np.nan)
+    return np.where(rise < 0, values, rise)
+
+
+# Runs of records meeting the condition, as (first, last) record index arrays.
+# A run ends where the condition changes or the time grid jumps.
+def runs(condition, times, step):
+    breaks = np.concatenate([[True], (condition[1:] != condition[:-1]) | (np.diff(times) > step)])
+    starts = np.flatnonzero(breaks)
+    ends = np.concatenate([starts[1:] - 1, [len(condition) - 1]])
+    meets = condition[starts]
+    return starts[meets], ends[meets]
+
+
+# Reduce values over each [first, last] record range in one reduceat call
+def reduce_ranges(ufunc, values, first, last, pad):
+    bounds = np.column_stack([first, last + 1]).ravel()
+    return ufunc.reduceat(np.append(values, pad), bounds)[::2]
+
+
+# Events of one type: data frame of start, end, duration, peak, peak time, total
+def detect(times, values, spec, interval_minutes=5):
+    values = np.asarray(values, dtype=float)
+    values = np.where(np.isin(values, MISSING_VALUES), np.nan, values)
+    if spec.get('increments'):
+        values = increments(values)
+    above = 'above' in spec
+    with np.errstate(invalid='ignore'):
+        condition = values > spec['above'] if above else values < spec['below']
+    step = np.timedelta64(int(interval_minutes * 60), 's')
+    first, last = runs(condition, times, step) if len(values) else ([], [])
+    if not len(first):
+        return pd.DataFrame(columns=COLUMNS[2:])
+
+    # Join runs that are no more than join_minutes apart
+    between = times[first[1:]] - times[last[:-1]] - step
+    apart = between > np.timedelta64(int(spec.get('join_minutes', 0) * 60), 's')
+    first = first[np.concatenate([[True], apart])]
+    last = last[np.concatenate([apart, [True]])]
+
+    duration = (times[last] - times[first]) / np.timedelta64(1, 'm') + interval_minutes
+    long_enough = duration >= spec.get('min_minutes', 0)
+    first, last, duration = first[long_enough], last[long_enough], duration[long_enough]
+    if not len(first):
+        return pd.DataFrame(columns=COLUMNS[2:])
+
+    # Peak of each event and the first record that reaches it
+    fill = -np.inf if above else np.inf
+    filled = np.where(np.isnan(values), fill, values)
+    peak = reduce_ranges(np.maximum if above else np.minimum, filled, first, last, fill)
+    event = np.cumsum(np.bincount(first, minlength=len(values)))[:len(values)] - 1
+    hit = (event >= 0) & (filled == peak[np.maximum(event, 0)])
+    index = np.where(hit, np.arange(len(values)), len(values))
+    peak_index = reduce_ranges(np.minimum, index, first, last, len(values))
+    if spec.get('total') or spec.get('increments'):
+        total = reduce_ranges(np.add, np.nan_to_num(values), first, last, 0.0)
+    else:
+        total = np.full(len(first), np.nan)
+
+    return pd.DataFrame({'start': times[first], 'end': times[last], 'duration_minutes': duration,
+                         'peak': peak, 'peak_time': times[peak_index], 'total': total},
+                        columns=COLUMNS[2:])
+
+
+# Every configured event type for one station, sorted by start time
+def detect_station(station, data, config):
+    times = pd.to_datetime(data['TIMESTAMP']).to_numpy()
+    order = np.argsort(times, kind='stable')
+    found = []
+    for name, spec in config['types'].items():
+        if spec['variable'] not in data:
+            continue
+        values = pd.to_numeric(data[spec['variable']], errors='coerce').to_numpy(dtype=float)[order]
+        events = detect(times[order], values, spec, config['interval_minutes'])
+        if len(events):
+            events.insert(0, 'event', name)
+            found.append(events)
+    table = pd.concat(found, ignore_index=True) if found else pd.DataFrame(columns=COLUMNS[1:])
+    table.insert(0, 'station', station)
+    return table.sort_values(['start', 'event'], kind='stable').reset_index(drop=True)
+
+
+# Detect a station's events in data and update its events table: events that
+# start inside the data's time range are replaced, the rest are kept
+def update_station(station, data, settings):
+    config = events_settings(settings)
+    events = detect_station(station, data, config)
+    path = os.path.join(config['directory'], "{}_events.csv".format(station))
+    if os.path.exists(path):
+        table = pd.read_csv(path, parse_dates=['start', 'end', 'peak_time'])
+        times = pd.to_datetime(data['TIMESTAMP'])
+        inside = (table['start'] >= times.min()) & (table['start'] <= times.max())
+        events = pd.concat([part for part in (table[~inside], events) if len(part)] or [events],
+                           ignore_index=True)
+        events = events.sort_values(['start', 'event'], kind='stable')
+    os.makedirs(config['directory'], exist_ok=True)
+    events.to_csv(path, index=False)
+    return events
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Detect weather events and update the events table')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('station', help='Station the daily files belong to')
+    parser.add_argument('files', nargs='+', help='Daily CSV files (NWC_YYYYMMDD.dat)')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    if events_settings(settings) is None:
+        raise SystemExit("Set events: directory: in the settings file first")
+    data = pd.concat([infill.read_daily(path)
+                      for path in sorted(args.files)], ignore_index=True)
+    events = update_station(args.station, data, settings)
+    print(events.groupby('event').size().to_string() if len(events) else "No events")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:30:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: figures.py
+# Version: 1.2.2
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Batch figure stage. Renders the wind speed / gust graph with histogram for
+#   every station, day and month on a process pool with the non-interactive
+#   Agg backend, and skips figures whose data has not changed.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - Long (scan rate) series are drawn as a min/max
+#                        envelope of at most max_points points
+#   1.2.0 - 10/19/2026 - wind_job / render also draw to an open file (PNG
+#                        bytes for service.py)
+#   1.2.1 - 10/19/2026 - Figure keys include max_points
+#   1.2.2 - 10/19/2026 - Daily files are read back without the infilled
+#                        (estimated) values
+#
+# Inputs:
+#  * YAML settings file (figures block, variable wind_histogram_bins)
+#  * QA-ed data for each station, from Programming Lab 6.py or the daily CSV
+#    archive (one directory of NWC_YYYYMMDD.dat files per station).
+#
+# Outputs:
+#  * PNG figures in figures: directory, as STATION/PERIOD/STATION_LABEL_wind.png
+#
+# Usage:
+#   python figures.py settings.yaml NWC0=../Data/csv NWC7=/path/to/NWC7/csv
+#
+# Notes:
+#   * Each worker builds the figure, axes, lines and styling once and then
+#     only swaps the data, limits and histogram bars for every figure it
+#     renders, instead of calling plt.subplots for each one.
+#   * Figures are keyed with build_cache.py on the data they plot, so a rerun
+#     only renders the days and months that changed.
+#   * A series longer than max_points is cut into max_points / 2 runs and
+#     each run drawn as its minimum and maximum, so peaks survive while a
+#     month of 5 s records stays a few thousand points. The histogram is
+#     still counted from every record.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import glob
+import os
+import yaml
+import numpy as np
+import pandas as pd
+import matplotlib as mpl
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import build_cache
+import infill
+
+# Figure settings used when the settings file leaves them out
+DEFAULT_FIGURES = {'directory': '',
+                   'periods': ['station', 'month', 'day'],
+                   'dpi': 150,
+                   'workers': 0,
+                   'max_points': 4000}
+
+# Period name -> pandas period frequency used to split a station's data
+PERIODS = {'day': 'D', 'month': 'M'}
+
+# Values in the daily files that are not observations
+MISSING_VALUES = [-9999, -998]
+
+# Figure template of this worker process (built on first use)
+_template = None
+
+
+# Switch a worker process to the non-interactive backend
+def _init_worker():
+    mpl.use('Agg')
+
+
+# Build the wind figure once per process; later jobs only swap in new data
+def _get_template(bins):
+    global _template
+    if _template is None:
+        import matplotlib.pyplot as plt
+        fig, (ax1, ax2) = plt.subplots(2,1,figsize=(10,12))
+        wspd, = ax1.plot([], [], color = 'green', linestyle = '--', label = 'Wind Speed', zorder = 2)
+        wmax, = ax1.plot([], [], color = '#000099', linestyle = '-', label = 'Wind Gust', zorder = 2)
+        ax1.xaxis.set_major_formatter(mpl.dates.DateFormatter('%m-%d-%Y \n %H:%M Z'))
+        ax1.set_xlabel('Wind Speed (m/s)')
+        ax1.set_ylabel('Wind Gust')
+        ax1.grid(color='black', axis='y', linestyle='--', zorder = 1)
+        ax1.legend()
+        ax2.set_title('Wind Gust Histogram')
+        ax2.set_xlim(bins[0], bins[-1])
+        ax2.set_xlabel('Wind Gust (m/s)')
+        ax2.set_ylabel('Observations')
+        ax2.grid(color='black', axis='y', linestyle='--', zorder = 1)
+        _template = {'fig': fig, 'ax1': ax1, 'ax2': ax2, 'wspd': wspd, 'wmax': wmax, 'bars': None}
+    return _template
+
+
+# Min/max envelope of a series for plotting; series of up to points records
+# are returned as they are
+def envelope(times, values, points):
+    times = np.asarray(times)
+    values = np.asarray(values, dtype=float)
+    if len(values) <= points:
+        return times, values
+    starts = np.unique(np.linspace(0, len(values), points // 2, endpoint=False).astype(np.int64))
+    ends = np.append(starts[1:], len(values)) - 1
+    low = np.fmin.reduceat(values, starts)
+    high = np.fmax.reduceat(values, starts)
+    return np.column_stack([times[starts], times[ends]]).ravel(), np.column_stack([low, high]).ravel()
+
+
+# Render one figure job: (path, title, start, end, times, wspd, wmax,
+# histogram counts, bins, dpi). path may also be an open binary file.
+def render(job):
+    path, title, start, end, times, wspd, wmax, counts, bins, dpi = job
+    t = _get_template(bins)
+    t['ax1'].set_title(title)
+    t['wspd'].set_data(times, wspd)
+    t['wmax'].set_data(times, wmax)
+    t['ax1'].set_xlim([start, end])
+    top = np.nanmax(np.concatenate([wspd, wmax, [0]]))
+    t['ax1'].set_ylim(0, max(3, np.ceil(top)))
+
+    if t['bars'] is not None:
+        t['bars'].remove()
+    edges = np.asarray(bins, dtype=float)
+    t['bars'] = t['ax2'].bar(edges[:-1], counts, width=np.diff(edges), align='edge', color='C0', zorder = 2)
+    t['ax2'].set_ylim(0, max(200, counts.max() * 1.1))
+
+    if isinstance(path, str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    t['fig'].savefig(path, dpi = dpi, format = 'png')
+    return path
+
+
+# Figure job for one piece of a station's data (TIMESTAMP, WSPD, WMAX with
+# missing values as NaN), drawn over the whole days it covers
+def wind_job(path, station, piece, config, bins):
+    start = piece['TIMESTAMP'].iloc[0].normalize()
+    end = piece['TIMESTAMP'].iloc[-1].normalize() + timedelta(days=1)
+    times = piece['TIMESTAMP'].to_numpy()
+    wmax = piece['WMAX'].to_numpy(dtype=float)
+    counts, _ = np.histogram(wmax[~np.isnan(wmax)], bins=bins)
+    shown, wspd = envelope(times, piece['WSPD'].to_numpy(dtype=float), config['max_points'])
+    shown, wmax = envelope(times, wmax, config['max_points'])
+    return (path, '{} Wind Speed and Gust'.format(station), start, end,
+            shown, wspd, wmax, counts, bins, config['dpi'])
+
+
+# Figure jobs for one station, skipping those the cache says are current
+def station_jobs(station, data, settings, cache):
+    config = dict(DEFAULT_FIGURES, **(settings.get('figures') or {}))
+    bins = settings['variable']['wind_histogram_bins']
+    depends = build_cache.settings_keys(settings, 'figures.dpi', 'figures.max_points',
+                                        'variable.wind_histogram_bins')
+    data = data[['TIMESTAMP', 'WSPD', 'WMAX']].replace(MISSING_VALUES, np.nan)
+
+    pieces = []
+    if 'station' in config['periods'] and len(data):
+        pieces.append(('station', 'all', data))
+    for period in config['periods']:
+        if period in PERIODS:
+            for start, piece in data.groupby(data['TIMESTAMP'].dt.to_period(PERIODS[period])):
+                label = start.strftime('%Y%m%d' if period == 'day' else '%Y%m')
+                pieces.append((period, label, piece))
+
+    jobs = []
+    for period, label, piece in pieces:
+        if not len(piece):
+            continue
+        path = os.path.join(config['directory'], station, period,
+                            "{}_{}_wind.png".format(station, label))
+        key = build_cache.key('wind-fig-2', station, piece, depends)
+        if cache.fresh(path, key):
+            continue
+        jobs.append((wind_job(path, station, piece, config, bins), key))
+    return jobs
+
+
+# Render every figure for {station: data frame} on a process pool
+def render_all(stations, settings):
+    config = dict(DEFAULT_FIGURES, **(settings.get('figures') or {}))
+    cache = build_cache.BuildCache(config['directory'], settings.get('build_cache', True))
+    jobs = []
+    for station, data in stations.items():
+        jobs.extend(station_jobs(station, data, settings, cache))
+    if jobs:
+        workers = config['workers'] or os.cpu_count()
+        with ProcessPoolExecutor(min(workers, len(jobs)), initializer=_init_worker) as pool:
+            chunk = max(1, len(jobs) // (4 * workers))
+            for (job, key), path in zip(jobs, pool.map(render, [job for job, key in jobs],
+                                                       chunksize=chunk)):
+                cache.record(path, key)
+    cache.save()
+    return len(jobs), cache.skipped
+
+
+# Read one station's daily CSV archive back into a single data frame
+def read_daily_archive(directory):
+    files = sorted(glob.glob(os.path.join(directory, '*.dat')))
+    frames = [infill.read_daily(path, ['TIMESTAMP', 'WSPD', 'WMAX']) for path in files]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['TIMESTAMP', 'WSPD', 'WMAX'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Render station, month and day wind figures')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('stations', nargs='+', help='STATION=DIRECTORY of daily CSV files')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    if not (settings.get('figures') or {}).get('directory'):
+        raise SystemExit("Set figures: directory: in the settings file first")
+    stations = {}
+    for spec in args.stations:
+        station, directory = spec.split('=', 1)
+        stations[station] = read_daily_archive(directory)
+    rendered, skipped = render_all(stations, settings)
+    print("Figures rendered: {}, unchanged: {}".format(rendered, skipped))
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: health.py
+# Version: 1.0.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Streaming station-health monitor. Every record that arrives from a station
+#   updates a handful of constant-memory statistics (BATV trend, reporting
+#   latency, QA-fail rate, gap length, stuck sensors) and alerts are raised
+#   right away through a pluggable local sink.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.0.1 - 10/19/2026 - Raw field names go through field_aliases; missing
+#                        values are left out of the QA-fail rate
+#
+# Inputs:
+#  * YAML settings file (health block and the variable QA limits)
+#  * Records from one or more stations, either fed to HealthMonitor.update or
+#    followed from growing TOA5 files on disk.
+#
+# Outputs:
+#  * Alerts (JSON lines) to stdout, a file, or a local UDP / Unix socket.
+#
+# Usage:
+#   python health.py settings.yaml NWC0=/path/to/NWC0_05A.dat NWC7=/path/to/NWC7_05E.dat
+#
+# Notes:
+#   * Logger clocks are taken to be UTC, like the rest of the pipeline.
+#   * An alert is sent when a check starts failing and a matching "cleared"
+#     message when it recovers, so a dead station does not flood the sink.
+#   * The BATV trend is an exponentially weighted least-squares slope, so it
+#     only keeps five running sums per station however long it runs.
+#   * Raw field names are renamed through field_aliases before the QA limits
+#     are looked up. The QA-fail rate counts only values that were reported
+#     (missing records and NAN values are the gap check's business).
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import csv
+import json
+import math
+import socket
+import sys
+import time
+import yaml
+from datetime import datetime, timezone
+
+# Health settings used when the settings file leaves them out
+DEFAULT_HEALTH = {'interval_minutes': 5,
+                  'batv_low': 11.5,
+                  'batv_slope_per_day': -0.5,
+                  'batv_halflife_hours': 24,
+                  'batv_trend_min_hours': 24,
+                  'max_latency_minutes': 30,
+                  'max_gap_minutes': 30,
+                  'qa_fail_rate': 0.25,
+                  'qa_halflife_records': 12,
+                  'stuck_records': 24,
+                  'stuck_variables': ['TAIR', 'RELH'],
+                  'sink': 'stdout'}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# Current UTC time as a naive datetime (to compare with logger timestamps)
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+##############################################################################################################################
+
+# Alert sinks
+
+
+# Print alerts as JSON lines on stdout
+class StdoutSink:
+
+    def send(self, alert):
+        print(json.dumps(alert), flush=True)
+
+    def close(self):
+        pass
+
+
+# Append alerts as JSON lines to a local file
+class FileSink:
+
+    def __init__(self, path):
+        self._file = open(path, 'a')
+
+    def send(self, alert):
+        self._file.write(json.dumps(alert) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# Send alerts as JSON datagrams to a local UDP port or Unix socket
+class SocketSink:
+
+    def __init__(self, address):
+        if isinstance(address, tuple):
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._address = address
+
+    def send(self, alert):
+        try:
+            self._socket.sendto(json.dumps(alert).encode('utf-8'), self._address)
+        except OSError as error:
+            print("Alert sink unavailable ({}): {}".format(error, alert), file=sys.stderr)
+
+    def close(self):
+        self._socket.close()
+
+
+# Build a sink from its settings string: stdout, file:PATH, udp://HOST:PORT
+# or unix:PATH
+def make_sink(spec):
+    if spec in (None, '', 'stdout'):
+        return StdoutSink()
+    if spec.startswith('file:'):
+        return FileSink(spec[len('file:'):])
+    if spec.startswith('udp://'):
+        host, port = spec[len('udp://'):].rsplit(':', 1)
+        return SocketSink((host, int(port)))
+    if spec.startswith('unix:'):
+        return SocketSink(spec[len('unix:'):])
+    raise ValueError("Unknown alert sink {!r} (use stdout, file:, udp:// or unix:)".format(spec))
+
+
+##############################################################################################################################
+
+# Running statistics
+
+
+# Exponentially weighted least-squares fit of value against time. Only the
+# weighted sums are kept, and they are decayed as each new point arrives.
+class EWTrend:
+
+    def __init__(self, halflife):
+        self.halflife = halflife
+        self.t0 = None
+        self.last_t = None
+        self.sw = self.st = self.sv = self.stt = self.stv = 0.0
+
+    def update(self, t, value):
+        if self.t0 is None:
+            self.t0 = self.last_t = t
+        decay = 0.5 ** ((t - self.last_t) / self.halflife) if t > self.last_t else 1.0
+        self.last_t = t
+        x = t - self.t0
+        self.sw = self.sw * decay + 1.0
+        self.st = self.st * decay + x
+        self.sv = self.sv * decay + value
+        self.stt = self.stt * decay + x * x
+        self.stv = self.stv * decay + x * value
+
+    @property
+    def mean(self):
+        return self.sv / self.sw if self.sw else math.nan
+
+    @property
+    def span(self):
+        return self.last_t - self.t0 if self.t0 is not None else 0.0
+
+    @property
+    def slope(self):
+        denominator = self.sw * self.stt - self.st * self.st
+        if self.sw < 2 or denominator <= 1e-12:
+            return math.nan
+        return (self.sw * self.stv - self.st * self.sv) / denominator
+
+
+# Exponentially weighted mean over a record count half-life
+class EWMean:
+
+    def __init__(self, halflife):
+        self.alpha = 1.0 - 0.5 ** (1.0 / halflife)
+        self.value = None
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+# Constant-memory health state for one station
+class StationHealth:
+
+    def __init__(self, station, config, limits):
+        self.station = station
+        self.config = config
+        self.limits = limits
+        self.batv = EWTrend(config['batv_halflife_hours'] * 3600.0)
+        self.qa_fail = EWMean(config['qa_halflife_records'])
+        self.latency = None
+        self.last_time = None
+        self.last_arrival = None
+        self.gap = 0.0
+        self.records = 0
+        self.stuck = {v: [None, 0] for v in config['stuck_variables']}
+        self.active = set()
+
+    def update(self, record, arrival):
+        stamp = record['TIMESTAMP']
+        t = stamp.timestamp()
+        interval = self.config['interval_minutes'] * 60.0
+        self.gap = 0.0 if self.last_time is None else max(t - self.last_time - interval, 0.0)
+        self.last_time = t if self.last_time is None else max(self.last_time, t)
+        self.last_arrival = arrival
+        self.latency = (arrival - stamp).total_seconds()
+        self.records += 1
+
+        batv = record.get('BATV')
+        if batv is not None and not math.isnan(batv):
+            self.batv.update(t, batv)
+
+        checked = failed = 0
+        for var, limit in self.limits.items():
+            value = record.get(var)
+            if value is None or math.isnan(value):
+                continue
+            checked += 1
+            if value < limit['low_limit'] or value > limit['high_limit']:
+                failed += 1
+        if checked:
+            self.qa_fail.update(failed / checked)
+
+        for var, state in self.stuck.items():
+            value = record.get(var)
+            if value is None or math.isnan(value):
+                continue
+            state[1] = state[1] + 1 if value == state[0] else 1
+            state[0] = value
+
+    # Evaluate every check; returns {kind: (failing, value, message)}
+    def checks(self, now):
+        c = self.config
+        results = {}
+        batv = self.batv.mean
+        results['batv_low'] = (batv < c['batv_low'], batv,
+                               "BATV {:.2f} V below {} V".format(batv, c['batv_low']))
+        slope = self.batv.slope * 86400.0
+        settled = self.batv.span >= c['batv_trend_min_hours'] * 3600
+        results['batv_trend'] = (settled and slope < c['batv_slope_per_day'], slope,
+                                 "BATV falling {:.2f} V/day".format(slope))
+        results['latency'] = (self.latency is not None and self.latency > c['max_latency_minutes'] * 60,
+                              self.latency, "Records arriving {:.0f} min late".format((self.latency or 0) / 60))
+        silent = (now - self.last_arrival).total_seconds() if self.last_arrival else 0.0
+        gap = max(self.gap, silent - c['interval_minutes'] * 60)
+        results['gap'] = (gap > c['max_gap_minutes'] * 60, gap,
+                          "No data for {:.0f} min".format(gap / 60))
+        rate = self.qa_fail.value if self.qa_fail.value is not None else 0.0
+        results['qa_fail'] = (rate > c['qa_fail_rate'], rate,
+                              "QA-fail rate {:.0%}".format(rate))
+        for var, (value, count) in self.stuck.items():
+            results['stuck_' + var] = (count >= c['stuck_records'], count,
+                                       "{} stuck at {} for {} records".format(var, value, count))
+        return results
+
+
+##############################################################################################################################
+
+# Monitor
+
+
+# Health monitor for a network of stations, sending alerts to one sink
+class HealthMonitor:
+
+    def __init__(self, settings, sink=None):
+        self.config = dict(DEFAULT_HEALTH, **(settings.get('health') or {}))
+        self.limits = {var: spec['QA'] for var, spec in settings['variable'].items()
+                       if isinstance(spec, dict) and 'QA' in spec}
+        self.aliases = settings.get('field_aliases') or {}
+        self.sink = sink if sink is not None else make_sink(self.config['sink'])
+        self.stations = {}
+
+    # Feed one record (dict with a datetime TIMESTAMP and float fields)
+    def update(self, station, record, arrival=None):
+        arrival = arrival or utc_now()
+        health = self.stations.get(station)
+        if health is None:
+            health = self.stations[station] = StationHealth(station, self.config, self.limits)
+        health.update(record, arrival)
+        self._evaluate(health, arrival)
+
+    # Re-run the checks without new data, so silent stations still alert
+    def check(self, now=None):
+        now = now or utc_now()
+        for health in self.stations.values():
+            self._evaluate(health, now)
+
+    def _evaluate(self, health, now):
+        for kind, (failing, value, message) in health.checks(now).items():
+            if failing and kind not in health.active:
+                health.active.add(kind)
+                self._send(health, kind, 'alert', value, message, now)
+            elif not failing and kind in health.active:
+                health.active.discard(kind)
+                self._send(health, kind, 'cleared', value, message, now)
+
+    def _send(self, health, kind, state, value, message, now):
+        self.sink.send({'station': health.station,
+                        'check': kind,
+                        'state': state,
+                        'value': None if value is None or value != value else round(float(value), 4),
+                        'message': message,
+                        'time': now.strftime(TIME_FORMAT)})
+
+
+# Turn one csv row from a TOA5 file into a health record, with the field names
+# renamed through aliases ({logger name: name used here})
+def parse_record(fields, row, aliases=None):
+    record = {}
+    for name, text in zip(fields, row):
+        name = (aliases or {}).get(name, name)
+        if name == 'TIMESTAMP':
+            record[name] = datetime.strptime(text[:19], TIME_FORMAT)
+        else:
+            try:
+                record[name] = float(text)
+            except ValueError:
+                record[name] = math.nan
+    return record
+
+
+# Follow growing TOA5 files and feed each new record to the monitor
+def follow(monitor, files, poll=1.0, from_start=False, replay=False):
+    handles = {}
+    for station, path in files.items():
+        f = open(path, 'r', newline='')
+        header = [next(csv.reader([f.readline()])) for _ in range(4)]
+        if not from_start:
+            f.seek(0, 2)
+        handles[station] = (f, header[1], '')
+    while True:
+        for station, (f, fields, partial) in handles.items():
+            partial += f.read()
+            lines = partial.split('\n')
+            handles[station] = (f, fields, lines.pop())
+            for row in csv.reader(line for line in lines if line.strip()):
+                record = parse_record(fields, row, monitor.aliases)
+                monitor.update(station, record, record['TIMESTAMP'] if replay else None)
+        if replay:
+            break
+        monitor.check()
+        time.sleep(poll)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Streaming station-health monitor')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('stations', nargs='+', help='STATION=PATH of a TOA5 file to follow')
+    parser.add_argument('--sink', help='Override the alert sink (stdout, file:, udp://, unix:)')
+    parser.add_argument('--from-start', action='store_true', help='Read existing records first')
+    parser.add_argument('--replay', action='store_true',
+                        help='Run through the files once, using record time as arrival time')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    monitor = HealthMonitor(settings, make_sink(args.sink) if args.sink else None)
+    files = dict(spec.split('=', 1) for spec in args.stations)
+    try:
+        follow(monitor, files, from_start=args.from_start or args.replay, replay=args.replay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.sink.close()
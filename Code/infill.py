@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: infill.py
+# Version: 1.1.0
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Bounded gap infill. Short runs of missing TAIR, RELH and WSPD records
+#   (or any variables set up in settings.yaml) are filled by interpolating
+#   between the observations on either side, and every filled value is
+#   flagged as estimated, so the daily files give continuous series without
+#   each consumer running its own fill.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - read_daily: a daily file read back as observations
+#
+# Inputs:
+#  * YAML settings file (infill block)
+#  * QA-ed data on the record grid (missing records as NaN), from
+#    Programming Lab 6.py or pipeline.py.
+#
+# Outputs:
+#  * The data with short gaps filled and a VAR_EST column (1 = estimated)
+#    for every filled variable.
+#
+# Usage:
+#   import infill
+#   data = infill.fill_gaps(data, infill.infill_settings(settings), 300)
+#
+# Notes:
+#   * A gap is filled only when it has an observation on both sides and the
+#     missing span (time between them less one record interval) is at most
+#     the variable's max_gap_minutes; longer gaps stay missing.
+#   * method: linear weights by record position, time by time stamp (the
+#     same on a regular grid, different where records are irregular).
+#   * The previous and next observation of every record are found with a
+#     running maximum / minimum of observation positions, so a whole column
+#     is filled in a handful of array operations.
+#   * QA-flagged values (-998) are not gaps and are never filled. The
+#     summary report, events, figures and coverage catalog keep to the
+#     observations (observed() undoes the fill, and read_daily() reads a
+#     daily file back through it for the command line tools).
+#   * Wind chill is not recomputed for records with estimated TAIR or WSPD.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import numpy as np
+import pandas as pd
+import qa
+
+# Infill settings used when the settings file leaves them out
+DEFAULT_INFILL = {'enabled': False,
+                  'method': 'linear',
+                  'max_gap_minutes': {'TAIR': 30, 'RELH': 30, 'WSPD': 15},
+                  'decimals': 3}
+
+# Suffix of the estimated-value flag column of each filled variable
+FLAG_SUFFIX = '_EST'
+
+
+# Infill settings merged over the defaults (None when turned off)
+def infill_settings(settings):
+    config = dict(DEFAULT_INFILL, **(settings.get('infill') or {}))
+    if config['method'] not in ('linear', 'time'):
+        raise ValueError("infill method must be 'linear' or 'time', not {!r}".format(config['method']))
+    return config if config['enabled'] else None
+
+
+# Interpolated values for the gaps of one column that are short enough, and
+# the mask of the records that were filled
+def fill_column(values, times, max_gap_seconds, interval_seconds, method='linear'):
+    values = np.asarray(values, dtype=float)
+    position = np.arange(len(values))
+    present = ~np.isnan(values)
+
+    # Previous and next non-missing record of every record (-1 / n where
+    # there is none); a gap next to a QA flag has no anchor on that side
+    before = np.maximum.accumulate(np.where(present, position, -1))
+    after = np.minimum.accumulate(np.where(present, position, len(values))[::-1])[::-1]
+    inside = ~present & (before >= 0) & (after < len(values))
+    left, right = before[inside], after[inside]
+    anchored = (values[left] != qa.QA_FLAG) & (values[right] != qa.QA_FLAG)
+    inside[inside] = anchored
+    left, right = left[anchored], right[anchored]
+
+    span = (times[right] - times[left]) / np.timedelta64(1, 's') - interval_seconds
+    short = span <= max_gap_seconds
+    left, right = left[short], right[short]
+    filled = np.flatnonzero(inside)[short]
+    if method == 'time':
+        weight = (times[filled] - times[left]) / (times[right] - times[left])
+    else:
+        weight = (filled - left) / (right - left)
+
+    result = values.copy()
+    result[filled] = values[left] + weight * (values[right] - values[left])
+    mask = np.zeros(len(values), dtype=bool)
+    mask[filled] = True
+    return result, mask
+
+
+# Fill the short gaps of every configured variable in a data frame on the
+# record grid and add its VAR_EST flag column
+def fill_gaps(data, config, interval_seconds=300):
+    data = data.copy()
+    times = pd.to_datetime(data['TIMESTAMP']).to_numpy(dtype='datetime64[ns]')
+    for var, minutes in config['max_gap_minutes'].items():
+        if var not in data:
+            continue
+        values, mask = fill_column(pd.to_numeric(data[var], errors='coerce'), times, minutes * 60,
+                                   interval_seconds, config['method'])
+        data[var] = np.where(mask, np.round(values, config['decimals']), data[var])
+        data[var + FLAG_SUFFIX] = mask.astype(int)
+    return data
+
+
+# Data frame with estimated values missing again and the flag columns
+# dropped (unchanged if nothing was filled)
+def observed(data):
+    flags = [c for c in data.columns if c.endswith(FLAG_SUFFIX) and c[:-len(FLAG_SUFFIX)] in data]
+    if not flags:
+        return data
+    data = data.copy()
+    for flag in flags:
+        var = flag[:-len(FLAG_SUFFIX)]
+        data[var] = data[var].mask(data[flag].to_numpy() == 1)
+    return data.drop(columns=flags)
+
+
+# Read a daily CSV file back as observations (estimated values missing, no
+# flag columns), limited to columns when given
+def read_daily(path, columns=None):
+    day = observed(pd.read_csv(path, index_col=0, parse_dates=['TIMESTAMP']))
+    return day if columns is None else day[columns]
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: parallel_qa.py
+# Version: 1.0.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Runs the QA and wind chill stages of one station on a process pool. The
+#   time axis is split into blocks and the column arrays are put in shared
+#   memory, so workers read their block and write their results in place.
+#   Only the settings (once per worker) and the bounds of each block are
+#   pickled and sent between processes.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.0.1 - 10/19/2026 - Settings sent once per worker; blocks are QA-ed on
+#                        views of the shared arrays instead of copies
+#
+# Inputs:
+#  * Data frame of raw station data in time order (TIMESTAMP and float64
+#    variable columns).
+#  * YAML settings (variable QA limits, parallel block).
+#
+# Outputs:
+#  * The same data frame as qa.apply_qa would give.
+#
+# Usage:
+#   python parallel_qa.py settings.yaml --workers 8 --block 200000
+#
+# Notes:
+#   * Workers read from the input arrays and write to separate output arrays,
+#     so a block can read the qa.lookback() records in front of it (for the
+#     step test) while the block before is still being written.
+#   * Each worker attaches to the shared arrays once (pool initializer) and
+#     QA-s its blocks on a data frame of views of them. The QA only replaces
+#     columns, never writes into them, so the inputs stay as they were.
+#   * Small frames, one worker or non-float columns fall back to the serial
+#     qa.apply_qa.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import os
+import time
+import yaml
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import qa
+import toa5
+
+# Parallel settings used when the settings file leaves them out
+DEFAULT_PARALLEL = {'workers': 0,
+                    'block_records': 100000}
+
+# Shared arrays and settings of the worker process (set by _init_worker)
+_worker = None
+
+
+# Copy an array into a new shared memory block
+def _share(values):
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+    return shm
+
+
+# Attach to the shared arrays described by {column: (name, length, dtype)}
+def _attach(columns):
+    blocks, arrays = [], {}
+    for column, (name, length, dtype) in columns.items():
+        shm = shared_memory.SharedMemory(name=name)
+        blocks.append(shm)
+        arrays[column] = np.ndarray((length,), dtype=dtype, buffer=shm.buf)
+    return blocks, arrays
+
+
+# Attach a worker process to the shared inputs and outputs, and keep the
+# settings, for all the blocks it QA-s
+def _init_worker(inputs, outputs, settings):
+    global _worker
+    blocks, src = _attach(inputs)
+    more, dst = _attach(outputs)
+    # The blocks stay open for the life of the process
+    _worker = (blocks + more, src, dst, settings)
+
+
+# QA one block [start, stop) in place: read the inputs (plus the look-back
+# records in front), write the block's results to the outputs
+def qa_block(job):
+    start, stop, halo = job
+    blocks, src, dst, settings = _worker
+    lo = max(0, start - halo)
+    frame = pd.DataFrame({column: values[lo:stop] for column, values in src.items()}, copy=False)
+    frame = qa.apply_qa(frame, settings)
+    for column, values in dst.items():
+        values[start:stop] = frame[column].to_numpy()[start - lo:]
+    return stop - start
+
+
+# qa.apply_qa over blocks of the time axis on a process pool
+def apply_qa(data, settings, workers=None, block_records=None):
+    config = dict(DEFAULT_PARALLEL, **(settings.get('parallel') or {}))
+    workers = workers or config['workers'] or os.cpu_count()
+    block_records = block_records or config['block_records']
+    columns = [column for column in qa.QA_VARIABLES if column in data]
+    shareable = all(data[column].dtype == np.float64 for column in columns)
+    shareable = shareable and data['TIMESTAMP'].dtype == 'datetime64[ns]'
+    if workers < 2 or len(data) < 2 * block_records or not shareable:
+        return qa.apply_qa(data, settings)
+
+    shared = {}
+    try:
+        inputs, outputs = {}, {}
+        for column in ['TIMESTAMP'] + columns:
+            values = data[column].to_numpy()
+            shm = _share(values)
+            shared[shm.name] = shm
+            inputs[column] = (shm.name, len(data), values.dtype.str)
+        for column in columns + ['CHIL']:
+            shm = _share(np.empty(len(data)))
+            shared[shm.name] = shm
+            outputs[column] = (shm.name, len(data), '<f8')
+
+        halo = qa.lookback(settings)
+        jobs = [(start, min(start + block_records, len(data)), halo)
+                for start in range(0, len(data), block_records)]
+        with ProcessPoolExecutor(min(workers, len(jobs)), initializer=_init_worker,
+                                 initargs=(inputs, outputs, settings)) as pool:
+            list(pool.map(qa_block, jobs))
+
+        for column, (name, length, dtype) in outputs.items():
+            data[column] = np.ndarray((length,), dtype=dtype, buffer=shared[name].buf).copy()
+    finally:
+        for shm in shared.values():
+            shm.close()
+            shm.unlink()
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time the serial and block-parallel QA of the raw data')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes (0 uses every core)')
+    parser.add_argument('--block', type=int, default=0, help='Records per block')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    data_files = settings.get("data_files") or [settings["data_file"]]
+    data, report = toa5.merge_toa5(data_files)
+
+    begin = time.perf_counter()
+    serial = qa.apply_qa(data.copy(), settings)
+    middle = time.perf_counter()
+    blocked = apply_qa(data.copy(), settings, args.workers, args.block)
+    end = time.perf_counter()
+    same = serial.equals(blocked)
+    print("{} records  serial {:.2f} s  parallel {:.2f} s  identical: {}".format(
+        len(data), middle - begin, end - middle, same))
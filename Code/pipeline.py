@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: pipeline.py
+# Version: 1.2.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   The processing of Programming Lab 6.py split into stages (ingest, qa,
+#   derive, figures, write) that pass one day of data at a time as Arrow
+#   record batches. The stages can be chained in one process, or run as
+#   separate processes joined by pipes carrying an Arrow IPC stream, so the
+#   heavy stages run on their own cores while ingest reads ahead.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - Grid, day windows and missing counts follow the
+#                        table's record interval, carried in the batch schema
+#   1.2.0 - 10/19/2026 - infill stage (bounded gap infill, infill.py)
+#   1.2.1 - 10/19/2026 - Only streamstats.raw_columns are read from the raw files
+#
+# Inputs:
+#  * YAML settings file (same keys as Programming Lab 6.py)
+#  * Arrow IPC stream on stdin for every stage but ingest.
+#
+# Outputs:
+#  * Arrow IPC stream on stdout for every stage but write.
+#  * write: daily CSV files (output_csv_path) and the summary report
+#    (output_file_path), the same as Programming Lab 6.py.
+#
+# Usage:
+#   python pipeline.py run settings.yaml
+#   python pipeline.py ingest settings.yaml | python pipeline.py qa settings.yaml |
+#       python pipeline.py derive settings.yaml | python pipeline.py infill settings.yaml |
+#       python pipeline.py write settings.yaml
+#
+# Notes:
+#   * A batch is one day of the 5 minute grid: TIMESTAMP, the variables and
+#     two bookkeeping columns, _row (row number in the full data, used as the
+#     daily file index) and _observed (record was in the raw data).
+#   * The qa stage carries the last qa.lookback() records of a day in front
+#     of the next, so look-back tests see across midnight.
+#   * The infill stage runs one day behind, filling each day with the days
+#     before and after it in view, so gaps over midnight are filled as in
+#     Programming Lab 6.py (max_gap_minutes must stay under a day).
+#   * The merge report goes to stderr; stdout is kept for the batch stream.
+#   * The table's record interval travels with the batches as Arrow schema
+#     metadata (interval_seconds), so every stage sees the same cadence.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import os
+import sys
+import yaml
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from datetime import datetime, timedelta
+import toa5
+import tob
+import crbasic
+import qa
+import streamstats
+import solar
+import climatology
+import figures
+import build_cache
+import infill
+
+# Bookkeeping columns carried in every batch
+ROW = '_row'
+OBSERVED = '_observed'
+
+# Batch schema metadata key holding the record interval (seconds)
+INTERVAL = b'interval_seconds'
+
+
+def to_batch(frame, interval_seconds):
+    batch = pa.RecordBatch.from_pandas(frame, preserve_index=False)
+    return batch.replace_schema_metadata({**(batch.schema.metadata or {}),
+                                          INTERVAL: str(interval_seconds).encode()})
+
+
+# Record interval (seconds) a batch was built at
+def interval_of(batch):
+    return float(batch.schema.metadata[INTERVAL])
+
+
+def to_frame(batch):
+    return batch.to_pandas()
+
+
+# Batches from an Arrow IPC stream (e.g. stdin)
+def read_stream(source):
+    with pa.ipc.open_stream(source) as reader:
+        for batch in reader:
+            yield batch
+
+
+# Write batches to an Arrow IPC stream (e.g. stdout)
+def write_stream(batches, sink):
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+    if writer is not None:
+        writer.close()
+
+
+##############################################################################################################################
+
+# Stages
+
+
+# Merge the raw files, put them on the 5 minute grid and yield one batch per day
+def ingest(settings):
+    start_date = datetime.strptime(settings['start_date'], "%Y-%m-%d %H:%M")
+    end_date = datetime.strptime(settings['end_date'], "%Y-%m-%d %H:%M")
+    data_files = settings.get("data_files") or [settings["data_file"]]
+    schema = crbasic.schema_from_settings(settings)
+    raw, merge_report = toa5.merge_toa5(data_files, schema=schema, columns=streamstats.raw_columns(settings),
+                                        aliases=settings.get("field_aliases"))
+    print(toa5.format_merge_report(merge_report), file=sys.stderr)
+    if settings.get("binary_archive"):
+        tob.write_tob1(settings["binary_archive"], raw, merge_report['header'])
+    interval = merge_report['interval_seconds']
+
+    empty = pd.DataFrame(index=pd.date_range(start_date, end_date, freq=pd.Timedelta(seconds=interval)),
+                         columns=raw.columns.drop('TIMESTAMP')).rename_axis('TIMESTAMP')
+    data = raw.set_index('TIMESTAMP').combine_first(empty).reset_index()
+    data = data.drop('RECORD', axis=1)
+    data[ROW] = data.index
+    data[OBSERVED] = data['TIMESTAMP'].isin(raw['TIMESTAMP'])
+
+    current_date = start_date
+    while current_date <= end_date:
+        yield to_batch(data.iloc[streamstats.day_slice(data['TIMESTAMP'], current_date, interval)], interval)
+        current_date += timedelta(days = 1)
+
+
+# Range, step and clear-sky QA of the measured variables
+def qa_stage(batches, settings):
+    halo = qa.lookback(settings)
+    tail = None
+    for batch in batches:
+        day = to_frame(batch)
+        block = day if tail is None else pd.concat([tail, day], ignore_index=True)
+        tail = day.iloc[len(day) - halo:].copy() if halo else None
+        block = qa.check_variables(block, settings)
+        yield to_batch(block.iloc[len(block) - len(day):], interval_of(batch))
+
+
+# Derived variables (wind chill) and their QA
+def derive_stage(batches, settings):
+    for batch in batches:
+        yield to_batch(qa.derive(to_frame(batch), settings), interval_of(batch))
+
+
+# Day figures (figures: directory), passing the batches on unchanged
+def figures_stage(batches, settings):
+    config = dict(figures.DEFAULT_FIGURES, **(settings.get('figures') or {}))
+    day_settings = dict(settings, figures=dict(config, periods=['day']))
+    cache = build_cache.BuildCache(config['directory'], settings.get('build_cache', True))
+    figures._init_worker()
+    try:
+        for batch in batches:
+            if config['directory']:
+                day = to_frame(batch)
+                for job, key in figures.station_jobs(settings.get('station', 'NWC0'), day, day_settings, cache):
+                    cache.record(figures.render(job), key)
+            yield batch
+    finally:
+        cache.save()
+
+
+# Fill the gaps of window[position] with the other days of the window in view
+def _fill_day(window, position, config, interval_seconds):
+    block = infill.fill_gaps(pd.concat(window, ignore_index=True), config, interval_seconds)
+    start = sum(len(day) for day in window[:position])
+    return to_batch(block.iloc[start:start + len(window[position])], interval_seconds)
+
+
+# Bounded gap infill (infill: enabled), one day behind so gaps over midnight
+# see the records on both sides; batches pass unchanged when it is off
+def infill_stage(batches, settings):
+    config = infill.infill_settings(settings)
+    window = []
+    interval = None
+    for batch in batches:
+        if config is None:
+            yield batch
+            continue
+        window = (window + [to_frame(batch)])[-3:]
+        interval = interval_of(batch)
+        if len(window) > 1:
+            yield _fill_day(window, len(window) - 2, config, interval)
+    if window:
+        window = window[-2:]
+        yield _fill_day(window, len(window) - 1, config, interval)
+
+
+# Daily CSV files and the summary report
+def write_stage(batches, settings):
+    csv_path = settings['output_csv_path']
+    report_path = os.path.join(settings['output_file_path'], "NWC0_REPORT_{}_{}.txt".format(
+        pd.to_datetime(settings['start_date']).strftime('%Y%m%d'),
+        pd.to_datetime(settings['end_date']).strftime('%Y%m%d')))
+    clim_config = climatology.climatology_settings(settings)
+    clim = None
+    if clim_config is not None:
+        clim = climatology.Climatology(clim_config['file'], clim_config['compression'])
+
+    with open(report_path, 'w') as file:
+        file.write(streamstats.report_header(settings["data_filename"]))
+        for batch in batches:
+            interval = interval_of(batch)
+            day_settings = streamstats.with_interval(settings, interval)
+            day = to_frame(batch).set_index(ROW).rename_axis(None)
+            observed = int(day.pop(OBSERVED).sum())
+            date = day['TIMESTAMP'].iloc[0]
+            filename = streamstats.daily_filename(date)
+            day.fillna('-9999').to_csv(os.path.join(csv_path, filename))
+
+            dailystats = infill.observed(day).replace(qa.QA_FLAG, np.nan)
+            stats = streamstats.DayStats()
+            for var in streamstats.REPORT_VARIABLES:
+                stats.stats[var] = streamstats.RunningStats.from_array(dailystats[var])
+            file.write(streamstats.report_day(filename, streamstats.max_observations(interval) - observed, stats))
+            if (settings.get('solar') or {}).get('report'):
+                file.write(solar.report_day(dailystats['TIMESTAMP'], dailystats['SRAD'], day_settings,
+                                            settings.get('station', 'NWC0')))
+            if clim is not None:
+                day_date = datetime(date.year, date.month, date.day)
+                day_values = {var: dailystats[var] for var in clim_config['variables']}
+                file.write(climatology.report_day(clim, clim_config, day_date, day_values))
+                clim.add_day(clim_config['station'], day_date, day_values)
+    if clim is not None:
+        clim.save()
+
+
+# Stages that turn batches into batches, in pipeline order
+STAGES = {'qa': qa_stage, 'derive': derive_stage, 'figures': figures_stage, 'infill': infill_stage}
+
+
+# The whole pipeline in one process
+def run(settings):
+    batches = ingest(settings)
+    for stage in STAGES.values():
+        batches = stage(batches, settings)
+    write_stage(batches, settings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Staged station data pipeline')
+    parser.add_argument('stage', choices=['run', 'ingest', 'write'] + list(STAGES),
+                        help='Stage to run (run chains every stage in this process)')
+    parser.add_argument('settings', help='YAML settings file')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    if args.stage == 'run':
+        run(settings)
+    elif args.stage == 'ingest':
+        write_stream(ingest(settings), sys.stdout.buffer)
+    elif args.stage == 'write':
+        write_stage(read_stream(sys.stdin.buffer), settings)
+    else:
+        write_stream(STAGES[args.stage](read_stream(sys.stdin.buffer), settings), sys.stdout.buffer)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: qa.py
+# Version: 1.4.0
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Range-check QA and wind chill, shared by Lab 6 and the streaming tools.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release, moved out of Programming Lab 6.py
+#                        so the streaming report can reuse it
+#   1.1.0 - 10/19/2026 - Optional step test (QA step: in settings.yaml) and
+#                        lookback() for tools that run QA on blocks of data
+#   1.2.0 - 10/19/2026 - Optional SRAD above clear-sky test (solar.py)
+#   1.3.0 - 10/19/2026 - apply_qa split into check_variables and derive so the
+#                        pipeline can run them as separate stages
+#   1.4.0 - 10/19/2026 - Optional cross-station spatial test (spatial.py)
+#
+# Inputs:
+#  * Data frame (or chunk of one) with the raw station variables.
+#  * YAML settings (variable QA high_limit / low_limit, station and its
+#    coordinates in the stations block for the clear-sky and spatial tests,
+#    spatial block).
+#
+# Outputs:
+#  * The same data frame with out of range values set to the QA flag (-998)
+#    and a QA-ed CHIL column.
+#
+# Notes:
+#   * The step test compares each record with the one before it, so QA run on
+#     a block of records needs lookback() records in front of the block.
+#   * The spatial test (spatial: enabled) compares the station with the other
+#     stations at the same time only, so it needs no look-back.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import numpy as np
+import solar
+import spatial
+
+# Value written in place of an observation that fails QA
+QA_FLAG = -998
+
+# Variables range-checked straight from the raw data (CHIL is derived later)
+QA_VARIABLES = ['TAIR', 'RELH', 'SRAD', 'WSPD', 'WMAX']
+
+
+def wind_chill (TAIR, WSPD):
+    CHIL = np.real(13.12 + (0.6215*TAIR) - 11.37*(pow((WSPD*3.6),0.16)) + 0.3965*TAIR*(pow((WSPD*3.6),0.16)))
+    return CHIL
+
+
+# Flag values outside a variable's QA limits (missing values are left alone)
+def range_check(values, limits):
+    return values.mask((values < limits["low_limit"]) | (values > limits["high_limit"]), QA_FLAG)
+
+
+# Flag values that jump more than step from the previous record (values that
+# already failed QA are not used as the previous record)
+def step_check(values, step):
+    jump = values.where(values != QA_FLAG).diff().abs() > step
+    return values.mask(jump, QA_FLAG)
+
+
+# Flag SRAD above factor times the clear-sky irradiance plus offset (W/m^2)
+def clear_sky_check(values, times, limits, settings):
+    possible = solar.station_clear_sky(times, settings, settings.get("station", "NWC0"))
+    limit = limits["clear_sky_factor"] * possible + limits.get("clear_sky_offset", 0)
+    return values.mask((values != QA_FLAG) & (values > limit), QA_FLAG)
+
+
+# Records before a block the QA needs to see to flag the block's first record
+def lookback(settings):
+    steps = [var for var in QA_VARIABLES if "step" in settings["variable"][var]["QA"]]
+    return 1 if steps else 0
+
+
+# Assign QA flags to the measured variables
+def check_variables(data, settings):
+    for var in QA_VARIABLES:
+        if var in data:
+            limits = settings["variable"][var]["QA"]
+            data[var] = range_check(data[var], limits)
+            if "step" in limits:
+                data[var] = step_check(data[var], limits["step"])
+            if "clear_sky_factor" in limits:
+                data[var] = clear_sky_check(data[var], data["TIMESTAMP"], limits, settings)
+    if (settings.get("spatial") or {}).get("enabled"):
+        data = spatial.check_station(data, settings)
+    return data
+
+
+# Compute and QA the derived variables (wind chill) from QA-ed data
+def derive(data, settings):
+    data["CHIL"] = wind_chill(data["TAIR"], data["WSPD"])
+    data["CHIL"] = range_check(data["CHIL"], settings["variable"]["CHIL"]["QA"])
+    return data
+
+
+# Assign QA flags, then compute and QA the wind chill
+def apply_qa(data, settings):
+    return derive(check_variables(data, settings), settings)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: rangeindex.py
+# Version: 1.0.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Persisted range-query index per station: the min, max (and when they
+#   happened), sum, mean and count of any variable between any two times
+#   come from a few array lookups instead of a rescan of the data.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.0.1 - 10/19/2026 - Daily files are read back without the infilled
+#                        (estimated) values
+#
+# Inputs:
+#  * YAML settings file (range_index block)
+#  * QA-ed data for a station (QA flags and missing values as NaN or -998 /
+#    -9999), from Programming Lab 6.py or the daily CSV archive.
+#
+# Outputs:
+#  * Index in range_index: directory, as STATION/index.json plus one .npy
+#    file per array (times, and values, sum, count, min, max per variable).
+#
+# Usage:
+#   python rangeindex.py settings.yaml build NWC0 ../Data/csv/*.dat
+#   python rangeindex.py settings.yaml query NWC0 WMAX "2021-02-01 06:00" "2021-02-02 18:00"
+#
+# Notes:
+#   * Sum and count are prefix sums, so a window is two subtractions.
+#   * Min and max use a sparse table over blocks of block_records records:
+#     row k holds the record index of the extreme of 2^k blocks starting at
+#     each block, so the whole blocks inside a window are covered by two
+#     overlapping rows and only the partial blocks at its ends (under
+#     2 * block_records records) are scanned. Ties go to the earliest record.
+#   * The arrays are opened memory-mapped, so a query only reads the pages
+#     it touches, whatever the length of the archive.
+#   * Updating a station replaces its records inside the new data's time
+#     range and rebuilds the arrays (a vectorized O(N) pass). Files are
+#     written beside the old ones and renamed over them.
+#   * Windows include both end times. RAIN is summed record by record as it
+#     is stored.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import json
+import os
+import yaml
+import numpy as np
+import pandas as pd
+import infill
+
+# Range index settings used when the settings file leaves them out
+DEFAULT_RANGE_INDEX = {'directory': '',
+                       'variables': ['TAIR', 'RELH', 'SRAD', 'WSPD', 'WMAX', 'RAIN', 'BATV', 'CHIL'],
+                       'block_records': 64}
+
+# Values in the data that are not observations
+MISSING_VALUES = [-9999, -998]
+
+# Arrays kept for every variable
+ARRAYS = ['values', 'sum', 'count', 'min', 'max']
+
+
+# Range index settings merged over the defaults (None when turned off)
+def range_index_settings(settings):
+    config = dict(DEFAULT_RANGE_INDEX, **(settings.get('range_index') or {}))
+    return config if config['directory'] else None
+
+
+# Observations of a column as float64, missing values and QA flags as NaN
+def _observations(column):
+    values = pd.to_numeric(pd.Series(column), errors='coerce').to_numpy(dtype=float)
+    return np.where(np.isin(values, MISSING_VALUES), np.nan, values)
+
+
+# Of two arrays of record indexes, the one whose value is lower (or higher);
+# a missing value never wins and ties keep the first (earlier) index
+def _pick(values, first, second, lowest):
+    a, b = values[first], values[second]
+    with np.errstate(invalid='ignore'):
+        better = b < a if lowest else b > a
+    return np.where(better | (np.isnan(a) & ~np.isnan(b)), second, first)
+
+
+# Sparse table of block extremes: row k, column i is the record index of the
+# extreme over blocks i .. i + 2^k - 1 (unused columns are -1)
+def sparse_table(values, block, lowest):
+    blocks = -(-len(values) // block)
+    if not blocks:
+        return np.zeros((0, 0), dtype=np.int32)
+    padded = np.full(blocks * block, np.inf if lowest else -np.inf)
+    padded[:len(values)] = np.where(np.isnan(values), padded[0], values)
+    grid = padded.reshape(blocks, block)
+    first = (grid.argmin(axis=1) if lowest else grid.argmax(axis=1)) + np.arange(blocks) * block
+
+    table = np.full((blocks.bit_length(), blocks), -1, dtype=np.int32)
+    table[0] = first
+    for k in range(1, len(table)):
+        half, width = 1 << (k - 1), blocks - (1 << k) + 1
+        table[k, :width] = _pick(values, table[k - 1, :width], table[k - 1, half:half + width], lowest)
+    return table
+
+
+# One saved array of an index, memory-mapped
+def _load(path, name):
+    return np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+
+
+class RangeIndex:
+
+    def __init__(self, times, arrays, block_records):
+        self.times = times
+        self.arrays = arrays
+        self.block = block_records
+
+    # Index over sorted times and {variable: observations}
+    @classmethod
+    def build(cls, times, columns, block_records=64):
+        arrays = {}
+        for var, values in columns.items():
+            valid = ~np.isnan(values)
+            arrays[var] = {'values': values,
+                           'sum': np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))]),
+                           'count': np.concatenate([[0], np.cumsum(valid)]),
+                           'min': sparse_table(values, block_records, True),
+                           'max': sparse_table(values, block_records, False)}
+        return cls(np.asarray(times, dtype='datetime64[ns]'), arrays, block_records)
+
+    # Open a saved index with its arrays memory-mapped
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, 'index.json'), 'r') as f:
+            meta = json.load(f)
+        arrays = {var: {name: _load(path, var + '.' + name) for name in ARRAYS} for var in meta['variables']}
+        return cls(_load(path, 'times'), arrays, meta['block_records'])
+
+    # Write the index into a directory (each file renamed into place)
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        files = {'times': self.times}
+        for var, arrays in self.arrays.items():
+            files.update({var + '.' + name: arrays[name] for name in ARRAYS})
+        for name, array in files.items():
+            np.save(os.path.join(path, name + '.tmp.npy'), np.asarray(array))
+            os.replace(os.path.join(path, name + '.tmp.npy'), os.path.join(path, name + '.npy'))
+        meta = {'block_records': self.block, 'variables': list(self.arrays), 'records': len(self.times),
+                'first': str(self.times[0]) if len(self.times) else None,
+                'last': str(self.times[-1]) if len(self.times) else None}
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+
+    # Record positions [lo, hi) of the window start <= time <= end
+    def window(self, start, end):
+        return (int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(start), 'ns'), side='left')),
+                int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(end), 'ns'), side='right')))
+
+    # Record index of the extreme of values[lo:hi] (None if all missing)
+    def _extreme(self, arrays, lo, hi, lowest):
+        values, table = arrays['values'], arrays['min' if lowest else 'max']
+        first, last = -(-lo // self.block), hi // self.block
+        if first < last:
+            k = (last - first).bit_length() - 1
+            edges = [(lo, first * self.block), (last * self.block, hi)]
+            candidates = [int(table[k, first]), int(table[k, last - (1 << k)])]
+        else:
+            edges, candidates = [(lo, hi)], []
+        for a, b in edges:
+            part = np.asarray(values[a:b])
+            if len(part) and not np.isnan(part).all():
+                candidates.append(a + int(np.nanargmin(part) if lowest else np.nanargmax(part)))
+        best = None
+        for index in sorted(candidates):
+            value = values[index]
+            if np.isnan(value):
+                continue
+            if best is None or (value < values[best] if lowest else value > values[best]):
+                best = index
+        return best
+
+    # Count, sum, mean, min and max (with their times) of a variable between
+    # two times (both included)
+    def query(self, var, start, end):
+        arrays = self.arrays[var]
+        lo, hi = self.window(start, end)
+        hi = max(lo, hi)
+        count = int(arrays['count'][hi] - arrays['count'][lo])
+        total = float(arrays['sum'][hi] - arrays['sum'][lo])
+        result = {'count': count, 'sum': total if count else np.nan, 'mean': total / count if count else np.nan}
+        for name, lowest in (('min', True), ('max', False)):
+            index = self._extreme(arrays, lo, hi, lowest) if count else None
+            result[name] = np.nan if index is None else float(arrays['values'][index])
+            result[name + '_time'] = None if index is None else pd.Timestamp(self.times[index])
+        return result
+
+
+# Add a station's QA-ed data to its index: records inside the data's time
+# range are replaced, the rest are kept, and the arrays are rebuilt
+def update_station(station, data, settings):
+    config = range_index_settings(settings)
+    path = os.path.join(config['directory'], station)
+    times = pd.to_datetime(data['TIMESTAMP']).to_numpy(dtype='datetime64[ns]')
+    columns = {var: _observations(data[var]) if var in data else np.full(len(times), np.nan)
+               for var in config['variables']}
+    if os.path.exists(os.path.join(path, 'index.json')) and len(times):
+        old = RangeIndex.open(path)
+        keep = (old.times < times.min()) | (old.times > times.max())
+        times = np.concatenate([old.times[keep], times])
+        for var in columns:
+            kept = old.arrays[var]['values'][keep] if var in old.arrays else np.full(int(keep.sum()), np.nan)
+            columns[var] = np.concatenate([kept, columns[var]])
+    order = np.argsort(times, kind='stable')
+    index = RangeIndex.build(times[order], {var: values[order] for var, values in columns.items()},
+                             config['block_records'])
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Range min/max/sum index of station data')
+    parser.add_argument('settings', help='YAML settings file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='Add daily CSV files to a station index')
+    build.add_argument('station', help='Station the daily files belong to')
+    build.add_argument('files', nargs='+', help='Daily CSV files (NWC_YYYYMMDD.dat)')
+    query = commands.add_parser('query', help='Statistics of a variable over a time window')
+    query.add_argument('station')
+    query.add_argument('variable')
+    query.add_argument('start', help='YYYY-MM-DD HH:MM')
+    query.add_argument('end', help='YYYY-MM-DD HH:MM (included)')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    config = range_index_settings(settings)
+    if config is None:
+        raise SystemExit("Set range_index: directory: in the settings file first")
+
+    if args.command == 'build':
+        data = pd.concat([infill.read_daily(path)
+                          for path in sorted(args.files)], ignore_index=True)
+        index = update_station(args.station, data, settings)
+        print("{}: {} records indexed".format(args.station, len(index.times)))
+    else:
+        index = RangeIndex.open(os.path.join(config['directory'], args.station))
+        stats = index.query(args.variable, args.start, args.end)
+        print("{} {} to {}: {} records".format(args.variable, args.start, args.end, stats['count']))
+        print("  min  {:10.3f}  at {}".format(stats['min'], stats['min_time']))
+        print("  max  {:10.3f}  at {}".format(stats['max'], stats['max_time']))
+        print("  mean {:10.3f}".format(stats['mean']))
+        print("  sum  {:10.3f}".format(stats['sum']))
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: service.py
+# Version: 1.0.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Resident station data service. Keeps the most recent weeks of QA-ed data,
+#   flags and daily aggregates of each station in memory, follows the raw
+#   files as records arrive, and answers report, statistics, data and figure
+#   requests over a local HTTP port or Unix socket, without the cold start
+#   (imports, settings, raw files, QA) of a run of Programming Lab 6.py.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.0.1 - 10/19/2026 - Infill of gaps that cross the start of new records
+#
+# Inputs:
+#  * YAML settings file (service block, plus the keys Programming Lab 6.py
+#    uses for reading and QA-ing the raw files)
+#  * Raw TOA5 / TOB1 / TOB3 files of each station (data_files of the settings
+#    file for the settings' station, STATION=PATH,PATH for more).
+#
+# Outputs (GET, on service: listen):
+#  * /stations                               stations held, with their time span (JSON)
+#  * /report/STATION?start=DATE&end=DATE     summary report, as Programming Lab 6.py writes it
+#  * /days/STATION?start=DATE&end=DATE       daily aggregates, flag and infill counts (JSON)
+#  * /stats/STATION?var=VAR&start=TIME&end=TIME
+#                                            count, min, max (with times) and mean (JSON)
+#  * /data/STATION?start=TIME&end=TIME       QA-ed records in the daily file format (CSV)
+#  * /figure/STATION?start=TIME&end=TIME     wind speed / gust figure (PNG)
+#
+# Usage:
+#   python service.py settings.yaml
+#   python service.py settings.yaml NWC7=/path/to/NWC7_05E.dat --listen unix:/tmp/nwc.sock
+#   curl "http://127.0.0.1:8610/report/NWC0?start=2021-02-01&end=2021-02-03"
+#   curl --unix-socket /tmp/nwc.sock "http://localhost/stats/NWC0?var=WMAX"
+#
+# Notes:
+#   * Only the last retain_days days (counted back from the newest record)
+#     are held; start and end default to the whole of them.
+#   * Plain TOA5 files are followed from the end of their last complete line,
+#     so each poll parses only the new records. Binary or compressed files
+#     that change, and files that shrink, are read again in full.
+#   * New records are QA-ed together with the qa.lookback() records before
+#     them, from midnight of the day of the earliest new (or previous last)
+#     record on; only those days' aggregates and report lines are rebuilt.
+#     With infill on, processing starts at midnight of the day max_gap_minutes
+#     (the longest of them) earlier, so a gap that crosses that point is
+#     filled as in a full reprocess (like pipeline.py's one-day look-behind).
+#   * Missing observations of the newest day are counted up to its last
+#     record, not over the whole day.
+#   * Report statistics, stats and figures use observations only (QA flags and
+#     infilled values as missing), as in Programming Lab 6.py. The report
+#     carries the solar lines when solar: report is set, but not the
+#     climatology lines (the service never writes to the climatology store).
+#   * Rendered figures are kept (figure_cache of them) until the station's
+#     data changes. Figures are drawn one at a time (matplotlib is not
+#     thread safe); everything else is answered on its own thread.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import yaml
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import toa5
+import crbasic
+import qa
+import infill
+import streamstats
+import solar
+import figures
+
+# Service settings used when the settings file leaves them out
+DEFAULT_SERVICE = {'listen': 'http://127.0.0.1:8610',
+                   'retain_days': 21,
+                   'poll_seconds': 10,
+                   'figure_cache': 32}
+
+
+# Service settings merged over the defaults
+def service_settings(settings):
+    return dict(DEFAULT_SERVICE, **(settings.get('service') or {}))
+
+
+# Size and modification time of a file, to tell when it has changed
+def _stamp(path):
+    status = os.stat(path)
+    return status.st_size, status.st_mtime_ns
+
+
+# JSON value of a number (NaN as null)
+def _number(value):
+    return None if value is None or value != value else float(value)
+
+
+##############################################################################################################################
+
+# Station state
+
+
+# The retained raw records, QA-ed data and daily aggregates of one station
+class StationState:
+
+    def __init__(self, station, paths, settings, config):
+        self.station = station
+        self.paths = list(paths)
+        self.base_settings = settings
+        self.config = config
+        self.schema = crbasic.schema_from_settings(settings)
+        self.aliases = settings.get('field_aliases')
+        self.infill = infill.infill_settings(settings)
+        self.lock = threading.Lock()
+        self.version = 0
+        self.load()
+
+    # Read every raw file in full and process all the retained days
+    def load(self):
+        offsets = {path: toa5.complete_length(path) if toa5.is_plain_toa5(path) else None
+                   for path in self.paths}
+        stamps = {path: _stamp(path) for path in self.paths}
+        raw, report = toa5.merge_toa5(self.paths, schema=self.schema, aliases=self.aliases)
+        with self.lock:
+            self.offsets, self.stamps = offsets, stamps
+            self.interval = report['interval_seconds']
+            self.settings = streamstats.with_interval(self.base_settings, self.interval)
+            self.raw = raw
+            self.data = None
+            self.days = {}
+            self._process(None)
+
+    # Read what has changed in the raw files; True when the data changed
+    def poll(self):
+        new = []
+        for path in self.paths:
+            offset = self.offsets[path]
+            if offset is None or os.path.getsize(path) < offset:
+                if _stamp(path) != self.stamps[path]:
+                    self.load()
+                    return True
+                continue
+            records, self.offsets[path] = toa5.read_toa5_tail(path, offset, self.schema, self.aliases)
+            if records is not None and len(records):
+                new.append(records)
+        if new:
+            self.add(pd.concat(new, ignore_index=True))
+        return bool(new)
+
+    # Add raw records (TIMESTAMP, RECORD and fields; a later record with the
+    # same time stamp replaces an earlier one) and reprocess the days they touch
+    def add(self, records):
+        with self.lock:
+            start = records['TIMESTAMP'].min()
+            if len(self.raw):
+                start = min(start, self.raw['TIMESTAMP'].iloc[-1])
+            raw = pd.concat([self.raw, records], ignore_index=True, sort=False)
+            raw = raw.sort_values('TIMESTAMP', kind='stable').drop_duplicates('TIMESTAMP', keep='last')
+            self.raw = raw.reset_index(drop=True)
+            self._process(start.normalize())
+
+    # Grid and QA the records from start (midnight; None for everything kept)
+    # on, then rebuild the aggregates of those days. Called with the lock held.
+    def _process(self, start):
+        self.version += 1
+        if not len(self.raw):
+            return
+        last = self.raw['TIMESTAMP'].iloc[-1]
+        first_day = max(last.normalize() - pd.Timedelta(days=self.config['retain_days'] - 1),
+                        self.raw['TIMESTAMP'].iloc[0].normalize())
+        self.raw = self.raw[self.raw['TIMESTAMP'] >= first_day].reset_index(drop=True)
+        if self.infill is not None and start is not None:
+            longest = max(self.infill['max_gap_minutes'].values(), default=0)
+            start = (start - pd.Timedelta(minutes=longest)).normalize()
+        if start is None or self.data is None or start < first_day:
+            start = first_day
+
+        # Records from start on, behind the ones the look-back tests need
+        step = pd.Timedelta(seconds=self.interval)
+        grid_start = max(first_day, start - qa.lookback(self.settings) * step)
+        raw = self.raw[self.raw['TIMESTAMP'] >= grid_start]
+        empty = pd.DataFrame(index=pd.date_range(grid_start, last, freq=step),
+                             columns=raw.columns.drop('TIMESTAMP')).rename_axis('TIMESTAMP')
+        block = raw.set_index('TIMESTAMP').combine_first(empty).reset_index()
+        block['TIMESTAMP'] = pd.to_datetime(block['TIMESTAMP'])
+        block = qa.apply_qa(block.drop('RECORD', axis=1), self.settings)
+        if self.infill is not None:
+            block = infill.fill_gaps(block, self.infill, self.interval)
+        block = block[block['TIMESTAMP'] >= start]
+
+        kept = self.data
+        if kept is not None:
+            kept = kept[(kept['TIMESTAMP'] >= first_day) & (kept['TIMESTAMP'] < start)]
+        self.data = pd.concat([kept, block], ignore_index=True) if kept is not None and len(kept) else \
+            block.reset_index(drop=True)
+
+        days = {day: aggregate for day, aggregate in self.days.items() if first_day <= day < start}
+        observed = infill.observed(block).replace(qa.QA_FLAG, np.nan)
+        times = self.raw['TIMESTAMP']
+        day = start
+        while day <= last:
+            today = streamstats.day_slice(block['TIMESTAMP'], day, self.interval)
+            days[day] = self._aggregate(day, block.iloc[today], observed.iloc[today],
+                                        streamstats.day_slice(times, day, self.interval), last)
+            day += pd.Timedelta(days=1)
+        self.days = days
+
+    # Daily aggregates of one day: report statistics, missing, flagged and
+    # estimated counts, and the day's report lines
+    def _aggregate(self, day, rows, observed, raw_rows, last):
+        stats = streamstats.DayStats()
+        for var in streamstats.REPORT_VARIABLES:
+            stats.stats[var] = streamstats.RunningStats.from_array(observed[var])
+        step = pd.Timedelta(seconds=self.interval)
+        expected = streamstats.max_observations(self.interval)
+        if last < day + pd.Timedelta(days=1) - step:
+            expected = int((last - day) / step) + 1
+        records = int(raw_rows.stop - raw_rows.start)
+        report = streamstats.report_day(streamstats.daily_filename(day), expected - records, stats)
+        if (self.settings.get('solar') or {}).get('report'):
+            report += solar.report_day(observed['TIMESTAMP'], observed['SRAD'], self.settings, self.station)
+        return {'date': day.strftime('%Y-%m-%d'),
+                'records': records,
+                'missing': expected - records,
+                'stats': stats,
+                'flagged': {var: int((rows[var] == qa.QA_FLAG).sum()) for var in qa.QA_VARIABLES + ['CHIL']
+                            if var in rows},
+                'estimated': {var[:-len(infill.FLAG_SUFFIX)]: int(rows[var].sum()) for var in rows
+                              if var.endswith(infill.FLAG_SUFFIX)},
+                'report': report}
+
+    # The data, daily aggregates and version as they are now
+    def snapshot(self):
+        with self.lock:
+            return self.data, self.days, self.version
+
+
+##############################################################################################################################
+
+# Requests
+
+
+# Stations held by the service and the answers to requests about them
+class Service:
+
+    def __init__(self, settings, stations, config):
+        self.settings = settings
+        self.config = config
+        self.stations = {station: StationState(station, paths, settings, config)
+                         for station, paths in stations.items()}
+        self.figures = OrderedDict()
+        self.figure_lock = threading.Lock()
+        figures._init_worker()
+
+    # Poll every station for new records until stop is set
+    def follow(self, stop):
+        while not stop.wait(self.config['poll_seconds']):
+            for state in self.stations.values():
+                try:
+                    state.poll()
+                except (OSError, ValueError) as error:
+                    print("{}: raw files not read ({})".format(state.station, error), file=sys.stderr)
+
+    # (content type, body) for a request path split on '/' and its query
+    # arguments; KeyError for what does not exist, ValueError for bad arguments
+    def respond(self, parts, query):
+        if parts in ([''], ['stations']):
+            return 'application/json', self.list_stations()
+        if len(parts) != 2 or parts[0] not in ('report', 'days', 'stats', 'data', 'figure'):
+            raise KeyError('/'.join(parts))
+        state = self.stations[parts[1]]
+        data, days, version = state.snapshot()
+        if data is None:
+            raise KeyError(parts[1] + ' has no data')
+        start = pd.Timestamp(query.get('start', data['TIMESTAMP'].iloc[0]))
+        end = pd.Timestamp(query.get('end', data['TIMESTAMP'].iloc[-1]))
+        if parts[0] in ('report', 'days'):
+            chosen = [days[day] for day in sorted(days) if start.normalize() <= day <= end.normalize()]
+            if parts[0] == 'report':
+                text = streamstats.report_header(self.settings['data_filename'])
+                return 'text/plain', (text + ''.join(day['report'] for day in chosen)).encode('utf-8')
+            return 'application/json', json.dumps([self.day_json(day) for day in chosen]).encode('utf-8')
+
+        times = data['TIMESTAMP']
+        window = data.iloc[times.searchsorted(start, side='left'):times.searchsorted(end, side='right')]
+        if parts[0] == 'data':
+            return 'text/csv', window.fillna('-9999').to_csv().encode('utf-8')
+        observed = infill.observed(window).replace(qa.QA_FLAG, np.nan)
+        if parts[0] == 'stats':
+            if 'var' not in query:
+                raise ValueError('stats needs var=VARIABLE')
+            return 'application/json', json.dumps(self.window_stats(observed, query['var'])).encode('utf-8')
+        return 'image/png', self.figure(state.station, version, start, end, observed)
+
+    def list_stations(self):
+        stations = {}
+        for station, state in self.stations.items():
+            data, days, version = state.snapshot()
+            stations[station] = {'first': None if data is None else str(data['TIMESTAMP'].iloc[0]),
+                                 'last': None if data is None else str(data['TIMESTAMP'].iloc[-1]),
+                                 'records': 0 if data is None else len(data),
+                                 'interval_seconds': state.interval,
+                                 'days': len(days),
+                                 'version': version}
+        return json.dumps(stations).encode('utf-8')
+
+    @staticmethod
+    def day_json(day):
+        result = {k: day[k] for k in ('date', 'records', 'missing', 'flagged', 'estimated')}
+        result['stats'] = {var: {'count': s.count, 'min': _number(s.min), 'max': _number(s.max),
+                                 'mean': _number(s.mean)} for var, s in day['stats'].stats.items()}
+        return result
+
+    # Count, min, max (and when) and mean of one variable over a window
+    @staticmethod
+    def window_stats(observed, var):
+        if var not in observed:
+            raise KeyError(var)
+        values = observed[var].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        result = {'variable': var, 'count': int(valid.sum()), 'min': None, 'min_time': None,
+                  'max': None, 'max_time': None, 'mean': None}
+        if result['count']:
+            times = observed['TIMESTAMP'].to_numpy()
+            low, high = np.nanargmin(values), np.nanargmax(values)
+            result.update({'min': float(values[low]), 'min_time': str(pd.Timestamp(times[low])),
+                           'max': float(values[high]), 'max_time': str(pd.Timestamp(times[high])),
+                           'mean': float(values[valid].mean())})
+        return result
+
+    # PNG wind figure of a window, rendered once per version of the data
+    def figure(self, station, version, start, end, observed):
+        key = (station, version, start, end)
+        with self.figure_lock:
+            if key in self.figures:
+                self.figures.move_to_end(key)
+                return self.figures[key]
+            if not len(observed):
+                raise ValueError('no records between {} and {}'.format(start, end))
+            config = dict(figures.DEFAULT_FIGURES, **(self.settings.get('figures') or {}))
+            png = io.BytesIO()
+            figures.render(figures.wind_job(png, station, observed, config,
+                                            self.settings['variable']['wind_histogram_bins']))
+            self.figures[key] = png.getvalue()
+            while len(self.figures) > max(self.config['figure_cache'], 1):
+                self.figures.popitem(last=False)
+            return self.figures[key]
+
+
+##############################################################################################################################
+
+# Server
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    verbose = False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        status = 200
+        try:
+            content_type, body = self.server.service.respond(url.path.strip('/').split('/'), query)
+        except KeyError as error:
+            content_type, body, status = 'text/plain', 'Not found: {}\n'.format(error.args[0]).encode(), 404
+        except ValueError as error:
+            content_type, body, status = 'text/plain', 'Bad request: {}\n'.format(error).encode(), 400
+        except Exception as error:
+            self.log_error("%s failed: %r", self.path, error)
+            content_type, body, status = 'text/plain', 'Error: {!r}\n'.format(error).encode(), 500
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Unix socket clients have no address
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+class HTTPService(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class UnixHTTPService(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# Build a server from its settings string: http://HOST:PORT or unix:PATH
+def make_server(spec, service):
+    if spec.startswith('http://'):
+        host, port = spec[len('http://'):].rstrip('/').rsplit(':', 1)
+        server = HTTPService((host, int(port)), Handler)
+    elif spec.startswith('unix:'):
+        path = spec[len('unix:'):]
+        if os.path.exists(path):
+            os.remove(path)
+        server = UnixHTTPService(path, Handler)
+    else:
+        raise ValueError("Unknown service address {!r} (use http://HOST:PORT or unix:PATH)".format(spec))
+    server.service = service
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Resident station data service')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('stations', nargs='*',
+                        help='STATION=PATH[,PATH...] raw files of more stations to hold')
+    parser.add_argument('--listen', help='Override the address (http://HOST:PORT or unix:PATH)')
+    parser.add_argument('--verbose', action='store_true', help='Log every request to stderr')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    config = service_settings(settings)
+    if args.listen:
+        config['listen'] = args.listen
+    stations = {settings.get('station', 'NWC0'): settings.get("data_files") or [settings["data_file"]]}
+    for spec in args.stations:
+        station, paths = spec.split('=', 1)
+        stations[station] = paths.split(',')
+    Handler.verbose = args.verbose
+
+    service = Service(settings, stations, config)
+    server = make_server(config['listen'], service)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    stop = threading.Event()
+    threading.Thread(target=service.follow, args=(stop,), daemon=True).start()
+    print("Serving {} on {}".format(', '.join(service.stations), config['listen']), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if config['listen'].startswith('unix:'):
+            os.remove(config['listen'][len('unix:'):])
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: solar.py
+# Version: 1.1.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Vectorized solar position and clear-sky irradiance for whole timestamp
+#   arrays, used by the "SRAD above clear sky" QA test and the daily
+#   insolation line of the summary report.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - Clear-sky irradiance from the ASCE standardized
+#                        clear-sky formula with the station elevation
+#   1.1.1 - 10/19/2026 - Daily files are read back without the infilled
+#                        (estimated) values
+#
+# Inputs:
+#  * YAML settings file (stations block with coordinates and elevation, solar
+#    block)
+#  * Timestamps (and SRAD) of a station's records.
+#
+# Outputs:
+#  * Cosine of the solar zenith angle, clear-sky global irradiance (W/m^2)
+#    and daily insolation (MJ/m^2).
+#
+# Usage:
+#   python solar.py settings.yaml NWC0 ../Data/csv/*.dat
+#
+# Notes:
+#   * The declination, equation of time and Earth-Sun distance only depend on
+#     the day of the year, so they are computed once for days 1-366 (Spencer,
+#     1971) and looked up, leaving one cosine per record.
+#   * Clear-sky irradiance is the ASCE-EWRI (2005) standardized clear-sky
+#     radiation, (0.75 + 2e-5 elevation) times the extraterrestrial irradiance
+#     on a horizontal surface. The Haurwitz (1945) model used before peaks
+#     near 610 W/m^2 at NWC0 in early February, well below the 710-730 W/m^2
+#     measured then, and put the clear Feb 1 2021 (15.78 MJ/m^2) above clear
+#     sky (13.94). This formula gives 15.53, 15.67 and 15.81 MJ/m^2 for
+#     Feb 1-3 2021 (observed 15.78, 15.00 and 13.44).
+#   * Records are 5 minute averages stamped at the end of the interval, so
+#     the sun is placed at the middle of the interval. utc_offset in the
+#     stations block gives how far the logger clock is ahead of UTC (hours).
+#     Solar noon comes out at 18:45 UTC at NWC0 in early February, as it
+#     should at 97.44 W. The SRAD curve of the Feb 2021 sample fits the sun
+#     best 1.1-1.35 hours earlier, so that logger clock runs behind UTC.
+#     Shifting the sun that much leaves a day's clear-sky total unchanged
+#     (all of the daylight stays inside the UTC day), but matters for the
+#     record by record clear-sky QA test.
+#   * Insolation sums the valid SRAD records of a day, so missing records
+#     during daylight make it low.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import yaml
+import numpy as np
+import pandas as pd
+import infill
+
+# Solar settings used when the settings file leaves them out
+DEFAULT_SOLAR = {'interval_minutes': 5,
+                 'report': False}
+
+# Solar constant (W/m^2)
+SOLAR_CONSTANT = 1367.0
+
+
+# Day of year terms (index = day of year, 1-366): declination (radians),
+# equation of time (minutes) and Earth-Sun distance factor (r0/r)^2
+def _day_terms():
+    gamma = 2 * np.pi * (np.arange(367) - 1) / 365
+    declination = (0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+                   - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+                   - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma))
+    equation_of_time = 229.18 * (0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+                                 - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma))
+    distance = (1.000110 + 0.034221 * np.cos(gamma) + 0.001280 * np.sin(gamma)
+                + 0.000719 * np.cos(2 * gamma) + 0.000077 * np.sin(2 * gamma))
+    return declination, equation_of_time, distance
+
+
+DECLINATION, EQUATION_OF_TIME, DISTANCE = _day_terms()
+
+
+# Latitude, longitude, logger clock offset (hours ahead of UTC) and elevation
+# (m) of a station
+def location(settings, station):
+    meta = (settings.get('stations') or {}).get(station)
+    if meta is None:
+        raise ValueError("No coordinates in the stations block for " + station)
+    return meta['latitude'], meta['longitude'], meta.get('utc_offset', 0), meta.get('elevation', 0)
+
+
+# UTC times of the middle of each averaging interval of logger timestamps
+def _sun_times(times, utc_offset=0, interval_minutes=5):
+    return pd.DatetimeIndex(times) - pd.Timedelta(hours=utc_offset) - pd.Timedelta(minutes=interval_minutes / 2)
+
+
+# Cosine of the solar zenith angle for an array of logger timestamps, taking
+# the sun at the middle of each averaging interval
+def cos_zenith(times, latitude, longitude, utc_offset=0, interval_minutes=5):
+    times = _sun_times(times, utc_offset, interval_minutes)
+    day = times.dayofyear.to_numpy()
+    minutes = (times.hour * 60 + times.minute + times.second / 60).to_numpy()
+    solar_minutes = minutes + 4 * longitude + EQUATION_OF_TIME[day]
+    hour_angle = np.radians(solar_minutes / 4 - 180)
+    lat = np.radians(latitude)
+    decl = DECLINATION[day]
+    return np.sin(lat) * np.sin(decl) + np.cos(lat) * np.cos(decl) * np.cos(hour_angle)
+
+
+# ASCE standardized clear-sky irradiance (W/m^2) for arrays of cos(zenith)
+# and Earth-Sun distance factor, at an elevation (m)
+def clear_sky(cosz, distance=1.0, elevation=0.0):
+    return (0.75 + 2e-5 * elevation) * SOLAR_CONSTANT * distance * np.maximum(cosz, 0.0)
+
+
+# Clear-sky irradiance (W/m^2) at a station for an array of logger timestamps
+def station_clear_sky(times, settings, station):
+    config = dict(DEFAULT_SOLAR, **(settings.get('solar') or {}))
+    latitude, longitude, utc_offset, elevation = location(settings, station)
+    day = _sun_times(times, utc_offset, config['interval_minutes']).dayofyear.to_numpy()
+    return clear_sky(cos_zenith(times, latitude, longitude, utc_offset, config['interval_minutes']),
+                     DISTANCE[day], elevation)
+
+
+# Energy (MJ/m^2) of a series of irradiance averages (W/m^2); missing skipped
+def insolation(values, interval_minutes=5):
+    values = np.asarray(values, dtype=float)
+    return np.nansum(values) * interval_minutes * 60 / 1e6
+
+
+# Summary report line for observed and clear-sky insolation (MJ/m^2)
+def report_line(observed, possible):
+    return "\n\t \t Insolation (MJ/m2) :    Obs: {:8.2f}    Clear sky: {:8.2f}".format(observed, possible)
+
+
+# Summary report line with the day's observed and clear-sky insolation
+def report_day(times, srad, settings, station):
+    config = dict(DEFAULT_SOLAR, **(settings.get('solar') or {}))
+    observed = insolation(srad, config['interval_minutes'])
+    possible = insolation(station_clear_sky(times, settings, station), config['interval_minutes'])
+    return report_line(observed, possible)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Daily observed and clear-sky insolation')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('station', help='Station the daily files belong to')
+    parser.add_argument('files', nargs='+', help='Daily CSV files (NWC_YYYYMMDD.dat)')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    interval = dict(DEFAULT_SOLAR, **(settings.get('solar') or {}))['interval_minutes']
+    for path in sorted(args.files):
+        day = infill.read_daily(path)
+        srad = day['SRAD'].where(day['SRAD'] > -998)
+        possible = station_clear_sky(day['TIMESTAMP'], settings, args.station)
+        ratio = (srad / np.where(possible > 50, possible, np.nan)).max()
+        print("{}  observed {:6.2f} MJ/m2  clear sky {:6.2f} MJ/m2  peak obs/clear {:5.2f}".format(
+            day['TIMESTAMP'].iloc[0].strftime('%Y-%m-%d'), insolation(srad, interval),
+            insolation(possible, interval), ratio))
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: spatial.py
+# Version: 1.2.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Cross-station spatial QA. Aligns every station on the shared 5 minute
+#   grid and compares each station's TAIR, RELH and WSPD with an inverse
+#   distance weighted estimate from its nearest neighbours, flagging values
+#   that stray too far from it. The whole network is checked in one pass.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - KD-tree neighbour search, time axis checked in
+#                        chunks, estimates leave out only the judged station
+#   1.2.0 - 10/19/2026 - check_station: optional stage of qa.check_variables
+#                        against the other stations' daily archives
+#   1.2.1 - 10/19/2026 - Daily files are read back without the infilled
+#                        (estimated) values
+#
+# Inputs:
+#  * YAML settings file (stations block with coordinates, spatial block)
+#  * Range-checked data for each station, from Programming Lab 6.py or the
+#    daily CSV archive (one directory of NWC_YYYYMMDD.dat files per station).
+#  * As a QA stage (spatial: enabled), the station being processed and the
+#    daily archives of the stations listed in spatial: archives.
+#
+# Outputs:
+#  * The same data with spatial outliers set to the QA flag (-998).
+#  * Optional CSV of the flagged values and their neighbour estimates.
+#
+# Usage:
+#   python spatial.py settings.yaml NWC0=../Data/csv NWC7=/path/to/NWC7/csv
+#   (or set spatial: enabled: true to run it inside the QA of every tool)
+#
+# Notes:
+#   * Neighbours are the nearest `neighbours` stations within max_distance_km,
+#     weighted by 1 / distance ** power. They are found with a KD-tree
+#     (scipy.spatial.cKDTree) on the stations' positions as unit vectors,
+#     where the straight-line distance orders stations the same way as the
+#     great-circle distance. Without scipy a great-circle distance table of
+#     every pair of stations is used instead (fine for a few hundred).
+#   * Values that are missing or already QA-flagged by the range checks are
+#     never used in an estimate, and a value is only judged when at least
+#     min_neighbours of its neighbours reported at the same time.
+#   * A value is flagged when it is more than the variable's tolerance away
+#     from the estimate. Each estimate leaves out only the judged station's
+#     own value, so a spatial flag never removes a station from its
+#     neighbours' estimates.
+#   * The time axis is checked chunk_days at a time, which bounds the memory
+#     of the (stations, neighbours, times, variables) neighbour values.
+#   * With spatial: enabled, qa.check_variables runs check_station after the
+#     range, step and clear-sky tests (and before wind chill), so spatial
+#     flags reach the daily files and the report. Only the archive files of
+#     the days the data covers are read.
+#   * interval_minutes is the table's record interval (set from the table by
+#     streamstats.with_interval, like the other record-counting blocks).
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import glob
+import os
+import yaml
+import numpy as np
+import pandas as pd
+import infill
+import qa
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+# Spatial QA settings used when the settings file leaves them out
+DEFAULT_SPATIAL = {'enabled': False,
+                   'archives': {},
+                   'tolerance': {'TAIR': 5.0, 'RELH': 20.0, 'WSPD': 5.0},
+                   'neighbours': 4,
+                   'min_neighbours': 2,
+                   'max_distance_km': 100.0,
+                   'power': 2,
+                   'interval_minutes': 5,
+                   'chunk_days': 7}
+
+# Mean radius of the Earth (km)
+EARTH_RADIUS = 6371.0
+
+# Values in the data that are not observations
+MISSING_VALUES = [-9999, -998]
+
+
+# Spatial QA settings merged over the defaults
+def spatial_settings(settings):
+    config = dict(DEFAULT_SPATIAL, **(settings.get('spatial') or {}))
+    config['tolerance'] = dict(DEFAULT_SPATIAL['tolerance'], **config['tolerance'])
+    return config
+
+
+# Station names and coordinates (degrees) from the stations block
+def station_coordinates(settings, names):
+    stations = settings.get('stations') or {}
+    missing = [name for name in names if name not in stations]
+    if missing:
+        raise ValueError("No coordinates in the stations block for " + ", ".join(missing))
+    lat = np.array([stations[name]['latitude'] for name in names], dtype=float)
+    lon = np.array([stations[name]['longitude'] for name in names], dtype=float)
+    return lat, lon
+
+
+# Great-circle distance (km) between every pair of points
+def distance_table(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+# Position of every point as a unit vector on the sphere (stations, 3)
+def unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+# Nearest k other stations of every station and their great-circle distance
+# (km), from a KD-tree; slots with no station within max_distance_km hold
+# index 0 and an infinite distance
+def nearest_stations(lat, lon, k, max_distance_km):
+    points = unit_vectors(lat, lon)
+    chord = 2 * np.sin(min(max_distance_km / EARTH_RADIUS, np.pi) / 2)
+    found, index = cKDTree(points).query(points, k=k + 1, distance_upper_bound=chord * (1 + 1e-9))
+    # Drop each station itself (not always the first hit when stations
+    # share coordinates)
+    found, index = found.reshape(len(lat), -1), index.reshape(len(lat), -1)
+    order = np.argsort(index == np.arange(len(lat))[:, None], axis=1, kind='stable')[:, :k]
+    found = np.take_along_axis(found, order, axis=1)
+    index = np.take_along_axis(index, order, axis=1)
+    nearest = 2 * EARTH_RADIUS * np.arcsin(np.clip(found / 2, 0, 1))
+    return np.where(np.isinf(found), 0, index), nearest
+
+
+# Nearest neighbours of every station: (index, weight) arrays of shape
+# (stations, neighbours), with zero weight where a slot has no neighbour
+def neighbour_table(lat, lon, config):
+    k = max(0, min(config['neighbours'], len(lat) - 1))
+    if cKDTree is not None and k > 0:
+        index, nearest = nearest_stations(lat, lon, k, config['max_distance_km'])
+    else:
+        distance = distance_table(lat, lon)
+        np.fill_diagonal(distance, np.inf)
+        index = np.argsort(distance, axis=1, kind='stable')[:, :k]
+        nearest = np.take_along_axis(distance, index, axis=1)
+    with np.errstate(divide='ignore'):
+        weight = np.where(nearest <= config['max_distance_km'],
+                          1.0 / np.maximum(nearest, 1e-3) ** config['power'], 0.0)
+    return index, weight
+
+
+# Put every station on the shared time grid: (times, cube) where cube has shape
+# (stations, times, variables) and missing or flagged values are NaN
+def align(stations, variables, interval_minutes=5):
+    frames = {}
+    for name, data in stations.items():
+        frame = data.set_index(pd.to_datetime(data['TIMESTAMP']))
+        frame = frame[~frame.index.duplicated(keep='last')]
+        frames[name] = frame.reindex(columns=variables).apply(pd.to_numeric, errors='coerce')
+    start = min(frame.index.min() for frame in frames.values())
+    end = max(frame.index.max() for frame in frames.values())
+    times = pd.date_range(start.floor('D'), end, freq='{}min'.format(interval_minutes))
+    cube = np.stack([frame.reindex(times).to_numpy(dtype=float) for frame in frames.values()])
+    cube[np.isin(cube, MISSING_VALUES)] = np.nan
+    return times, cube
+
+
+# Neighbour estimate, neighbour count and outlier flags for the whole cube.
+# Every station is estimated from its neighbours' values alone (never its
+# own), chunk time steps at a time so only one chunk of neighbour values
+# (stations, k, chunk, variables) is held at once.
+def spatial_check(cube, index, weight, tolerance, min_neighbours, chunk=2016):
+    estimate = np.full(cube.shape, np.nan)
+    count = np.zeros(cube.shape, dtype=int)
+    for start in range(0, cube.shape[1], max(1, chunk)):
+        part = slice(start, start + max(1, chunk))
+        values = cube[:, part][index]   # (stations, k, chunk, variables)
+        w = np.where(np.isnan(values), 0.0, weight[:, :, None, None])
+        total = w.sum(axis=1)
+        count[:, part] = (w > 0).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            estimate[:, part] = np.nansum(values * w, axis=1) / total
+    judged = (count >= min_neighbours) & ~np.isnan(cube)
+    with np.errstate(invalid='ignore'):
+        flags = judged & (np.abs(cube - estimate) > tolerance)
+    return estimate, count, flags
+
+
+# Spatial QA of a whole network ({station: data frame}). Outliers are set to
+# the QA flag in place; returns a data frame listing every flagged value.
+def apply_spatial_qa(stations, settings):
+    config = spatial_settings(settings)
+    names = list(stations)
+    variables = list(config['tolerance'])
+    columns = ['TIMESTAMP', 'station', 'variable', 'value', 'estimate', 'neighbours']
+    if len(names) < 2:
+        return pd.DataFrame(columns=columns)
+
+    lat, lon = station_coordinates(settings, names)
+    index, weight = neighbour_table(lat, lon, config)
+    times, cube = align(stations, variables, config['interval_minutes'])
+    tolerance = np.array([config['tolerance'][var] for var in variables])
+    chunk = int(config['chunk_days'] * 1440 // config['interval_minutes'])
+    estimate, count, flags = spatial_check(cube, index, weight, tolerance, config['min_neighbours'], chunk)
+
+    s, t, v = np.nonzero(flags)
+    flagged = pd.DataFrame({'TIMESTAMP': times[t],
+                            'station': np.array(names)[s],
+                            'variable': np.array(variables)[v],
+                            'value': cube[s, t, v],
+                            'estimate': estimate[s, t, v].round(2),
+                            'neighbours': count[s, t, v]}, columns=columns)
+    for (name, var), group in flagged.groupby(['station', 'variable']):
+        data = stations[name]
+        hit = pd.to_datetime(data['TIMESTAMP']).isin(group['TIMESTAMP'])
+        data[var] = data[var].mask(hit, qa.QA_FLAG)
+    return flagged
+
+
+# Read one station's daily CSV archive back into a single data frame (only
+# the files of the given days, if any)
+def read_daily_archive(directory, variables, days=None):
+    files = sorted(glob.glob(os.path.join(directory, '*.dat')))
+    if days is not None:
+        stamps = {day.strftime('%Y%m%d') for day in days}
+        files = [path for path in files if os.path.basename(path)[-12:-4] in stamps]
+    frames = [infill.read_daily(path, ['TIMESTAMP'] + variables) for path in files]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['TIMESTAMP'] + variables)
+
+
+# Spatial QA stage for one station's data (settings['station']) against the
+# daily archives of the stations in spatial: archives. Outliers of the
+# station are set to the QA flag in place.
+def check_station(data, settings):
+    config = spatial_settings(settings)
+    station = settings.get('station', 'NWC0')
+    times = pd.to_datetime(data['TIMESTAMP'])
+    if not len(times.dropna()):
+        return data
+    days = pd.date_range(times.min().normalize(), times.max().normalize(), freq='D')
+    stations = {station: data}
+    for name, directory in (config['archives'] or {}).items():
+        if name != station:
+            archive = read_daily_archive(directory, list(config['tolerance']), days)
+            if len(archive):
+                stations[name] = archive
+    apply_spatial_qa(stations, settings)
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Cross-station spatial QA')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('stations', nargs='+', help='STATION=DIRECTORY of daily CSV files')
+    parser.add_argument('-o', '--output', help='CSV file listing the flagged values')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    variables = list(spatial_settings(settings)['tolerance'])
+    stations = {}
+    for spec in args.stations:
+        station, directory = spec.split('=', 1)
+        stations[station] = read_daily_archive(directory, variables)
+    flagged = apply_spatial_qa(stations, settings)
+
+    counts = flagged.groupby(['station', 'variable']).size()
+    for station in stations:
+        for var in variables:
+            print("{:6} {:5} flagged: {}".format(station, var, counts.get((station, var), 0)))
+    if args.output:
+        flagged.to_csv(args.output, index=False)
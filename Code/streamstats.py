@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:30:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: streamstats.py
+# Version: 1.4.0
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Constant-memory statistics for the QA summary report. Every variable keeps
+#   a mergeable running accumulator (count, min, max and a Welford mean and
+#   variance) per day, fed record by record or chunk by chunk, so the report
+#   can be written from an unbounded stream or from partial results computed
+#   in parallel and merged together.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - Missing observations and day windows follow the
+#                        table's record interval instead of 5 minutes
+#   1.2.0 - 10/19/2026 - raw_columns: the raw fields the main script and the
+#                        pipeline read
+#   1.2.1 - 10/19/2026 - spatial is one of the record interval blocks
+#   1.3.0 - 10/19/2026 - Insolation line in the streaming report (solar:
+#                        report), the same as in Programming Lab 6.py
+#   1.4.0 - 10/19/2026 - grid_block: one block of the record grid joined with
+#                        the raw records, for the main script's day blocks
+#
+# Inputs:
+#  * YAML settings file (data_file(s), data_filename, output_file_path,
+#    start_date, end_date, variable QA limits)
+#
+# Outputs:
+#  * Summary report in the same format as Programming Lab 6.py.
+#
+# Usage:
+#   python streamstats.py settings.yaml --chunksize 100000 --workers 4
+#
+# Notes:
+#   * Partial results are merged with Chan et al.'s pairwise update, so the
+#     mean and variance come out the same whatever order they are merged in
+#     (up to floating point rounding).
+#   * Streamed files are not merged on (TIMESTAMP, RECORD) first, so the
+#     input files for a streaming run must not overlap.
+#   * The record interval is the most common time step of the first file's
+#     first chunk (17,280 records a day for a 5 s scan table).
+#   * With solar: report, SRAD is accumulated too. The observed insolation
+#     is its running sum, and the clear-sky insolation is computed over the
+#     day's record grid, as Programming Lab 6.py does.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import math
+import os
+import yaml
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import qa
+import solar
+import toa5
+
+# Variables summarised in the report
+REPORT_VARIABLES = ['TAIR', 'WSPD', 'CHIL', 'RAIN']
+
+# Variables computed from the others, never read from the raw files
+DERIVED_VARIABLES = ['CHIL']
+
+# Variables accumulated for the report: the report variables, plus SRAD for
+# the insolation line
+def accumulated_variables(settings):
+    if (settings.get('solar') or {}).get('report'):
+        return REPORT_VARIABLES + ['SRAD']
+    return REPORT_VARIABLES
+
+
+# Settings blocks that count records at the table's record interval
+RECORD_BLOCKS = ['solar', 'events', 'catalog', 'accumulation', 'spatial']
+
+
+# Mergeable running count, min, max, mean and variance of one variable
+class RunningStats:
+
+    def __init__(self, count=0, minimum=math.nan, maximum=math.nan, mean=0.0, m2=0.0):
+        self.count = count
+        self.min = minimum
+        self.max = maximum
+        self._mean = mean
+        self.m2 = m2
+
+    # Add a single value (missing values are skipped)
+    def update(self, value):
+        if value is None or value != value:
+            return
+        self.count += 1
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self.m2 += delta * (value - self._mean)
+        self.min = value if not self.min <= value else self.min
+        self.max = value if not self.max >= value else self.max
+
+    # Add a whole array at once (missing values are skipped)
+    def update_array(self, values):
+        self.merge(RunningStats.from_array(values))
+
+    # Fold another accumulator into this one
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.min, self.max = other.count, other.min, other.max
+            self._mean, self.m2 = other._mean, other.m2
+            return self
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @classmethod
+    def from_array(cls, values):
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        count = int(valid.sum())
+        if count == 0:
+            return cls()
+        # Sum with missing values as zero, the same way pandas takes a mean
+        mean = np.where(valid, values, 0.0).sum() / count
+        values = values[valid]
+        return cls(count, values.min(), values.max(), mean,
+                   float(((values - mean) ** 2).sum()))
+
+    @property
+    def mean(self):
+        return self._mean if self.count else math.nan
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        return {'count': self.count, 'min': self.min, 'max': self.max,
+                'mean': self._mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['count'], d['min'], d['max'], d['mean'], d['m2'])
+
+
+# Running statistics for one day: raw observation count plus one accumulator
+# per report variable
+class DayStats:
+
+    def __init__(self, variables=REPORT_VARIABLES):
+        self.observations = 0
+        self.stats = {var: RunningStats() for var in variables}
+
+    # Add one QA-ed record (dict of variable -> value)
+    def update(self, record):
+        self.observations += 1
+        for var, stats in self.stats.items():
+            stats.update(record.get(var))
+
+    def merge(self, other):
+        self.observations += other.observations
+        for var, stats in other.stats.items():
+            self.stats.setdefault(var, RunningStats()).merge(stats)
+        return self
+
+    def __getitem__(self, var):
+        return self.stats[var]
+
+
+# Feed a QA-ed chunk into per-day accumulators (QA flags count as missing)
+def accumulate(chunk, days, variables=REPORT_VARIABLES):
+    values = chunk[variables].replace(qa.QA_FLAG, np.nan)
+    groups = values.groupby(chunk['TIMESTAMP'].dt.normalize())
+    summary = groups.agg(['count', 'min', 'max', 'mean', 'var'])
+    rows = groups.size()
+    for day, row in summary.iterrows():
+        partial = DayStats(variables)
+        partial.observations = int(rows[day])
+        for var in variables:
+            n = int(row[(var, 'count')])
+            if n:
+                m2 = row[(var, 'var')] * (n - 1) if n > 1 else 0.0
+                partial.stats[var] = RunningStats(n, row[(var, 'min')], row[(var, 'max')],
+                                                  row[(var, 'mean')], m2)
+        days.setdefault(day.to_pydatetime(), DayStats(variables)).merge(partial)
+    return days
+
+
+# Merge several {day: DayStats} partial results
+def merge_days(*partials):
+    merged = {}
+    for partial in partials:
+        for day, stats in partial.items():
+            merged.setdefault(day, DayStats(list(stats.stats))).merge(stats)
+    return merged
+
+
+##############################################################################################################################
+
+# Summary report text (shared with Programming Lab 6.py)
+
+
+def report_header(data_filename):
+    return ("Statistics Report (QA) \n" "Input file: " + data_filename
+            + "\n" "Output Data: ")
+
+
+def report_day(filename, missing, day):
+    max_temp = "{:8.2f}".format(day["TAIR"].max)
+    min_temp = "{:8.2f}".format(day["TAIR"].min)
+    avg_temp = "{:8.2f}".format(day["TAIR"].mean)
+
+    max_wind = "{:8.2f}".format(day["WSPD"].max)
+    min_wind = "{:8.2f}".format(day["WSPD"].min)
+    avg_wind = "{:8.2f}".format(day["WSPD"].mean)
+
+    total_rf = "{:8.2f}".format(day["RAIN"].max)
+
+    max_chill = "{:8.2f}".format(day["CHIL"].max)
+    min_chill = "{:8.2f}".format(day["CHIL"].min)
+    avg_chill = "{:8.2f}".format(day["CHIL"].mean)
+
+    return ("\n \t File: " + filename + "\n" "\t \t Missing Observations: " + str(missing) + "\n" +
+            "\t \t Air Temperature (C):    Max: {:7}    Min: {:7}    Avg: {:7} \n".format(max_temp, min_temp, avg_temp) +
+            "\t \t Wind Speed (m/s)   :    Max: {:7}    Min: {:7}    Avg: {:7} \n".format(max_wind, min_wind, avg_wind) +
+            "\t \t Wind Chill (C)     :    Max: {:7}    Min: {:7}    Avg: {:7} \n".format(max_chill, min_chill, avg_chill) +
+            "\t \t Precipitation (mm) :   {:7}".format(total_rf))
+
+
+# Daily file name used by the report for a given day
+def daily_filename(day):
+    return "NWC_{}{:02d}{:02d}.dat".format(day.year, day.month, day.day)
+
+
+# Observations in a full day of records every interval_seconds
+def max_observations(interval_seconds=300):
+    return (24 * 60 * 60) / interval_seconds
+
+
+# Rows of a sorted time stamp column that fall in one day, from midnight to
+# one record interval before the next, found by binary search
+def day_slice(times, date, interval_seconds=300):
+    first = pd.Timestamp(date.year, date.month, date.day)
+    last = first + pd.Timedelta(days=1) - pd.Timedelta(seconds=interval_seconds)
+    return slice(times.searchsorted(first, side='left'), times.searchsorted(last, side='right'))
+
+
+# Rows of a sorted time stamp column from lo up to but not including hi
+# (None leaves that end open), found by binary search
+def time_slice(times, lo=None, hi=None):
+    first = 0 if lo is None else times.searchsorted(lo, side='left')
+    last = len(times) if hi is None else times.searchsorted(hi, side='left')
+    return slice(first, last)
+
+
+# The record grid from start to end joined with the raw records (off-grid
+# records kept, RECORD dropped), for the times from lo up to but not
+# including hi only. Blocks of consecutive [lo, hi) ranges put back together
+# give the whole grid, so a long period never has to be built at once.
+def grid_block(raw, start, end, interval_seconds, lo=None, hi=None):
+    step = pd.Timedelta(seconds=interval_seconds)
+    first = start if lo is None or lo <= start else start + math.ceil((lo - start) / step) * step
+    last = end if hi is None else min(end, hi - pd.Timedelta(1))
+    grid = pd.date_range(first, last, freq=step) if first <= last else pd.DatetimeIndex([])
+    block = raw.iloc[time_slice(raw['TIMESTAMP'], lo, hi)].drop(columns='RECORD').set_index('TIMESTAMP')
+    return block.reindex(block.index.union(grid)).rename_axis('TIMESTAMP').reset_index()
+
+
+# Raw fields to read: the QA and report variables plus extra_variables (the
+# other fields kept in the daily files), or None for every field when the
+# settings file has no extra_variables
+def raw_columns(settings):
+    if settings.get('extra_variables') is None:
+        return None
+    columns = []
+    for var in qa.QA_VARIABLES + REPORT_VARIABLES + list(settings['extra_variables']):
+        if var not in columns and var not in DERIVED_VARIABLES:
+            columns.append(var)
+    return columns
+
+
+# Settings with the table's record interval in every block that counts records
+def with_interval(settings, interval_seconds):
+    settings = dict(settings)
+    for block in RECORD_BLOCKS:
+        settings[block] = dict(settings.get(block) or {}, interval_minutes=interval_seconds / 60)
+    return settings
+
+
+##############################################################################################################################
+
+# Streaming report
+
+
+# Stream one raw file chunk by chunk into per-day accumulators. The last
+# qa.lookback() records of a chunk are carried in front of the next one.
+def stream_file(path, settings, chunksize=100000):
+    days = {}
+    halo = qa.lookback(settings)
+    tail = None
+    for chunk in toa5.iter_toa5_chunks(path, chunksize, aliases=settings.get("field_aliases")):
+        # Files from older program versions may not log every variable
+        for var in qa.QA_VARIABLES + REPORT_VARIABLES:
+            if var not in chunk and var != 'CHIL':
+                chunk[var] = np.nan
+        block = chunk if tail is None else pd.concat([tail, chunk], ignore_index=True)
+        tail = chunk.iloc[len(chunk) - halo:].copy() if halo else None
+        block = qa.apply_qa(block, settings)
+        accumulate(block.iloc[len(block) - len(chunk):], days, accumulated_variables(settings))
+    return days
+
+
+# Write the summary report from per-day accumulators
+def write_report(path, settings, days, interval_seconds=300):
+    start_date = datetime.strptime(settings['start_date'], "%Y-%m-%d %H:%M")
+    end_date = datetime.strptime(settings['end_date'], "%Y-%m-%d %H:%M")
+    current_date = start_date
+    with open(path, 'w') as file:
+        file.write(report_header(settings["data_filename"]))
+        while current_date <= end_date:
+            day = datetime(current_date.year, current_date.month, current_date.day)
+            stats = days.get(day, DayStats())
+            file.write(report_day(daily_filename(day), max_observations(interval_seconds) - stats.observations,
+                                  stats))
+            if (settings.get('solar') or {}).get('report'):
+                file.write(insolation_line(day, start_date, end_date, stats, settings, interval_seconds))
+            current_date += timedelta(days = 1)
+
+
+# Insolation report line of one day: observed from the running SRAD sum,
+# clear sky over the day's record grid between start and end date
+def insolation_line(day, start_date, end_date, stats, settings, interval_seconds=300):
+    step = pd.Timedelta(seconds=interval_seconds)
+    times = pd.date_range(max(pd.Timestamp(day), pd.Timestamp(start_date)),
+                          min(pd.Timestamp(day) + pd.Timedelta(days=1) - step, pd.Timestamp(end_date)), freq=step)
+    srad = stats.stats.get('SRAD', RunningStats())
+    observed = srad.mean * srad.count * interval_seconds / 1e6 if srad.count else 0.0
+    possible = solar.insolation(solar.station_clear_sky(times, settings, settings.get('station', 'NWC0')),
+                                interval_seconds / 60)
+    return solar.report_line(observed, possible)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write the QA summary report in streaming mode')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('--chunksize', type=int, default=100000, help='Records per chunk')
+    parser.add_argument('--workers', type=int, default=1, help='Raw files streamed in parallel')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    data_files = settings.get("data_files") or [settings["data_file"]]
+    first = next(toa5.iter_toa5_chunks(data_files[0], args.chunksize))
+    interval = toa5.record_interval({}, first['TIMESTAMP'])
+    settings = with_interval(settings, interval)
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers) as pool:
+            partials = list(pool.map(stream_file, data_files, [settings] * len(data_files),
+                                     [args.chunksize] * len(data_files)))
+    else:
+        partials = [stream_file(path, settings, args.chunksize) for path in data_files]
+    days = merge_days(*partials)
+
+    sumdate_start = pd.to_datetime(settings['start_date']).strftime('%Y%m%d')
+    sumdate_end = pd.to_datetime(settings['end_date']).strftime('%Y%m%d')
+    qa_summary = "NWC0_REPORT_" + sumdate_start + "_" + sumdate_end
+    write_report(os.path.join(settings["output_file_path"], qa_summary + '.txt'), settings, days, interval)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: tiles.py
+# Version: 1.0.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Exports a multi-resolution pyramid of aggregate tiles (min, max, mean,
+#   count, QA flag and missing counts) for every variable, so a lightweight
+#   viewer can browse years of 5 minute data at any zoom level.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.0.1 - 10/19/2026 - Daily files are read back without the infilled
+#                        (estimated) values
+#
+# Inputs:
+#  * YAML settings file (tiles block)
+#  * QA-ed data for a station (QA flags still -998), from Programming Lab 6.py
+#    or the daily CSV archive.
+#
+# Outputs:
+#  * Tiles in tiles: directory, as STATION/VARIABLE/LEVEL/INDEX.bin (or .json)
+#  * STATION/index.json describing the levels, bin sizes and tile extents.
+#
+# Usage:
+#   python tiles.py settings.yaml NWC0 ../Data/csv/*.dat
+#
+# Notes:
+#   * Level 0 bins are base_minutes wide and every level up is factor times
+#     coarser. A tile always holds tile_size bins and tiles are numbered from
+#     the Unix epoch, so the tile for any time and zoom is
+#     floor(seconds / (bin_seconds * tile_size)) - one lookup whatever the
+#     length of the archive.
+#   * Binary tiles are little-endian records of TILE_DTYPE (24 bytes per bin).
+#     Empty bins have NaN min/max/mean and zero counts.
+#   * Only the tiles touched by new data are rewritten. Level 0 tiles take the
+#     new bins for the time range being exported, and each coarser tile is
+#     rebuilt from its children, so re-exporting a day never counts it twice.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import json
+import os
+import yaml
+import numpy as np
+import pandas as pd
+import infill
+
+# Tile settings used when the settings file leaves them out
+DEFAULT_TILES = {'directory': '',
+                 'variables': ['TAIR', 'RELH', 'SRAD', 'WSPD', 'WMAX', 'WDIR', 'RAIN', 'BATV', 'CHIL'],
+                 'base_minutes': 5,
+                 'factor': 4,
+                 'tile_size': 256,
+                 'format': 'bin'}
+
+# One aggregate bin of a tile
+TILE_DTYPE = np.dtype([('min', '<f4'), ('max', '<f4'), ('mean', '<f4'),
+                       ('count', '<u4'), ('qa_flags', '<u4'), ('missing', '<u4')])
+
+# Values that mark a failed QA check and a missing observation
+QA_FLAG = -998
+MISSING = -9999
+
+
+# An all-empty tile
+def empty_tile(size):
+    tile = np.zeros(size, dtype=TILE_DTYPE)
+    tile['min'] = tile['max'] = tile['mean'] = np.nan
+    return tile
+
+
+# Path of one tile
+def tile_path(directory, station, var, level, index, fmt='bin'):
+    return os.path.join(directory, station, var, str(level), "{}.{}".format(index, fmt))
+
+
+# Tile index holding a given time at a given level
+def tile_for(time, level, config):
+    bin_seconds = config['base_minutes'] * 60 * config['factor'] ** level
+    seconds = int(pd.Timestamp(time).value // 10**9)
+    return seconds // (bin_seconds * config['tile_size'])
+
+
+# Read one tile (None if it has never been written)
+def read_tile(directory, station, var, level, index, fmt='bin'):
+    path = tile_path(directory, station, var, level, index, fmt)
+    if not os.path.exists(path):
+        return None
+    if fmt == 'bin':
+        return np.fromfile(path, dtype=TILE_DTYPE)
+    with open(path, 'r') as f:
+        stored = json.load(f)
+    tile = empty_tile(len(stored['count']))
+    for name in TILE_DTYPE.names:
+        tile[name] = np.array(stored[name], dtype=float)
+    return tile
+
+
+def write_tile(tile, directory, station, var, level, index, fmt='bin'):
+    path = tile_path(directory, station, var, level, index, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if fmt == 'bin':
+        tile.tofile(path)
+    else:
+        stored = {name: [None if v != v else round(float(v), 3) for v in tile[name]]
+                  if tile.dtype[name].kind == 'f' else tile[name].tolist()
+                  for name in TILE_DTYPE.names}
+        with open(path, 'w') as f:
+            json.dump(stored, f, separators=(',', ':'))
+
+
+# Level 0 bins for one variable: (first bin number, bins) in O(N)
+def base_bins(times, values, bin_seconds):
+    seconds = times.astype('datetime64[s]').astype(np.int64)
+    order = np.argsort(seconds, kind='stable')
+    seconds, values = seconds[order], values[order]
+    number = seconds // bin_seconds
+    first = number[0]
+    rel = number - first
+    bins = empty_tile(rel[-1] + 1)
+
+    flagged = values == QA_FLAG
+    missing = np.isnan(values) | (values == MISSING)
+    valid = ~flagged & ~missing
+    bins['count'] = np.bincount(rel, weights=valid, minlength=len(bins))
+    bins['qa_flags'] = np.bincount(rel, weights=flagged, minlength=len(bins))
+    bins['missing'] = np.bincount(rel, weights=missing, minlength=len(bins))
+    sums = np.bincount(rel, weights=np.where(valid, values, 0.0), minlength=len(bins))
+
+    # Records are in time order, so each bin is one contiguous run
+    starts = np.flatnonzero(np.concatenate([[True], rel[1:] != rel[:-1]]))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lows = np.minimum.reduceat(np.where(valid, values, np.inf), starts)
+        highs = np.maximum.reduceat(np.where(valid, values, -np.inf), starts)
+        bins['min'][rel[starts]] = np.where(np.isfinite(lows), lows, np.nan)
+        bins['max'][rel[starts]] = np.where(np.isfinite(highs), highs, np.nan)
+        bins['mean'] = np.where(bins['count'] > 0, sums / bins['count'], np.nan)
+    return first, bins
+
+
+# Collapse factor neighbouring bins into one
+def coarsen(bins, factor):
+    groups = bins.reshape(-1, factor)
+    out = empty_tile(len(groups))
+    count = groups['count'].sum(axis=1)
+    out['count'] = count
+    out['qa_flags'] = groups['qa_flags'].sum(axis=1)
+    out['missing'] = groups['missing'].sum(axis=1)
+    out['min'] = np.fmin.reduce(groups['min'], axis=1)
+    out['max'] = np.fmax.reduce(groups['max'], axis=1)
+    sums = np.nansum(groups['mean'].astype(float) * groups['count'], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['mean'] = np.where(count > 0, sums / count, np.nan)
+    return out
+
+
+# Export one variable of a station, updating only the tiles it touches
+def export_variable(directory, station, var, times, values, config, extents):
+    size, factor, fmt = config['tile_size'], config['factor'], config['format']
+    first, bins = base_bins(times, values, config['base_minutes'] * 60)
+    last = first + len(bins) - 1
+
+    # Level 0: new bins replace whatever was stored for their time range
+    touched = {}
+    for index in range(first // size, last // size + 1):
+        tile = read_tile(directory, station, var, 0, index, fmt)
+        tile = empty_tile(size) if tile is None else tile
+        lo, hi = max(first, index * size), min(last, (index + 1) * size - 1)
+        tile[lo - index * size:hi - index * size + 1] = bins[lo - first:hi - first + 1]
+        touched[index] = tile
+
+    level = 0
+    while True:
+        for index, tile in touched.items():
+            write_tile(tile, directory, station, var, level, index, fmt)
+        span = extents.setdefault(str(level), [min(touched), max(touched)])
+        span[0], span[1] = min(span[0], min(touched)), max(span[1], max(touched))
+        if span[0] == span[1]:
+            break
+
+        # Next level up: rebuild each parent from its factor children. The
+        # parents of the level's end tiles are included so a level that did
+        # not exist yet also covers the data exported before.
+        parents = {}
+        ends = {span[0] // factor, span[1] // factor}
+        for parent in sorted({index // factor for index in touched} | ends):
+            children = []
+            for child in range(parent * factor, (parent + 1) * factor):
+                tile = touched.get(child)
+                if tile is None:
+                    tile = read_tile(directory, station, var, level, child, fmt)
+                children.append(empty_tile(size) if tile is None else tile)
+            parents[parent] = coarsen(np.concatenate(children), factor)
+        touched = parents
+        level += 1
+    return level
+
+
+# Export every configured variable of a QA-ed station data frame
+def export_station(station, data, settings):
+    config = dict(DEFAULT_TILES, **(settings.get('tiles') or {}))
+    directory = config['directory']
+    index_path = os.path.join(directory, station, 'index.json')
+    index = {'levels': {}}
+    if os.path.exists(index_path):
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+
+    times = pd.to_datetime(data['TIMESTAMP']).to_numpy()
+    for var in config['variables']:
+        if var not in data:
+            continue
+        values = pd.to_numeric(data[var], errors='coerce').to_numpy(dtype=float)
+        extents = index['levels'].setdefault(var, {})
+        export_variable(directory, station, var, times, values, config, extents)
+
+    index.update({'station': station,
+                  'epoch': '1970-01-01T00:00:00',
+                  'base_seconds': config['base_minutes'] * 60,
+                  'factor': config['factor'],
+                  'tile_size': config['tile_size'],
+                  'format': config['format'],
+                  'fields': [[name, TILE_DTYPE[name].str] for name in TILE_DTYPE.names],
+                  'path': '{variable}/{level}/{index}.' + config['format']})
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with open(index_path, 'w') as f:
+        json.dump(index, f, indent=1)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export the tile pyramid for a station')
+    parser.add_argument('settings', help='YAML settings file')
+    parser.add_argument('station', help='Station the daily files belong to')
+    parser.add_argument('files', nargs='+', help='Daily CSV files (NWC_YYYYMMDD.dat)')
+    args = parser.parse_args()
+
+    with open(args.settings, "r") as f:
+        settings = yaml.safe_load(f)
+    if not (settings.get('tiles') or {}).get('directory'):
+        raise SystemExit("Set tiles: directory: in the settings file first")
+    data = pd.concat([infill.read_daily(path)
+                      for path in sorted(args.files)], ignore_index=True)
+    index = export_station(args.station, data, settings)
+    for var, levels in index['levels'].items():
+        print(var, "levels 0-{}".format(max(int(level) for level in levels)))
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: toa5.py
+# Version: 1.6.1
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Reads TOA5 formatted raw data files from the CR300 series datalogger and
+#   merges any number of (possibly overlapping) downloads for one station.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release, RECORD-aware merge of overlapping
+#                        downloads with duplicate, conflict and reset reporting
+#
+#   1.1.0 - 10/19/2026 - Streaming ingest of compressed raw archives (.gz, .bz2,
+#                        .xz, .zst) with decompression on a background thread
+#
+#   1.2.0 - 10/19/2026 - Optional compiled table schema (crbasic.py) to validate
+#                        headers, fix dtypes and read only the needed columns
+#
+#   1.3.0 - 10/19/2026 - Files written by different program versions are read
+#                        with their own schema and widened to the union of
+#                        their columns; field aliases for renamed fields
+#
+#   1.4.0 - 10/19/2026 - Campbell binary tables (TOB1/TOB3, tob.py) are read
+#                        wherever a TOA5 file is
+#
+#   1.5.0 - 10/19/2026 - Record interval of the merged data in the merge
+#                        report, from the table metadata when it is known
+#
+#   1.6.0 - 10/19/2026 - Records appended to a plain TOA5 file read from a
+#                        byte offset, for following live files
+#
+#   1.6.1 - 10/19/2026 - merge_toa5 copies the data only to reorder or drop
+#                        rows when it has to
+#
+# Inputs:
+#  * One or more TOA5 raw data files collected from the same station, plain
+#    or compressed with gzip, bzip2, xz or zstandard.
+#
+# Outputs:
+#  * Data frame of unique observations sorted on (TIMESTAMP, RECORD).
+#  * Merge report (dropped duplicates, conflicting rows, RECORD resets).
+#
+# Notes:
+#   * Every download is already in time order, so the merge is a stable sort
+#     of the concatenated files. Timsort finds those presorted runs and merges
+#     them in near-linear time, so many overlapping pulls cost little more
+#     than reading them once.
+#   * When two files disagree about a timestamp, the row from the file listed
+#     last wins (the newest download is taken to be the most complete).
+#   * Compressed files are never written back to disk. A reader thread keeps a
+#     few decompressed blocks queued ahead of the csv parser, and when several
+#     files are read the next file starts decompressing while the current one
+#     is still being parsed.
+#   * .zst files need the optional zstandard package.
+#   * A raw file starting with a TOB1 or TOB3 header is decoded by tob.py
+#     and comes out in the same layout, so TOA5 and binary downloads can be
+#     merged together.
+#   * The record interval comes from the table metadata (DataInterval of the
+#     compiled schema, or the TOB3 header); without either it is the most
+#     common step between the merged time stamps.
+#   * Files from different program versions keep their own columns while
+#     they are parsed (at full speed, with the version's dtypes); the merge
+#     then widens each file's frame once to the union of the columns, so a
+#     field a version did not log reads as missing.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import bz2
+import crbasic
+import csv
+import gzip
+import io
+import lzma
+import queue
+import threading
+import tob
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Strings the logger writes into a TOA5 file for a missing value
+TOA5_NA_VALUES = ['NAN', '-INF', 'INF']
+
+# Names of the fields in the first (environment) line of a TOA5 header
+TOA5_ENVIRONMENT = ['file_type', 'station', 'logger', 'serial', 'os',
+                    'program', 'signature', 'table']
+
+# Size of the decompressed blocks handed from the reader thread to the parser
+PREFETCH_BLOCK = 1 << 20
+
+# Number of decompressed blocks the reader thread may run ahead by
+PREFETCH_DEPTH = 8
+
+# Record interval (seconds) assumed when nothing else tells it
+DEFAULT_INTERVAL = 300
+
+
+# Extensions of the compressed raw files open_raw reads
+COMPRESSED = ['.gz', '.bz2', '.xz', '.zst']
+
+
+# Open a raw file as a binary stream, decompressing on the fly by extension
+def open_raw(path):
+    suffix = Path(path).suffix.lower()
+    if suffix == '.gz':
+        return gzip.open(path, 'rb')
+    if suffix == '.bz2':
+        return bz2.open(path, 'rb')
+    if suffix == '.xz':
+        return lzma.open(path, 'rb')
+    if suffix == '.zst':
+        if zstandard is None:
+            raise ImportError("Reading .zst raw files needs the 'zstandard' package")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+# Binary stream fed by a thread that reads (and decompresses) ahead of us
+class PrefetchReader(io.RawIOBase):
+
+    def __init__(self, raw, block=PREFETCH_BLOCK, depth=PREFETCH_DEPTH):
+        self._raw = raw
+        self._block = block
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._error = None
+        self._pending = b''
+        self._done = False
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        try:
+            while not self._stop.is_set():
+                chunk = self._raw.read(self._block)
+                if not chunk:
+                    break
+                self._queue.put(chunk)
+        except Exception as error:
+            self._error = error
+        finally:
+            self._queue.put(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._done:
+            self._pending = self._queue.get()
+            if not self._pending:
+                self._done = True
+                if self._error is not None:
+                    raise self._error
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            # Drain the queue so a blocked reader thread can see the stop flag
+            while self._thread.is_alive():
+                try:
+                    self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self._raw.close()
+        super().close()
+
+
+# Open a raw file as a text stream, optionally read ahead on a thread
+def open_toa5(path, prefetch=False):
+    raw = open_raw(path)
+    if prefetch:
+        raw = io.BufferedReader(PrefetchReader(raw), PREFETCH_BLOCK)
+    return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
+
+# True for a (plain or compressed) Campbell binary TOB1/TOB3 table file
+def is_binary(path):
+    with open_raw(path) as f:
+        return f.read(6) in tob.SIGNATURES
+
+
+# Open a raw file for parsing: binary tables as a binary stream, TOA5 files as
+# a text stream (optionally read ahead on a thread)
+def open_table(path, prefetch=False):
+    return open_raw(path) if is_binary(path) else open_toa5(path, prefetch)
+
+
+# Split a single header line the same way the csv reader would
+def _header_line(line):
+    return next(csv.reader([line.strip()]))
+
+
+# Read the four TOA5 header lines from an open text stream
+def read_toa5_header(f):
+    environment = _header_line(f.readline())
+    if not environment or environment[0] != 'TOA5':
+        raise ValueError('Not a TOA5 formatted file (first field is {!r})'.format(
+            environment[0] if environment else ''))
+    meta = dict(zip(TOA5_ENVIRONMENT, environment))
+    meta['fields'] = _header_line(f.readline())
+    meta['units'] = _header_line(f.readline())
+    meta['process'] = _header_line(f.readline())
+    return meta
+
+
+# Validate a header against a schema (or the matching version of a schema
+# history) and return the dtypes to read it with, under their aliased names.
+# The schema's record interval is kept in the header metadata.
+def _header_dtypes(meta, schema, aliases):
+    if schema is None:
+        return None
+    if isinstance(schema, list):
+        schema = crbasic.match_schema(meta, schema, aliases)
+    crbasic.validate_header(meta, schema, aliases)
+    meta['interval_seconds'] = schema.get('interval_seconds')
+    return {aliases.get(k, k): v for k, v in schema['dtypes'].items()}
+
+
+# Parse an open TOA5 text stream into (header metadata, data frame). With a
+# compiled schema the header is validated and the dtypes are fixed up front;
+# columns limits the parse to the fields that are actually needed. aliases
+# renames fields ({logger name: name used here}).
+def _parse_toa5(f, path, schema=None, columns=None, aliases=None):
+    aliases = aliases or {}
+    meta = read_toa5_header(f)
+    meta['path'] = str(path)
+    names = meta['columns'] = [aliases.get(c, c) for c in meta['fields']]
+    dtype = _header_dtypes(meta, schema, aliases)
+    usecols = None
+    if columns is not None:
+        usecols = ['TIMESTAMP'] + [c for c in names if c in columns and c != 'TIMESTAMP']
+        if dtype is not None:
+            dtype = {k: v for k, v in dtype.items() if k in columns}
+    data = pd.read_csv(f, header=None, names=names, usecols=usecols,
+                       dtype=dtype, na_values=TOA5_NA_VALUES)
+    data['TIMESTAMP'] = pd.to_datetime(data['TIMESTAMP'])
+    return meta, data
+
+
+# Decode a TOB1/TOB3 binary stream into (header metadata, data frame), checked,
+# renamed and limited to columns the same way as a TOA5 file
+def _parse_tob(f, path, schema=None, columns=None, aliases=None):
+    aliases = aliases or {}
+    meta, data = tob.read_tob(f)
+    meta['path'] = str(path)
+    dtype = _header_dtypes(meta, schema, aliases)
+    data.columns = meta['columns'] = [aliases.get(c, c) for c in meta['fields']]
+    if columns is not None:
+        data = data[['TIMESTAMP'] + [c for c in data.columns if c in columns and c != 'TIMESTAMP']]
+    if dtype is not None:
+        data = data.astype({k: v for k, v in dtype.items() if k in data and k != 'TIMESTAMP'})
+    return meta, data
+
+
+# Parse a stream from open_table, text or binary
+def _parse_table(f, path, schema=None, columns=None, aliases=None):
+    if isinstance(f, io.TextIOWrapper):
+        return _parse_toa5(f, path, schema, columns, aliases)
+    return _parse_tob(f, path, schema, columns, aliases)
+
+
+# Read a (plain or compressed) TOA5 or binary file into (header metadata, data frame)
+def read_toa5(path, prefetch=False, schema=None, columns=None, aliases=None):
+    with open_table(path, prefetch) as f:
+        return _parse_table(f, path, schema, columns, aliases)
+
+
+# Read a TOA5 file chunk by chunk, so it never has to fit in memory at once
+def iter_toa5_chunks(path, chunksize, schema=None, columns=None, aliases=None):
+    aliases = aliases or {}
+    if is_binary(path):
+        # Binary tables are compact enough to decode whole, then hand out
+        meta, data = read_toa5(path, schema=schema, columns=columns, aliases=aliases)
+        for start in range(0, len(data), chunksize):
+            yield data.iloc[start:start + chunksize].reset_index(drop=True)
+        return
+    with open_toa5(path, prefetch=True) as f:
+        meta = read_toa5_header(f)
+        meta['path'] = str(path)
+        dtype = _header_dtypes(meta, schema, aliases)
+        names = [aliases.get(c, c) for c in meta['fields']]
+        for chunk in pd.read_csv(f, header=None, names=names, dtype=dtype,
+                                 na_values=TOA5_NA_VALUES, chunksize=chunksize):
+            chunk['TIMESTAMP'] = pd.to_datetime(chunk['TIMESTAMP'])
+            yield chunk[['TIMESTAMP'] + [c for c in chunk if c != 'TIMESTAMP'
+                                         and (columns is None or c in columns)]]
+
+
+# Read several TOA5 (or binary) files in turn, decompressing the next one in the
+# background while the current one is parsed
+def read_toa5_many(paths, schema=None, columns=None, aliases=None):
+    paths = list(paths)
+    pending = open_table(paths[0], prefetch=True) if paths else None
+    try:
+        for n, path in enumerate(paths):
+            current = pending
+            pending = open_table(paths[n + 1], prefetch=True) if n + 1 < len(paths) else None
+            with current as f:
+                result = _parse_table(f, path, schema, columns, aliases)
+            yield result
+    finally:
+        if pending is not None:
+            pending.close()
+
+
+# True for a plain (uncompressed) TOA5 file, which can be followed as it grows
+def is_plain_toa5(path):
+    with open(path, 'rb') as f:
+        return Path(path).suffix.lower() not in COMPRESSED and f.read(6) == b'"TOA5"'
+
+
+# Byte length of the complete lines of a plain text file (where following it
+# should start from)
+def complete_length(path, block=1 << 16):
+    with open(path, 'rb') as f:
+        end = f.seek(0, 2)
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+# Records appended to a plain TOA5 file from byte offset on, as (data frame
+# or None, offset after the last complete line); a line still being written
+# is left for the next call
+def read_toa5_tail(path, offset, schema=None, aliases=None):
+    aliases = aliases or {}
+    with open_toa5(path) as f:
+        meta = read_toa5_header(f)
+    dtype = _header_dtypes(meta, schema, aliases)
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        text = f.read()
+    end = text.rfind(b'\n') + 1
+    if not text[:end].strip():
+        return None, offset + end
+    data = pd.read_csv(io.BytesIO(text[:end]), header=None, names=[aliases.get(c, c) for c in meta['fields']],
+                       dtype=dtype, na_values=TOA5_NA_VALUES)
+    data['TIMESTAMP'] = pd.to_datetime(data['TIMESTAMP'])
+    return data, offset + end
+
+
+# Rows equal to the row before them (missing values compare as equal)
+def _same_as_previous(values):
+    if len(values) < 2:
+        return np.zeros(len(values), dtype=bool)
+    a, b = values[1:], values[:-1]
+    same = ((a == b) | (np.isnan(a) & np.isnan(b))).all(axis=1)
+    return np.concatenate([[False], same])
+
+
+# Record interval (seconds) of a table: from its header metadata when known,
+# else the most common step between the (sorted) time stamps
+def record_interval(meta, times):
+    if meta.get('interval_seconds'):
+        return meta['interval_seconds']
+    steps = np.diff(np.asarray(times, dtype='datetime64[ns]').astype(np.int64))
+    steps = steps[steps > 0]
+    if not len(steps):
+        return DEFAULT_INTERVAL
+    values, counts = np.unique(steps, return_counts=True)
+    return values[counts.argmax()] / 1e9
+
+
+# Merge any number of raw files for one station on (TIMESTAMP, RECORD). schema
+# may be one compiled schema or a history of program versions (oldest first).
+def merge_toa5(paths, schema=None, columns=None, aliases=None):
+    paths = list(paths)
+    if not paths:
+        raise ValueError('merge_toa5 needs at least one raw data file')
+    if columns is not None:
+        columns = ['RECORD'] + [c for c in columns if c != 'RECORD']
+
+    metas, frames = [], []
+    for n, (meta, frame) in enumerate(read_toa5_many(paths, schema, columns, aliases)):
+        frame['_file'] = n
+        metas.append(meta)
+        frames.append(frame)
+
+    # Union of the columns, newest file's order first; files missing some of
+    # them are widened once, column by column
+    union = []
+    for frame in reversed(frames):
+        union += [c for c in frame.columns if c not in union]
+    frames = [frame if list(frame.columns) == union else frame.reindex(columns=union)
+              for frame in frames]
+    data = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True, sort=False)
+    del frames
+    rows_read = len(data)
+
+    # Stable sort on time keeps the file order within a timestamp; only tied
+    # timestamps with out of order RECORDs need the (rare) two key sort
+    ts = data['TIMESTAMP'].values.astype('int64')
+    rec = data['RECORD'].values.astype('int64')
+    order = np.argsort(ts, kind='stable')
+    ts, rec = ts[order], rec[order]
+    tied = ts[1:] == ts[:-1]
+    if (tied & (rec[1:] < rec[:-1])).any():
+        resort = np.lexsort((rec, ts))
+        order, ts, rec = order[resort], ts[resort], rec[resort]
+    if (order != np.arange(len(order))).any():
+        data = data.iloc[order].reset_index(drop=True)
+
+    # Exact duplicates: same TIMESTAMP, RECORD and values as the row before
+    fields = [c for c in data.columns if c not in ('TIMESTAMP', 'RECORD', '_file')]
+    duplicate = np.concatenate([[False], ts[1:] == ts[:-1]])
+    if duplicate.any():
+        values = data[fields].to_numpy(dtype=float, na_value=np.nan)
+        duplicate &= _same_as_previous(np.column_stack([rec, values]))
+        data = data[~duplicate].reset_index(drop=True)
+        ts, rec = ts[~duplicate], rec[~duplicate]
+
+    # Conflicts: one timestamp still carrying more than one distinct row
+    conflicts = []
+    clash = np.flatnonzero(ts[1:] == ts[:-1]) + 1
+    if len(clash):
+        keep = np.ones(len(data), dtype=bool)
+        for stamp in np.unique(ts[clash]):
+            rows = np.arange(np.searchsorted(ts, stamp, side='left'),
+                             np.searchsorted(ts, stamp, side='right'))
+            files = data['_file'].values[rows]
+            winner = rows[np.flatnonzero(files == files.max())[-1]]
+            keep[rows] = False
+            keep[winner] = True
+            conflicts.append({'TIMESTAMP': pd.Timestamp(stamp),
+                              'RECORD': rec[rows].tolist(),
+                              'files': [paths[i] for i in files],
+                              'kept': paths[data['_file'].values[winner]]})
+        data = data[keep].reset_index(drop=True)
+        rec = rec[keep]
+
+    # Resets: RECORD goes backwards while time moves forward
+    resets = []
+    for i in np.flatnonzero(rec[1:] < rec[:-1]) + 1:
+        before, after = data.iloc[i - 1], data.iloc[i]
+        resets.append({'TIMESTAMP': after['TIMESTAMP'],
+                       'last_record': int(rec[i - 1]),
+                       'first_record': int(rec[i]),
+                       'program_before': metas[before['_file']]['program'],
+                       'program_after': metas[after['_file']]['program']})
+
+    report = {'files': paths,
+              'programs': [m['program'] for m in metas],
+              'header': metas[-1],
+              'interval_seconds': record_interval(metas[-1], data['TIMESTAMP']),
+              'rows_read': rows_read,
+              'rows_kept': len(data),
+              'duplicates': int(duplicate.sum()),
+              'conflicts': conflicts,
+              'resets': resets}
+    return data.drop(columns='_file'), report
+
+
+# Text block for the summary report describing a merge
+def format_merge_report(report):
+    lines = ["Merged {} raw files: {} rows read, {} kept, {} duplicates dropped".format(
+        len(report['files']), report['rows_read'], report['rows_kept'], report['duplicates'])]
+    for c in report['conflicts']:
+        lines.append("\t Conflict at {}: RECORD {} (kept {})".format(
+            c['TIMESTAMP'], c['RECORD'], c['kept']))
+    for r in report['resets']:
+        lines.append("\t RECORD reset at {}: {} -> {} ({} -> {})".format(
+            r['TIMESTAMP'], r['last_record'], r['first_record'],
+            r['program_before'], r['program_after']))
+    return "\n".join(lines)
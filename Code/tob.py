@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:00:00 2026
+
+@author: savannahsouthward
+"""
+
+###############################################################
+# File: tob.py
+# Version: 1.1.0
+# Author: Savannah Southward (savannahjsouthward@ou.edu)
+# Description:
+#   Reads Campbell Scientific binary table files (TOB1, and TOB3 as written
+#   to the logger's card) straight into data frames, and writes TOB1 files
+#   with every measurement packed as FP2 as a compact raw data archive.
+#
+# Version History:
+#   1.0.0 - 10/19/2026 - Initial release
+#   1.1.0 - 10/19/2026 - Float columns FP2 cannot hold fall back to IEEE4
+#                        before IEEE8; TOB3 minor frames are decoded
+#
+# Inputs:
+#  * TOB1 or TOB3 binary table files (toa5.py reads them wherever it reads a
+#    TOA5 file, e.g. data_files in settings.yaml).
+#  * TOA5 raw data files to pack.
+#
+# Outputs:
+#  * Data frames in the same layout as toa5.py (TIMESTAMP, RECORD, fields).
+#  * TOB1 files with FP2 fields (pack, or binary_archive in settings.yaml).
+#
+# Usage:
+#   python tob.py pack ../Data/NWC0_05A.dat -o ../Data/NWC0_05A.tob
+#   python tob.py show ../Data/NWC0_05A.tob
+#
+# Notes:
+#   * FP2 is Campbell's 2 byte float: sign bit, 2 bit decimal exponent and
+#     13 bit mantissa (value = +/- mantissa / 10^exponent, |mantissa| <= 7999),
+#     stored big-endian. Each float column is packed in the smallest type
+#     that holds every one of its values exactly: FP2, else IEEE4, else IEEE8,
+#     so packing never changes a value. In the Feb 2021 sample TAIR, RELH,
+#     SRAD, WSPD and WMAX each hold a few values past FP2's range or
+#     precision (98.12, 2620.1, 125.106, ...) and go to IEEE4, which makes
+#     NWC0_05A.dat about 55% of its TOA5 size (IEEE8 made it 84%).
+#   * IEEE4 values are read rounded to 7 significant digits, as LoggerNet
+#     writes them to TOA5, so 98.12 reads back as 98.12 and not as the
+#     nearest float32 (98.12000274...).
+#   * Records are read with one np.frombuffer over a structured dtype and FP2
+#     columns are decoded with bit operations on whole arrays; no text is
+#     parsed after the header.
+#   * TOB3 records carry no time stamp or record number; they come from the
+#     12 byte frame header plus the table interval. A frame flagged minor
+#     (written when the logger closes a frame early) holds several smaller
+#     frames, each with its own header and footer; the footer offset gives
+#     the minor frame's size, so they are walked back from the end of the
+#     frame. Frames that fail the validation stamp and empty frames are
+#     skipped (and counted in the header metadata as frames_skipped).
+#   * FP2 and IEEE NAN/INF values read as missing, the same as in TOA5 files.
+#
+# Copyright (c) 2026
+# Board of Regents, Univ. of Oklahoma
+# All Rights Reserved.
+# Proprietary. Confidential.
+###############################################################
+
+# Import libraries
+import argparse
+import csv
+import io
+import os
+import re
+import numpy as np
+import pandas as pd
+import crbasic
+
+# Time stamps in Campbell binary files count from 1990-01-01 00:00:00
+CAMPBELL_EPOCH = np.datetime64('1990-01-01T00:00:00', 'ns')
+
+# Start of the first header line of each binary table format
+SIGNATURES = (b'"TOB1"', b'"TOB3"')
+
+# Number of ASCII header lines before the data of each binary table format
+HEADER_LINES = {'TOB1': 5, 'TOB3': 6}
+
+# Names of the fields in the first (environment) line of a TOB header
+TOB_ENVIRONMENT = ['file_type', 'station', 'logger', 'serial', 'os',
+                   'program', 'signature']
+
+# Numpy dtype of each binary field type. FP2 is read as its raw 16 bit word
+# and decoded afterwards.
+FIELD_TYPES = {'FP2': '>u2', 'IEEE4': '<f4', 'IEEE4B': '>f4', 'IEEE8': '<f8',
+               'IEEE8B': '>f8', 'ULONG': '<u4', 'LONG': '<i4', 'UINT2': '>u2',
+               'UINT4': '>u4', 'INT2': '>i2', 'INT4': '>i4', 'BOOL': 'u1',
+               'BOOL2': '>u2', 'BOOL4': '>u4'}
+
+ASCII_FIELD = re.compile(r'^ASCII\((\d+)\)$')
+
+# Seconds per tick of the TOB3 frame header sub-second counter
+FRAME_RESOLUTION = {'secmsec': 1e-3, 'sec100usec': 1e-4, 'sec10usec': 1e-5,
+                    'secusec': 1e-6}
+
+# TOB3 frame header (seconds, sub-seconds, first record) and footer sizes
+FRAME_HEADER = 12
+FRAME_FOOTER = 4
+
+# TOB3 frame footer flags, and the bits of the footer holding the size of a
+# minor frame
+FOOTER_EMPTY = 0x4000
+FOOTER_MINOR = 0x8000
+FOOTER_OFFSET = 0x07FF
+
+# Significant digits of IEEE4 values as LoggerNet writes them to TOA5
+IEEE4_DIGITS = 7
+
+# FP2 words with a special meaning
+FP2_NAN = 0x9FFE
+FP2_POS_INF = 0x1FFF
+FP2_NEG_INF = 0x9FFF
+
+# 10^exponent for the four FP2 exponents
+FP2_SCALE = np.array([1.0, 10.0, 100.0, 1000.0])
+
+
+# Decode an array of FP2 words to float64
+def decode_fp2(words):
+    words = np.asarray(words).astype(np.uint16)
+    values = (words & 0x1FFF) / FP2_SCALE[(words >> 13) & 0x3]
+    values = np.where(words & 0x8000, -values, values)
+    values[words == FP2_NAN] = np.nan
+    values[words == FP2_POS_INF] = np.inf
+    values[words == FP2_NEG_INF] = -np.inf
+    return values
+
+
+# Encode an array of floats as big-endian FP2 words, keeping as many decimal
+# places as the 13 bit mantissa allows (values past +/-7999 become INF)
+def encode_fp2(values):
+    values = np.asarray(values, dtype=np.float64)
+    magnitude = np.abs(values)
+    with np.errstate(invalid='ignore'):
+        exponent = np.select([magnitude < 7.9995, magnitude < 79.995, magnitude < 799.95], [3, 2, 1], 0)
+        mantissa = np.rint(np.nan_to_num(magnitude) * FP2_SCALE[exponent])
+        overflow = mantissa > 7999
+    words = ((values < 0).astype(np.uint16) << 15) | (exponent.astype(np.uint16) << 13) \
+        | np.minimum(mantissa, 7999).astype(np.uint16)
+    words[overflow] = np.where(values[overflow] < 0, FP2_NEG_INF, FP2_POS_INF)
+    words[np.isnan(values)] = FP2_NAN
+    return words.astype('>u2')
+
+
+# Round IEEE4 values to the significant digits they are written with in TOA5
+def decode_ieee4(values):
+    values = np.asarray(values).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        places = IEEE4_DIGITS - 1 - np.floor(np.log10(np.abs(values)))
+    places = np.nan_to_num(places, nan=0.0, posinf=0.0, neginf=0.0)
+    scale = 10.0 ** np.abs(places)
+    with np.errstate(invalid='ignore', over='ignore'):
+        rounded = np.where(places >= 0, np.rint(values * scale) / scale, np.rint(values / scale) * scale)
+    return np.where(np.isfinite(values), rounded, values)
+
+
+# Numpy dtype of one record of a binary table
+def _record_dtype(fields, types):
+    layout = []
+    for name, kind in zip(fields, types):
+        text = ASCII_FIELD.match(kind)
+        if text:
+            layout.append((name, 'S' + text.group(1)))
+        elif kind in FIELD_TYPES:
+            layout.append((name, FIELD_TYPES[kind]))
+        else:
+            raise ValueError('Unsupported binary field type {} ({})'.format(kind, name))
+    return np.dtype(layout)
+
+
+# One field of the structured records as a plain column
+def _column(records, name, kind):
+    values = records[name]
+    if kind == 'FP2':
+        values = decode_fp2(values)
+    elif kind.startswith('IEEE4'):
+        values = decode_ieee4(values)
+    elif kind.startswith('IEEE'):
+        values = values.astype(np.float64)
+    elif kind.startswith('BOOL'):
+        return values != 0
+    elif kind.startswith('ASCII'):
+        return np.char.decode(values, 'ascii').astype(object)
+    else:
+        return values.astype(np.int64)
+    values[np.isinf(values)] = np.nan
+    return values
+
+
+# Read one comma separated ASCII header line from a binary stream
+def _header_line(f):
+    return next(csv.reader([f.readline().decode('ascii').strip()]))
+
+
+# Header metadata in the toa5.py layout: the time stamp and record number
+# lead the fields as TIMESTAMP and RECORD
+def _meta(environment, table, fields, units, process):
+    meta = dict(zip(TOB_ENVIRONMENT, environment))
+    meta['table'] = table
+    meta['fields'] = ['TIMESTAMP', 'RECORD'] + fields
+    meta['units'] = ['TS', 'RN'] + units
+    meta['process'] = ['', ''] + process
+    return meta
+
+
+# TOB1: a flat run of records, each with its own SECONDS, NANOSECONDS and RECORD
+def _read_tob1(environment, lines, body):
+    fields, units, process, types = lines
+    for needed in ('SECONDS', 'NANOSECONDS', 'RECORD'):
+        if needed not in fields:
+            raise ValueError('TOB1 table {} has no {} field'.format(environment[-1], needed))
+    dtype = _record_dtype(fields, types)
+    records = np.frombuffer(body, dtype=dtype, count=len(body) // dtype.itemsize)
+    keep = [i for i, name in enumerate(fields) if name not in ('SECONDS', 'NANOSECONDS', 'RECORD')]
+    data = {'TIMESTAMP': CAMPBELL_EPOCH + records['SECONDS'].astype(np.int64) * 10**9
+            + records['NANOSECONDS'].astype(np.int64),
+            'RECORD': records['RECORD'].astype(np.int64)}
+    for i in keep:
+        data[fields[i]] = _column(records, fields[i], types[i])
+    meta = _meta(environment, environment[7] if len(environment) > 7 else '',
+                 [fields[i] for i in keep], [units[i] for i in keep], [process[i] for i in keep])
+    return meta, pd.DataFrame(data)
+
+
+# True where a TOB3 footer carries the table's validation stamp (or its
+# complement, once the ring has wrapped)
+def _stamped(footer, stamp):
+    return ((footer >> 16) == stamp) | ((footer >> 16) == (~stamp & 0xFFFF))
+
+
+# The minor frames of one frame as (seconds, subseconds, first record,
+# records), oldest first, walked back from the footer at the end of the frame
+def _minor_frames(frame, stamp, record):
+    header = np.dtype([('seconds', '<u4'), ('subseconds', '<u4'), ('record', '<u4')])
+    minors = []
+    end = len(frame)
+    while end >= FRAME_HEADER + FRAME_FOOTER:
+        footer = np.frombuffer(frame, dtype='<u4', count=1, offset=end - FRAME_FOOTER)
+        size = int(footer[0] & FOOTER_OFFSET)
+        if not _stamped(footer, stamp)[0] or not footer[0] & FOOTER_MINOR or \
+                size < FRAME_HEADER + FRAME_FOOTER or size > end:
+            break
+        start = end - size
+        if not footer[0] & FOOTER_EMPTY:
+            head = np.frombuffer(frame, dtype=header, count=1, offset=start)[0]
+            count = (size - FRAME_HEADER - FRAME_FOOTER) // record.itemsize
+            minors.append((int(head['seconds']), int(head['subseconds']), int(head['record']),
+                           np.frombuffer(frame, dtype=record, count=count, offset=start + FRAME_HEADER)))
+        end = start
+    return minors[::-1]
+
+
+# TOB3: fixed size frames of records behind a 12 byte header (time of the
+# first record and its record number) and ahead of a 4 byte footer
+def _read_tob3(environment, lines, body):
+    table, fields, units, process, types = lines
+    name, interval, frame_size, stamp, resolution = table[0], table[1], int(table[2]), int(table[4]), table[5]
+    value, unit = interval.split()
+    interval_ns = int(float(value) * crbasic.INTERVAL_UNITS[unit.lower()] * 1e9)
+    tick_ns = int(FRAME_RESOLUTION[resolution.lower()] * 1e9)
+
+    record = _record_dtype(fields, types)
+    per_frame = (frame_size - FRAME_HEADER - FRAME_FOOTER) // record.itemsize
+    layout = [('seconds', '<u4'), ('subseconds', '<u4'), ('record', '<u4'), ('data', record, (per_frame,))]
+    spare = frame_size - FRAME_HEADER - FRAME_FOOTER - per_frame * record.itemsize
+    if spare:
+        layout.append(('spare', 'V{}'.format(spare)))
+    layout.append(('footer', '<u4'))
+    frames = np.frombuffer(body, dtype=np.dtype(layout), count=len(body) // frame_size)
+
+    # Frames written by this table that hold a full set of records
+    footer = frames['footer']
+    stamped = _stamped(footer, stamp)
+    valid = stamped & ((footer & (FOOTER_EMPTY | FOOTER_MINOR)) == 0)
+    full = frames[valid]
+
+    step = np.arange(per_frame, dtype=np.int64)
+    first = (full['seconds'].astype(np.int64) * 10**9 + full['subseconds'].astype(np.int64) * tick_ns)
+    times = [(first[:, None] + step * interval_ns).ravel()]
+    numbers = [(full['record'].astype(np.int64)[:, None] + step).ravel()]
+    records = [full['data'].reshape(-1)]
+
+    # Frames closed early, each holding one or more minor frames
+    minor = np.flatnonzero(stamped & ((footer & FOOTER_MINOR) != 0))
+    for i in minor:
+        found = _minor_frames(body[i * frame_size:(i + 1) * frame_size], stamp, record)
+        valid[i] = bool(found)
+        for seconds, subseconds, number, rows in found:
+            offsets = np.arange(len(rows), dtype=np.int64)
+            times.append(seconds * 10**9 + subseconds * tick_ns + offsets * interval_ns)
+            numbers.append(number + offsets)
+            records.append(rows)
+
+    times = CAMPBELL_EPOCH + np.concatenate(times)
+    numbers = np.concatenate(numbers)
+    records = np.concatenate(records)
+    order = np.argsort(numbers, kind='stable')
+
+    data = {'TIMESTAMP': times[order], 'RECORD': numbers[order]}
+    for field, kind in zip(fields, types):
+        data[field] = _column(records, field, kind)[order]
+    meta = _meta(environment, name, fields, units, process)
+    meta['interval_seconds'] = interval_ns / 1e9
+    meta['frames_skipped'] = int((~valid).sum())
+    return meta, pd.DataFrame(data)
+
+
+# Read a TOB1 or TOB3 table from an open binary stream into (header metadata,
+# data frame)
+def read_tob(f):
+    environment = _header_line(f)
+    kind = environment[0] if environment else ''
+    if kind not in HEADER_LINES:
+        raise ValueError('Not a TOB1 or TOB3 formatted file (first field is {!r})'.format(kind))
+    lines = [_header_line(f) for _ in range(HEADER_LINES[kind] - 1)]
+    body = f.read()
+    if kind == 'TOB1':
+        return _read_tob1(environment, lines, body)
+    return _read_tob3(environment, lines, body)
+
+
+# True where FP2 holds a value exactly (missing values included)
+def fits_fp2(values):
+    values = np.asarray(values, dtype=np.float64)
+    decoded = decode_fp2(encode_fp2(values))
+    return (decoded == values) | (np.isnan(decoded) & np.isnan(values))
+
+
+# True where IEEE4 holds a value exactly, as read back by decode_ieee4
+def fits_ieee4(values):
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(over='ignore', invalid='ignore'):
+        decoded = decode_ieee4(values.astype(np.float32))
+    return (decoded == values) | (np.isnan(decoded) & np.isnan(values))
+
+
+# Smallest float type that holds every value of a column exactly
+def float_type(values):
+    if fits_fp2(values).all():
+        return 'FP2'
+    if fits_ieee4(values).all():
+        return 'IEEE4'
+    return 'IEEE8'
+
+
+# Write a data frame (TIMESTAMP, RECORD, fields) as a TOB1 file. Float fields
+# are packed as FP2 (IEEE4, or else IEEE8, if FP2 would change a value) and
+# integer fields as LONG unless types says otherwise;
+# meta (a toa5.py header) supplies the environment line, units and processing.
+def write_tob1(path, data, meta=None, types=None):
+    meta = meta or {}
+    types = types or {}
+    columns = [c for c in data.columns if c not in ('TIMESTAMP', 'RECORD')]
+    named = meta.get('columns', meta.get('fields', []))
+    units = dict(zip(named, meta.get('units', [])))
+    process = dict(zip(named, meta.get('process', [])))
+
+    kinds = []
+    for column in columns:
+        if column in types:
+            kinds.append(types[column])
+        elif pd.api.types.is_float_dtype(data[column]):
+            kinds.append(float_type(data[column]))
+        elif pd.api.types.is_bool_dtype(data[column]):
+            kinds.append('BOOL')
+        elif pd.api.types.is_integer_dtype(data[column]):
+            kinds.append('LONG')
+        else:
+            raise ValueError('Cannot store column {} ({}) in a TOB1 file'.format(column, data[column].dtype))
+    fields = ['SECONDS', 'NANOSECONDS', 'RECORD'] + columns
+    kinds = ['ULONG', 'ULONG', 'ULONG'] + kinds
+
+    since = (pd.to_datetime(data['TIMESTAMP']).to_numpy('datetime64[ns]') - CAMPBELL_EPOCH).astype(np.int64)
+    records = np.zeros(len(data), dtype=_record_dtype(fields, kinds))
+    records['SECONDS'] = since // 10**9
+    records['NANOSECONDS'] = since % 10**9
+    records['RECORD'] = data['RECORD'].to_numpy()
+    for column, kind in zip(fields[3:], kinds[3:]):
+        values = data[column].to_numpy()
+        records[column] = encode_fp2(values) if kind == 'FP2' else values
+
+    text = io.StringIO()
+    writer = csv.writer(text, quoting=csv.QUOTE_ALL, lineterminator='\r\n')
+    writer.writerow(['TOB1'] + [meta.get(key, '') for key in TOB_ENVIRONMENT[1:]] + [meta.get('table', '')])
+    writer.writerow(fields)
+    writer.writerow(['SECONDS', 'NANOSECONDS', 'RN'] + [units.get(c, '') for c in columns])
+    writer.writerow(['', '', ''] + [process.get(c, '') for c in columns])
+    writer.writerow(kinds)
+    with open(path, 'wb') as f:
+        f.write(text.getvalue().encode('ascii'))
+        f.write(records.tobytes())
+
+
+if __name__ == "__main__":
+    # toa5.py imports this module to read binary files, so import it here
+    import toa5
+
+    parser = argparse.ArgumentParser(description='Campbell binary (TOB1/TOB3) tables')
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack = commands.add_parser('pack', help='Pack a TOA5 file as an FP2 TOB1 file')
+    pack.add_argument('file', help='TOA5 raw data file (plain or compressed)')
+    pack.add_argument('-o', '--output', required=True, help='TOB1 file to write')
+    show = commands.add_parser('show', help='Print the header and first records of a TOB1/TOB3 file')
+    show.add_argument('file')
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        meta, data = toa5.read_toa5(args.file)
+        write_tob1(args.output, data, meta)
+        print("{}: {} records, {} -> {} bytes".format(args.output, len(data), os.path.getsize(args.file),
+                                                       os.path.getsize(args.output)))
+    else:
+        with toa5.open_raw(args.file) as f:
+            meta, data = read_tob(f)
+        print({k: v for k, v in meta.items() if k not in ('fields', 'units', 'process')})
+        print(data.head().to_string())
+        print("{} records".format(len(data)))